@@ -0,0 +1,155 @@
+import asyncio
+import contextvars
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+HIGH = 0
+LOW = 1
+PRIORITIES = (HIGH, LOW)
+PRIORITY_NAMES = {HIGH: "high", LOW: "low"}
+
+admission_priority: "contextvars.ContextVar[int]" = contextvars.ContextVar("admission_priority", default=LOW)
+queue_waits: "contextvars.ContextVar[Optional[List[float]]]" = contextvars.ContextVar("queue_waits", default=None)
+
+
+def track_queue_wait() -> List[float]:
+    waits: List[float] = []
+    queue_waits.set(waits)
+    return waits
+
+
+def note_queue_wait(seconds: float) -> None:
+    waits = queue_waits.get()
+    if waits is not None:
+        waits.append(seconds)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float, waited: float = 0.0) -> None:
+        super().__init__(f"provider capacity exhausted ({reason}); retry in {retry_after:g}s")
+        self.reason = reason
+        self.retry_after = retry_after
+        self.waited = waited
+
+
+class AdmissionController:
+    # Caps in-flight provider calls at max_in_flight (0 disables the cap).
+    # Calls that find no free slot wait in one FIFO queue per priority, and a
+    # released slot goes to the oldest high-priority waiter first. The last
+    # high_reserve slots are only ever given to high priority, so a backlog of
+    # low-priority work cannot leave nothing for it. A call is shed with
+    # AdmissionRejected when its queue already holds max_queue waiters or
+    # once it has waited max_wait seconds. Only touched from the event loop.
+
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        high_reserve: int = 4,
+        max_queue_high: int = 32,
+        max_queue_low: int = 64,
+        max_wait_high: float = 5.0,
+        max_wait_low: float = 15.0,
+        retry_after: float = 2.0,
+    ) -> None:
+        self.max_in_flight = max(0, max_in_flight)
+        self.high_reserve = min(max(0, high_reserve), max(0, self.max_in_flight - 1))
+        self.max_queue = {HIGH: max(0, max_queue_high), LOW: max(0, max_queue_low)}
+        self.max_wait = {HIGH: max_wait_high, LOW: max_wait_low}
+        self.retry_after = retry_after
+        self._in_flight = 0
+        self._waiters: Dict[int, Deque["asyncio.Future[None]"]] = {priority: deque() for priority in PRIORITIES}
+        self._admitted = {priority: 0 for priority in PRIORITIES}
+        self._queued = {priority: 0 for priority in PRIORITIES}
+        self._wait_seconds = {priority: 0.0 for priority in PRIORITIES}
+        self._shed: Dict[str, int] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _has_room(self, priority: int) -> bool:
+        if self.max_in_flight <= 0:
+            return True
+        return self._in_flight < self.max_in_flight - (0 if priority == HIGH else self.high_reserve)
+
+    def queue_full(self, priority: int) -> bool:
+        return self.max_in_flight > 0 and len(self._waiters[priority]) >= self.max_queue[priority]
+
+    def check(self, priority: int) -> None:
+        # entry-point shedding: refuse new work outright while its queue is full
+        if self.queue_full(priority):
+            self._note_shed(priority, "entry")
+            raise AdmissionRejected("queue_full", self.retry_after)
+
+    def _note_shed(self, priority: int, reason: str) -> None:
+        key = f"{PRIORITY_NAMES[priority]}_{reason}"
+        self._shed[key] = self._shed.get(key, 0) + 1
+
+    def try_acquire(self, priority: int) -> bool:
+        # a slot only if one is free right now, without overtaking anyone queued
+        if not self._has_room(priority) or any(self._waiters[p] for p in PRIORITIES if p <= priority):
+            return False
+        self._in_flight += 1
+        self._admitted[priority] += 1
+        return True
+
+    async def acquire(self, priority: int) -> float:
+        # FIFO within a priority: only go straight in when nobody at this or a
+        # higher priority is already waiting
+        if self.try_acquire(priority):
+            note_queue_wait(0.0)
+            return 0.0
+        if self.queue_full(priority):
+            self._note_shed(priority, "queue_full")
+            raise AdmissionRejected("queue_full", self.retry_after)
+
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(future)
+        self._queued[priority] += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, self.max_wait[priority])
+        except BaseException as e:
+            waited = time.monotonic() - started
+            self._wait_seconds[priority] += waited
+            note_queue_wait(waited)
+            if future.done() and not future.cancelled():
+                # the slot was handed over just as the wait ended; pass it on
+                self.release()
+            elif future in self._waiters[priority]:
+                self._waiters[priority].remove(future)
+            if isinstance(e, asyncio.TimeoutError):
+                self._note_shed(priority, "timeout")
+                raise AdmissionRejected("timeout", self.retry_after, waited) from None
+            raise
+        waited = time.monotonic() - started
+        self._admitted[priority] += 1
+        self._wait_seconds[priority] += waited
+        note_queue_wait(waited)
+        return waited
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        for priority in PRIORITIES:
+            waiters = self._waiters[priority]
+            while waiters and self._has_room(priority):
+                future = waiters.popleft()
+                if future.done():
+                    continue
+                self._in_flight += 1
+                future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "high_reserve": self.high_reserve,
+            "in_flight": self._in_flight,
+            "queued": {PRIORITY_NAMES[p]: len(self._waiters[p]) for p in PRIORITIES},
+            "admitted": {PRIORITY_NAMES[p]: self._admitted[p] for p in PRIORITIES},
+            "mean_queued_wait_ms": {
+                PRIORITY_NAMES[p]: round(self._wait_seconds[p] / self._queued[p] * 1000.0, 1) if self._queued[p] else 0.0
+                for p in PRIORITIES
+            },
+            "shed": dict(sorted(self._shed.items())),
+        }
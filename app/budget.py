@@ -0,0 +1,138 @@
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Set
+
+CHARS_PER_TOKEN = 4.0
+
+_INLINE_SPACE = re.compile(r"[ \t\f\v\u00a0\u2000-\u200b\u3000]+")
+_PAGE_NUMBER = re.compile(
+    r"^(?:[-\u2013\u2014]\s*)?(?:(?:page|p\.|pg\.?)\s*[0-9]{1,4}|[0-9]{1,3})(?:\s*(?:of|/)\s*[0-9]{1,4})?(?:\s*[-\u2013\u2014])?$"
+    r"|^page\s+[ivxlc]{1,6}$",
+    re.IGNORECASE,
+)
+_HEADING = re.compile(r"^(?:article|art\.|section|chapter|part|schedule|annex|rule|clause)\b", re.IGNORECASE)
+# "3. [Omitted by Act 14 of 2019.]", "(2) ...", "12A) ...", "[4. ...": clause text, never furniture
+_NUMBERED = re.compile(r"^[\[(]?[0-9]+[A-Za-z]?[.)\]]")
+_DIGITS = re.compile(r"[0-9]+")
+_SENTENCE_END = re.compile(r"(?<=[.;:!?])\s+")
+_WORD = re.compile(r"\w")
+
+# extracted PDF pages are joined with a form feed, as pdftotext does; it is the
+# only evidence compact_text trusts that a line sits at a page edge
+PAGE_BREAK = "\n\f\n"
+EDGE_LINES = 3
+_PAGE_NUMBER_KEY = "#page"
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN)) if text else 0
+
+
+def _boilerplate_key(line: str) -> Optional[str]:
+    # running headers/footers repeat on every page, often with a page number
+    # folded in, so digits are masked before counting
+    if not 8 <= len(line) <= 100 or _HEADING.match(line) or _NUMBERED.match(line):
+        return None
+    return _DIGITS.sub("#", line.lower())
+
+
+def _edge_key(line: str) -> Optional[str]:
+    return _PAGE_NUMBER_KEY if _PAGE_NUMBER.match(line) else _boilerplate_key(line)
+
+
+def _page_edges(lines: List[str]) -> Set[int]:
+    filled = [idx for idx, line in enumerate(lines) if line]
+    return set(filled[:EDGE_LINES] + filled[-EDGE_LINES:])
+
+
+@lru_cache(maxsize=64)
+def compact_text(text: Optional[str], repeat_min: int = 3) -> str:
+    if not text:
+        return ""
+    pages = [[_INLINE_SPACE.sub(" ", line).strip() for line in page.splitlines()] for page in text.split("\f")]
+    edges = [_page_edges(lines) if len(pages) > 1 else set() for lines in pages]
+
+    # a header, footer or page number shows up at the edge of at least
+    # repeat_min pages
+    counts: Counter = Counter()
+    for lines, edge in zip(pages, edges):
+        counts.update({_edge_key(lines[idx]) for idx in edge} - {None})
+    repeated = {key for key, count in counts.items() if count >= repeat_min}
+
+    out: List[str] = []
+    seen = set()
+    for lines, edge in zip(pages, edges):
+        for idx, line in enumerate(lines):
+            if line and not _WORD.search(line):
+                continue
+            key = _edge_key(line) if idx in edge else None
+            if key in repeated:
+                if key in seen or key == _PAGE_NUMBER_KEY:
+                    continue
+                seen.add(key)
+            if not line and (not out or not out[-1]):
+                continue
+            out.append(line)
+        if out and out[-1]:
+            out.append("")
+    return "\n".join(out).strip()
+
+
+def _line_key(line: str) -> str:
+    return " ".join(line.lower().split())
+
+
+def drop_shared_lines(text: str, reference: str, min_chars: int = 40) -> str:
+    # Removes lines of text that already appear in reference, matched per
+    # line and per sentence so a re-wrapped paste still lines up.
+    if not text or not reference:
+        return text
+    keys = {_line_key(line) for line in reference.splitlines()}
+    keys.update(_line_key(sentence) for sentence in _SENTENCE_END.split(" ".join(reference.split())))
+    keys = {key for key in keys if len(key) >= min_chars}
+    if not keys:
+        return text
+    kept = [line for line in text.splitlines() if len(line) < min_chars or _line_key(line) not in keys]
+    return "\n".join(kept).strip()
+
+
+def allocate_tokens(
+    budget: int, demands: Mapping[str, int], weights: Optional[Mapping[str, float]] = None
+) -> Dict[str, int]:
+    # Water-filling: fields that need less than their weighted share get all
+    # they need, and what they leave over is split among the rest.
+    weights = weights or {}
+    grants = {name: 0 for name in demands}
+    hungry = {name for name, need in demands.items() if need > 0}
+    remaining = max(0, budget)
+    while hungry and remaining > 0:
+        total_weight = sum(max(0.0, weights.get(name, 1.0)) for name in hungry) or float(len(hungry))
+        share = {name: remaining * max(0.0, weights.get(name, 1.0)) / total_weight for name in hungry}
+        satisfied = {name for name in hungry if demands[name] - grants[name] <= share[name]}
+        if not satisfied:
+            for name in hungry:
+                grants[name] += int(share[name])
+            break
+        for name in satisfied:
+            remaining -= demands[name] - grants[name]
+            grants[name] = demands[name]
+        hungry -= satisfied
+    return grants
+
+
+def fit_to_tokens(text: str, tokens: int) -> str:
+    limit = int(tokens * CHARS_PER_TOKEN)
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", max(0, limit - 200), limit)
+    cut = cut if cut > 0 else limit
+    return f"{text[:cut]}\n...[truncated {len(text) - cut} chars]"
+
+
+def fit_fields(
+    fields: Mapping[str, str], budget: int, weights: Optional[Mapping[str, float]] = None
+) -> Dict[str, str]:
+    grants = allocate_tokens(budget, {name: estimate_tokens(text) for name, text in fields.items()}, weights)
+    return {name: fit_to_tokens(text, grants[name]) if text else "" for name, text in fields.items()}
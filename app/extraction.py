@@ -0,0 +1,321 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Any, AsyncIterator, BinaryIO, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.offload import CpuOffload
+
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadRejected(Exception):
+    pass
+
+
+class SpooledUpload(NamedTuple):
+    filename: str
+    content_type: str
+    path: str
+    size: int
+    sha256: str
+
+
+class _FileFieldSpool:
+    # python-multipart callbacks that write one file field straight to a temp
+    # file while hashing it; every other part is skipped unread
+
+    def __init__(self, field: str, max_bytes: int, check: Callable[[str, str], Any]) -> None:
+        self.field = field.encode("utf-8")
+        self.max_bytes = max_bytes
+        self.check = check
+        self.filename = ""
+        self.content_type = ""
+        self.path: Optional[str] = None
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.writing = False
+        self._out: Optional[BinaryIO] = None
+        self._headers: Dict[bytes, bytes] = {}
+        self._name = b""
+        self._value = b""
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._name.lower()] = self._value
+        self._name = self._value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if self.path is not None or options.get(b"name") != self.field or b"filename" not in options:
+            return
+        self.filename = options[b"filename"].decode("utf-8", errors="replace")
+        self.content_type = self._headers.get(b"content-type", b"").decode("latin-1").strip()
+        # before any of the file's bytes are read
+        self.check(self.filename, self.content_type)
+        fd, self.path = tempfile.mkstemp(prefix="kham-upload-")
+        self._out = os.fdopen(fd, "wb")
+        self.writing = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self.writing or self._out is None:
+            return
+        self.size += end - start
+        if self.max_bytes > 0 and self.size > self.max_bytes:
+            raise UploadTooLarge(f"Uploaded file exceeds {self.max_bytes} bytes")
+        chunk = data[start:end]
+        self.digest.update(chunk)
+        self._out.write(chunk)
+
+    def on_part_end(self) -> None:
+        if self.writing and self._out is not None:
+            self._out.close()
+        self.writing = False
+
+    def discard(self) -> None:
+        if self._out is not None:
+            self._out.close()
+        if self.path is not None and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+async def spool_multipart(
+    content_type: str, body: AsyncIterator[bytes], field: str, max_bytes: int, check: Callable[[str, str], Any]
+) -> SpooledUpload:
+    # Parses a multipart/form-data body as it arrives. check(filename,
+    # content_type) runs when the file part's headers are in, so an upload it
+    # refuses is never read or written to disk.
+    kind, params = parse_options_header(content_type)
+    boundary = params.get(b"boundary")
+    if kind != b"multipart/form-data" or not boundary:
+        raise UploadRejected("Expected a multipart/form-data upload")
+    spool = _FileFieldSpool(field, max_bytes, check)
+    parser = MultipartParser(
+        boundary,
+        {
+            "on_part_begin": spool.on_part_begin,
+            "on_header_field": spool.on_header_field,
+            "on_header_value": spool.on_header_value,
+            "on_header_end": spool.on_header_end,
+            "on_headers_finished": spool.on_headers_finished,
+            "on_part_data": spool.on_part_data,
+            "on_part_end": spool.on_part_end,
+        },
+    )
+    try:
+        async for chunk in body:
+            parser.write(chunk)
+        parser.finalize()
+        if spool.path is None:
+            raise UploadRejected(f"No file in the '{field}' form field")
+        if spool.writing:
+            raise UploadRejected("Upload ended before the file did")
+    except BaseException:
+        spool.discard()
+        raise
+    return SpooledUpload(spool.filename, spool.content_type, spool.path, spool.size, spool.digest.hexdigest())
+
+
+def load_pdf_support() -> None:
+    # pypdf is the slowest import in the API; health checks never need it, so
+    # it loads on the first extraction (or during warm-up) instead of at startup
+    import pypdf  # noqa: F401
+
+
+def _pdf_reader(path: str) -> "PdfReader":
+    from pypdf import PdfReader
+
+    return PdfReader(path)
+
+
+def pdf_page_count(path: str) -> int:
+    return len(_pdf_reader(path).pages)
+
+
+def extract_page_range(path: str, start: int, end: int) -> List[str]:
+    reader = _pdf_reader(path)
+    return [(reader.pages[idx].extract_text() or "") for idx in range(start, end)]
+
+
+def page_ranges(page_count: int, workers: int, min_pages: int) -> List[Tuple[int, int]]:
+    if page_count <= 0:
+        return []
+    chunks = max(1, min(workers * 2, page_count // max(1, min_pages)))
+    step = -(-page_count // chunks)
+    return [(start, min(page_count, start + step)) for start in range(0, page_count, step)]
+
+
+class PdfExtractor:
+    def __init__(
+        self,
+        workers: int = 0,
+        parallel_min_pages: int = 16,
+        range_min_pages: int = 8,
+        offload: Optional[CpuOffload] = None,
+    ) -> None:
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.parallel_min_pages = parallel_min_pages
+        self.range_min_pages = range_min_pages
+        # page counts and short documents go through the shared offload;
+        # long documents are split across this extractor's own process pool
+        self.offload = offload
+        self._pool: Optional[Executor] = None
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def _offloaded(self, fn: Callable[..., Any], *args: Any, shed: bool = False) -> Any:
+        if self.offload is None:
+            return await asyncio.to_thread(fn, *args)
+        # pypdf is slow pure Python; it never runs on the event loop
+        return await self.offload.run("pdf_extract", fn, *args, shed=shed, allow_inline=False)
+
+    async def page_count(self, path: str) -> int:
+        # the first PDF stage of a request, so it is the one shed under load
+        return await self._offloaded(pdf_page_count, path, shed=True)
+
+    async def iter_pages(self, path: str, page_count: int) -> AsyncIterator[Tuple[int, List[str]]]:
+        if page_count < self.parallel_min_pages or self.workers <= 1:
+            yield 0, await self._offloaded(extract_page_range, path, 0, page_count)
+            return
+
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+
+        async def run(start: int, end: int) -> Tuple[int, List[str]]:
+            return start, await loop.run_in_executor(pool, extract_page_range, path, start, end)
+
+        tasks = [asyncio.ensure_future(run(start, end)) for start, end in page_ranges(page_count, self.workers, self.range_min_pages)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def extract(self, path: str, page_count: int) -> List[str]:
+        pages: List[str] = [""] * page_count
+        async for start, texts in self.iter_pages(path, page_count):
+            pages[start : start + len(texts)] = texts
+        return pages
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class ExtractionCache:
+    def __init__(self, directory: Optional[str], max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(directory):
+                digest, ext = os.path.splitext(name)
+                if ext == ".json" and SHA256_HEX.fullmatch(digest):
+                    stat = os.stat(os.path.join(directory, name))
+                    entries.append((stat.st_mtime, digest, stat.st_size))
+            for _, digest, size in sorted(entries):
+                self._index[digest] = size
+                self._total += size
+            self._evict()
+
+    def _path(self, digest: str) -> str:
+        assert self.directory is not None
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def contains(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._index
+
+    def get(self, digest: str) -> Optional[List[str]]:
+        if not self.directory or not SHA256_HEX.fullmatch(digest):
+            return None
+        with self._lock:
+            if digest not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(digest)
+        path = self._path(digest)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                pages = json.load(fh)["pages"]
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self._total -= self._index.pop(digest, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return pages
+
+    def put(self, digest: str, pages: List[str]) -> None:
+        if not self.directory or not SHA256_HEX.fullmatch(digest):
+            return
+        encoded = json.dumps({"pages": pages}, ensure_ascii=False).encode("utf-8")
+        if self.max_bytes > 0 and len(encoded) > self.max_bytes:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as out:
+            out.write(encoded)
+        os.replace(tmp_path, self._path(digest))
+        with self._lock:
+            self._total += len(encoded) - self._index.pop(digest, 0)
+            self._index[digest] = len(encoded)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.max_bytes > 0 and self._total > self.max_bytes and self._index:
+            digest, size = self._index.popitem(last=False)
+            self._total -= size
+            self.evictions += 1
+            try:
+                os.unlink(self._path(digest))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": bool(self.directory),
+                "entries": len(self._index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,54 @@
+import hashlib
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from app.retrieval import BM25Index
+
+SECTION_REFERENCE = re.compile(r"\b(?:section|sec\.|rule|chapter|§)[ \t]*([0-9]+[a-z]?(?:\.[0-9]+)*)", re.IGNORECASE)
+_PART_SUFFIX = re.compile(r"\s*\(part [0-9]+\)$")
+
+
+def fingerprints(units: Sequence[Tuple[str, str]]) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for label, body in units:
+        digest = hashlib.sha1(" ".join(body.split()).encode("utf-8")).hexdigest()
+        # repeated labels (two "Preamble" blocks, duplicated numbering) hash together
+        out[label] = hashlib.sha1((out.get(label, "") + digest).encode("ascii")).hexdigest() if label in out else digest
+    return out
+
+
+def changed_labels(old: Dict[str, str], new: Dict[str, str]) -> Set[str]:
+    return {label for label in old.keys() | new.keys() if old.get(label) != new.get(label)}
+
+
+def section_key(label: str) -> str:
+    return _PART_SUFFIX.sub("", label).strip().lower()
+
+
+def cited_sections(text: str) -> Set[str]:
+    return {f"section {match.group(1).lower()}" for match in SECTION_REFERENCE.finditer(text or "")}
+
+
+def rows_touched_by_sections(
+    row_texts: List[str], changed: Set[str], section_bodies: Dict[str, str], top_k: int = 2
+) -> Set[int]:
+    # A row is touched when it cites a changed section, or when it is among the
+    # rows lexically closest to the amended text (which catches gaps an
+    # amendment may now close).
+    changed_keys = {section_key(label) for label in changed}
+    touched = {idx for idx, text in enumerate(row_texts) if cited_sections(text) & changed_keys}
+    bodies = [section_bodies[label] for label in changed if label in section_bodies]
+    if bodies and row_texts:
+        index = BM25Index(row_texts)
+        for body in bodies:
+            touched.update(doc_id for doc_id, _ in index.search(body[:2000], k=top_k))
+    return touched
+
+
+def dirty_articles(old_articles: Dict[str, str], new_articles: Dict[str, str]) -> Optional[Tuple[Set[str], Set[str]]]:
+    # (changed or added, removed) article labels, or None when either side has
+    # no article structure to compare
+    if not old_articles or not new_articles:
+        return None
+    changed = {label for label in changed_labels(old_articles, new_articles) if label in new_articles}
+    return changed, set(old_articles.keys() - new_articles.keys())
@@ -0,0 +1,256 @@
+import asyncio
+import ipaddress
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    import httpx
+
+JobHandler = Callable[[Dict[str, Any], bool], Awaitable[Dict[str, Any]]]
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class RetryableJobError(Exception):
+    pass
+
+
+class JobStore:
+    # Safe to share between processes: a job is claimed with a conditional
+    # UPDATE, and the finishing writes are fenced on the attempt that claimed
+    # it, so a worker whose lease was taken over cannot overwrite the new run.
+    # All methods block; the queue calls them from a thread.
+
+    def __init__(self, path: str) -> None:
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, payload TEXT NOT NULL, "
+            "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+            "webhook_url TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL, available_at REAL NOT NULL, "
+            "started_at REAL, finished_at REAL, expires_at REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(status, available_at)")
+
+    def create(self, kind: str, payload: Dict[str, Any], max_attempts: int, webhook_url: Optional[str]) -> Dict[str, Any]:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, status, payload, max_attempts, webhook_url, created_at, updated_at, available_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload, ensure_ascii=False), max_attempts, webhook_url, now, now, now),
+            )
+        job = self.get(job_id)
+        assert job is not None
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? AND available_at <= ? ORDER BY available_at LIMIT 8",
+                (QUEUED, now),
+            ).fetchall()
+            for row in rows:
+                # another process may claim the same row between the SELECT and here
+                cur = self._db.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, updated_at = ? "
+                    "WHERE id = ? AND status = ?",
+                    (RUNNING, now, now, row["id"], QUEUED),
+                )
+                if cur.rowcount == 1:
+                    claimed = self._db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                    return dict(claimed)
+        return None
+
+    def _finish(self, job_id: str, attempt: int, assignments: str, values: Tuple[Any, ...]) -> bool:
+        with self._lock:
+            cur = self._db.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND status = ? AND attempts = ?",
+                values + (job_id, RUNNING, attempt),
+            )
+        return cur.rowcount == 1
+
+    def succeed(self, job_id: str, attempt: int, result: Dict[str, Any], ttl_seconds: float) -> bool:
+        now = time.time()
+        return self._finish(
+            job_id,
+            attempt,
+            "status = ?, result = ?, error = NULL, finished_at = ?, updated_at = ?, expires_at = ?",
+            (SUCCEEDED, json.dumps(result, ensure_ascii=False), now, now, now + ttl_seconds),
+        )
+
+    def fail(self, job_id: str, attempt: int, error: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        return self._finish(
+            job_id,
+            attempt,
+            "status = ?, error = ?, finished_at = ?, updated_at = ?, expires_at = ?",
+            (FAILED, error, now, now, now + ttl_seconds),
+        )
+
+    def retry(self, job_id: str, attempt: int, error: str, delay_seconds: float) -> bool:
+        now = time.time()
+        return self._finish(
+            job_id, attempt, "status = ?, error = ?, available_at = ?, updated_at = ?", (QUEUED, error, now + delay_seconds, now)
+        )
+
+    def requeue_stale(self, lease_seconds: float) -> int:
+        # only runs whose worker has been silent for a whole lease; the others
+        # may belong to a live process sharing the database
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, updated_at = ? WHERE status = ? AND started_at < ?",
+                (QUEUED, now, now, RUNNING, now - lease_seconds),
+            )
+        return cur.rowcount
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cur = self._db.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+        return cur.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def webhook_allowed(url: str, allowed_hosts: List[str]) -> bool:
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return False
+    host = parsed.hostname.lower()
+    if host in allowed_hosts:
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class JobQueue:
+    def __init__(
+        self,
+        store: JobStore,
+        handlers: Dict[str, JobHandler],
+        workers: int = 4,
+        result_ttl_seconds: float = 86400.0,
+        retry_base_seconds: float = 2.0,
+        poll_seconds: float = 1.0,
+        lease_seconds: float = 900.0,
+    ) -> None:
+        self.store = store
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.result_ttl_seconds = result_ttl_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._wakeup = asyncio.Event()
+        self._tasks: List["asyncio.Task[None]"] = []
+        self._http: Optional["httpx.AsyncClient"] = None
+        self._last_purge = 0.0
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def submit(self, kind: str, payload: Dict[str, Any], max_attempts: int, webhook_url: Optional[str]) -> Dict[str, Any]:
+        job = await asyncio.to_thread(self.store.create, kind, payload, max_attempts, webhook_url)
+        self._wakeup.set()
+        return job
+
+    def _sweep(self) -> None:
+        self.store.requeue_stale(self.lease_seconds)
+        self.store.purge_expired()
+
+    async def _worker(self) -> None:
+        while True:
+            if time.time() - self._last_purge > 60.0:
+                self._last_purge = time.time()
+                await asyncio.to_thread(self._sweep)
+            job = await asyncio.to_thread(self.store.claim)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        handler = self.handlers.get(job["kind"])
+        final_attempt = job["attempts"] >= job["max_attempts"]
+        try:
+            if handler is None:
+                raise ValueError(f"no handler registered for job kind '{job['kind']}'")
+            result = await handler(json.loads(job["payload"]), final_attempt)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.store.retry, job["id"], job["attempts"], "worker stopped", 0.0)
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if not final_attempt and not isinstance(e, ValueError):
+                delay = self.retry_base_seconds * (2 ** (job["attempts"] - 1))
+                await asyncio.to_thread(self.store.retry, job["id"], job["attempts"], error, delay)
+                return
+            finished = await asyncio.to_thread(self.store.fail, job["id"], job["attempts"], error, self.result_ttl_seconds)
+        else:
+            finished = await asyncio.to_thread(self.store.succeed, job["id"], job["attempts"], result, self.result_ttl_seconds)
+        # a run whose lease was taken over leaves the outcome, and the webhook, to the new one
+        if finished:
+            await self._notify(job["id"])
+
+    async def _notify(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or not job["webhook_url"] or not self._tasks:
+            return
+        # httpx is only imported once a job actually asks for a webhook
+        import httpx
+
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=10.0)
+        body = {"job_id": job_id, "kind": job["kind"], "status": job["status"], "error": job["error"]}
+        for attempt in range(3):
+            try:
+                response = await self._http.post(job["webhook_url"], json=body)
+                if response.status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5 * (2**attempt))
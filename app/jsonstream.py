@@ -0,0 +1,194 @@
+import json
+import re
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+_STRING_STOP = re.compile(r'["\\]')
+_CLOSERS = {"{": "}", "[": "]"}
+_BARE_END = frozenset(" \t\r\n,]}:")
+# a fenced block may be cut off before its closing fence
+_FENCED = re.compile(r"```(?:json)?\s*(\{.*?)(?:```|\Z)", re.DOTALL | re.IGNORECASE)
+
+
+class ArrayItemStream:
+    """Scans a JSON object as text arrives, each char once; yields complete items of one array field and can repair a truncated document."""
+
+    def __init__(self, key: Optional[str] = "results", cut_depth: int = 2) -> None:
+        self.key = key
+        self.cut_depth = cut_depth
+        self._chunks: List[str] = []
+        self._starts: List[int] = []
+        self._length = 0
+        self._stack: List[str] = []
+        self._expect_key = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._string_is_key = False
+        self._in_bare = False
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._item_start = -1
+        self._start = -1
+        self._end = -1
+        # last point where the document can be cut and closed: only values at
+        # depth <= cut_depth count, so a half-written row is never kept
+        self._cut: Optional[Tuple[int, Tuple[str, ...]]] = None
+        self.array_closed = False
+
+    @property
+    def text(self) -> str:
+        if len(self._chunks) != 1:
+            joined = "".join(self._chunks)
+            self._chunks, self._starts = [joined], [0]
+        return self._chunks[0] if self._chunks else ""
+
+    @property
+    def complete(self) -> bool:
+        return self._end >= 0
+
+    def _slice(self, start: int, end: int) -> str:
+        idx = max(0, bisect_right(self._starts, start) - 1)
+        parts: List[str] = []
+        while idx < len(self._chunks) and self._starts[idx] < end:
+            offset = self._starts[idx]
+            parts.append(self._chunks[idx][max(0, start - offset) : end - offset])
+            idx += 1
+        return "".join(parts)
+
+    def _value_done(self, pos: int) -> None:
+        if 0 < len(self._stack) <= self.cut_depth:
+            self._cut = (pos, tuple(self._stack))
+
+    def feed(self, chunk: str) -> List[Any]:
+        if not chunk:
+            return []
+        base = self._length
+        self._chunks.append(chunk)
+        self._starts.append(base)
+        self._length += len(chunk)
+        if self._end >= 0:
+            return []
+
+        items: List[Any] = []
+        stack = self._stack
+        i = 0
+        n = len(chunk)
+        while i < n:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_STOP.search(chunk, i)
+                if match is None:
+                    break
+                i = match.start()
+                if chunk[i] == "\\":
+                    self._escape = True
+                    i += 1
+                    continue
+                self._in_string = False
+                if not self._string_is_key:
+                    self._value_done(base + i + 1)
+                elif len(stack) == 1:
+                    self._last_key = self._slice(self._string_start + 1, base + i)
+                i += 1
+                continue
+
+            if self._start < 0:
+                i = chunk.find("{", i)
+                if i == -1:
+                    break
+
+            ch = chunk[i]
+            if self._in_bare:
+                if ch not in _BARE_END:
+                    i += 1
+                    continue
+                self._in_bare = False
+                self._value_done(base + i)
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = base + i
+                self._string_is_key = self._expect_key and stack[-1] == "{"
+                self._expect_key = False
+            elif ch == "{" or ch == "[":
+                if self._start < 0:
+                    self._start = base + i
+                stack.append(ch)
+                self._expect_key = ch == "{"
+                if (
+                    ch == "["
+                    and len(stack) == 2
+                    and self._last_key == self.key
+                    and self._array_depth is None
+                    and not self.array_closed
+                ):
+                    self._array_depth = 2
+                elif ch == "{" and self._array_depth is not None and len(stack) == self._array_depth + 1:
+                    self._item_start = base + i
+            elif ch == "}" or ch == "]":
+                if stack:
+                    stack.pop()
+                self._expect_key = False
+                if self._array_depth is not None:
+                    if ch == "}" and len(stack) == self._array_depth and self._item_start >= 0:
+                        try:
+                            items.append(json.loads(self._slice(self._item_start, base + i + 1), strict=False))
+                        except json.JSONDecodeError:
+                            pass
+                        self._item_start = -1
+                    elif ch == "]" and len(stack) == self._array_depth - 1:
+                        self._array_depth = None
+                        self.array_closed = True
+                if not stack:
+                    self._end = base + i + 1
+                    break
+                self._value_done(base + i + 1)
+            elif ch == ",":
+                self._expect_key = stack[-1] == "{"
+            elif ch not in _BARE_END:
+                self._in_bare = True
+            i += 1
+        return items
+
+    def repaired(self) -> Optional[Any]:
+        if self._start < 0:
+            return None
+        if self._end >= 0:
+            candidate = self._slice(self._start, self._end)
+        elif self._cut is not None:
+            pos, open_stack = self._cut
+            candidate = self._slice(self._start, pos) + "".join(_CLOSERS[c] for c in reversed(open_stack))
+        else:
+            return None
+        try:
+            return json.loads(candidate, strict=False)
+        except json.JSONDecodeError:
+            return None
+
+
+def repair_json(text: str, cut_depth: int = 2) -> Optional[Any]:
+    scanner = ArrayItemStream(key=None, cut_depth=cut_depth)
+    scanner.feed(text)
+    return scanner.repaired()
+
+
+def load_object(text: str, cut_depth: int = 2) -> Tuple[Optional[Dict[str, Any]], bool]:
+    # (object or None, whether the text needed repair); a plain module-level
+    # function so it can run in an offload worker process
+    try:
+        parsed = json.loads(text)
+        repaired = False
+    except json.JSONDecodeError:
+        # fenced, prose-wrapped or cut off mid-answer: keep everything up to
+        # the last complete top-level value and close what is still open.
+        # A fenced block goes first, since prose before it may hold braces.
+        fenced = _FENCED.search(text)
+        parsed = repair_json(fenced.group(1), cut_depth) if fenced else None
+        if not isinstance(parsed, dict):
+            parsed = repair_json(text, cut_depth)
+        repaired = True
+    return (parsed if isinstance(parsed, dict) else None), repaired
@@ -1,22 +1,305 @@
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from enum import Enum
+from functools import lru_cache
+import asyncio
 import json
+import logging
 import os
 import re
-from io import BytesIO
-from typing import Any, Dict, List, Optional, Tuple
+import tempfile
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, TypeVar
 
-import httpx
-from fastapi import FastAPI, File, HTTPException, UploadFile
+import orjson
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pypdf import PdfReader
-from pydantic import BaseModel, Field, field_validator, model_validator
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+
+from app import metrics
+from app.admission import (
+    HIGH,
+    LOW,
+    PRIORITY_NAMES,
+    AdmissionController,
+    AdmissionRejected,
+    admission_priority,
+    track_queue_wait,
+)
+from app.budget import PAGE_BREAK, compact_text, drop_shared_lines, estimate_tokens, fit_fields, fit_to_tokens
+from app.cache import ResponseCache, SingleFlight, content_key
+from app.extraction import (
+    ExtractionCache,
+    PdfExtractor,
+    SpooledUpload,
+    UploadRejected,
+    UploadTooLarge,
+    load_pdf_support,
+    spool_multipart,
+)
+from app.incremental import changed_labels, dirty_articles, fingerprints, rows_touched_by_sections
+from app.jobs import FAILED, SUCCEEDED, JobQueue, JobStore, RetryableJobError, webhook_allowed
+from app.jsonstream import ArrayItemStream, load_object
+from app.offload import CpuOffload, OffloadSaturated
+from app.payloads import DEFAULT_DATA_ROOT, DataFileReader, parse_items
+from app.plans import PlanMatch, PlanStore
+from app.relevance import KeywordMatcher, RelevanceScore
+from app.resilience import (
+    OPEN as CIRCUIT_OPEN,
+    CircuitBreaker,
+    LatencyWindow,
+    note_provider_failure,
+    parse_retry_after,
+    retry_delay,
+    track_provider_failures,
+)
+from app.responses import FastJSONResponse, RawJSON
+from app.retrieval import BM25Index
+from app.segmentation import group_articles, split_articles, split_sections
+
+if TYPE_CHECKING:
+    import httpx
 
-app = FastAPI(title="KhaM Pilot API")
+logger = logging.getLogger(__name__)
 
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+def _env_choice(name: str, default: str, choices: Tuple[str, ...]) -> str:
+    # a mistyped value falls back to the default instead of failing at import
+    value = os.getenv(name, default).strip().lower()
+    if value not in choices:
+        logger.warning("%s=%r is not one of %s; using %r", name, value, ", ".join(choices), default)
+        return default
+    return value
+
+
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "openrouter/openai/gpt-4.1-mini")
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_TIMEOUT_SECONDS = float(os.getenv("OPENROUTER_TIMEOUT_SECONDS", "45"))
+OPENROUTER_MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "200"))
+OPENROUTER_MAX_KEEPALIVE = int(os.getenv("OPENROUTER_MAX_KEEPALIVE", "50"))
+OPENROUTER_HTTP2 = os.getenv("OPENROUTER_HTTP2", "1") not in ("0", "false", "False")
+OPENROUTER_RETRIES = int(os.getenv("OPENROUTER_RETRIES", "2"))
+OPENROUTER_RETRY_BASE_SECONDS = float(os.getenv("OPENROUTER_RETRY_BASE_SECONDS", "0.5"))
+OPENROUTER_RETRY_MAX_SECONDS = float(os.getenv("OPENROUTER_RETRY_MAX_SECONDS", "8"))
+OPENROUTER_HEDGE = os.getenv("OPENROUTER_HEDGE", "0") not in ("0", "false", "False")
+OPENROUTER_HEDGE_PERCENTILE = float(os.getenv("OPENROUTER_HEDGE_PERCENTILE", "95"))
+OPENROUTER_HEDGE_MIN_SECONDS = float(os.getenv("OPENROUTER_HEDGE_MIN_SECONDS", "1"))
+OPENROUTER_HEDGE_MIN_SAMPLES = int(os.getenv("OPENROUTER_HEDGE_MIN_SAMPLES", "20"))
+
+TREATY_PROMPT_VERSION = "treaty-v3"
+TREATY_SEGMENT_CHARS = int(os.getenv("TREATY_SEGMENT_CHARS", "12000"))
+TREATY_SEGMENT_CONCURRENCY = max(1, int(os.getenv("TREATY_SEGMENT_CONCURRENCY", "4")))
+# a long treaty is analyzed in one wave of segment calls, so it is never split
+# into more groups than run at once
+TREATY_SEGMENT_MAX_GROUPS = min(
+    TREATY_SEGMENT_CONCURRENCY, int(os.getenv("TREATY_SEGMENT_MAX_GROUPS", "0")) or TREATY_SEGMENT_CONCURRENCY
+)
+LAW_RETRIEVAL_ENABLED = os.getenv("LAW_RETRIEVAL_ENABLED", "1") not in ("0", "false", "False")
+LAW_RETRIEVAL_TOP_K = int(os.getenv("LAW_RETRIEVAL_TOP_K", "3"))
+LAW_RETRIEVAL_MIN_CHARS = int(os.getenv("LAW_RETRIEVAL_MIN_CHARS", "6000"))
+LAW_RETRIEVAL_MAX_CHARS = int(os.getenv("LAW_RETRIEVAL_MAX_CHARS", "12000"))
+TREATY_PROMPT_TOKEN_BUDGET = int(os.getenv("TREATY_PROMPT_TOKEN_BUDGET", "12000"))
+CRISIS_PROMPT_TOKEN_BUDGET = int(os.getenv("CRISIS_PROMPT_TOKEN_BUDGET", "4500"))
+CRISIS_PROMPT_VERSION = "crisis-v2"
+CRISIS_GENERATION_MODE = _env_choice("CRISIS_GENERATION_MODE", "single", ("single", "sectioned"))
+INCREMENTAL_MAX_CHANGED_RATIO = float(os.getenv("INCREMENTAL_MAX_CHANGED_RATIO", "0.6"))
+FOLLOW_UP_ENABLED = os.getenv("FOLLOW_UP_ENABLED", "1") not in ("0", "false", "False")
+FOLLOW_UP_MAX_MISSING = int(os.getenv("FOLLOW_UP_MAX_MISSING", "4"))
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") not in ("0", "false", "False")
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512")),
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400")),
+    db_path=os.getenv("RESPONSE_CACHE_DB") or None,
+    db_max_entries=int(os.getenv("RESPONSE_CACHE_DB_MAX_ENTRIES", "10000")),
+)
+analysis_store = ResponseCache(
+    max_entries=int(os.getenv("ANALYSIS_STORE_MAX_ENTRIES", "256")),
+    ttl_seconds=float(os.getenv("ANALYSIS_STORE_TTL_SECONDS", str(7 * 86400))),
+    db_path=os.getenv("ANALYSIS_STORE_DB") or None,
+    db_max_entries=int(os.getenv("ANALYSIS_STORE_DB_MAX_ENTRIES", "5000")),
+)
+WARM_PLANS_DB = os.getenv("WARM_PLANS_DB", os.path.join(tempfile.gettempdir(), "kham-warm-plans.sqlite3"))
+# the store is built offline by `python -m app.warm_plans`; without it every
+# request goes to the provider
+warm_plans: Optional[PlanStore] = PlanStore(WARM_PLANS_DB) if WARM_PLANS_DB and os.path.exists(WARM_PLANS_DB) else None
+provider_flights = SingleFlight()
+provider_breaker = CircuitBreaker(
+    window_seconds=float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60")),
+    min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", "10")),
+    failure_rate=float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5")),
+    slow_call_seconds=float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "20")),
+    slow_call_rate=float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.8")),
+    open_seconds=float(os.getenv("CIRCUIT_OPEN_SECONDS", "30")),
+)
+provider_latency = LatencyWindow()
+# crisis requests and crisis jobs are high priority; treaty analysis and all
+# batches queue behind them for provider slots
+provider_admission = AdmissionController(
+    max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32")),
+    high_reserve=int(os.getenv("ADMISSION_HIGH_RESERVE", "4")),
+    max_queue_high=int(os.getenv("ADMISSION_MAX_QUEUE_HIGH", "32")),
+    max_queue_low=int(os.getenv("ADMISSION_MAX_QUEUE_LOW", "64")),
+    max_wait_high=float(os.getenv("ADMISSION_MAX_WAIT_HIGH_SECONDS", "5")),
+    max_wait_low=float(os.getenv("ADMISSION_MAX_WAIT_LOW_SECONDS", "15")),
+    retry_after=float(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2")),
+)
+
+EXTRACT_MAX_BYTES = int(os.getenv("EXTRACT_MAX_BYTES", str(50 * 1024 * 1024)))
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", "1500"))
+
+# CPU-bound stages (PDF parsing, JSON repair, relevance over long documents)
+# run here instead of on the event loop; see app.offload for the modes
+cpu_offload = CpuOffload(
+    mode=os.getenv("CPU_OFFLOAD_MODE", "thread"),
+    workers=int(os.getenv("CPU_OFFLOAD_WORKERS", "0")),
+    max_pending=int(os.getenv("CPU_OFFLOAD_MAX_PENDING", "0")),
+    inline_max_chars=int(os.getenv("CPU_OFFLOAD_INLINE_MAX_CHARS", "32768")),
+)
+
+pdf_extractor = PdfExtractor(
+    workers=int(os.getenv("EXTRACT_WORKERS", "0")),
+    parallel_min_pages=int(os.getenv("EXTRACT_PARALLEL_MIN_PAGES", "16")),
+    offload=cpu_offload,
+)
+
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(64 * 1024 * 1024)))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+BATCH_DATA_ROOT = os.getenv("BATCH_DATA_ROOT", DEFAULT_DATA_ROOT if os.path.isdir(DEFAULT_DATA_ROOT) else "") or None
+
+JOBS_DB = os.getenv("JOBS_DB", os.path.join(tempfile.gettempdir(), "kham-jobs.sqlite3"))
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "4"))
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+JOBS_RESULT_TTL_SECONDS = float(os.getenv("JOBS_RESULT_TTL_SECONDS", "86400"))
+# a running job untouched for this long is assumed to have lost its worker;
+# keep it well above the slowest job, since another process may still own it
+JOBS_LEASE_SECONDS = float(os.getenv("JOBS_LEASE_SECONDS", "900"))
+JOBS_WEBHOOK_ALLOWED_HOSTS = [
+    h.strip().lower() for h in os.getenv("JOBS_WEBHOOK_ALLOWED_HOSTS", "localhost,127.0.0.1,::1").split(",") if h.strip()
+]
+
+extraction_cache = ExtractionCache(
+    directory=os.getenv("EXTRACT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "kham-extract-cache")) or None,
+    max_bytes=int(os.getenv("EXTRACT_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+)
+
+_openrouter_client: Optional["httpx.AsyncClient"] = None
+job_queue: Optional[JobQueue] = None
+
+
+def _new_openrouter_client() -> "httpx.AsyncClient":
+    # imported here so a cold process can answer health checks before httpx
+    # (and h2) have loaded; warm-up or the first provider call pays for it
+    import httpx
+
+    return httpx.AsyncClient(
+        http2=OPENROUTER_HTTP2,
+        timeout=httpx.Timeout(OPENROUTER_TIMEOUT_SECONDS, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=OPENROUTER_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENROUTER_MAX_KEEPALIVE,
+            keepalive_expiry=60.0,
+        ),
+    )
+
+
+def _get_openrouter_client() -> "httpx.AsyncClient":
+    global _openrouter_client
+    if _openrouter_client is None or _openrouter_client.is_closed:
+        _openrouter_client = _new_openrouter_client()
+    return _openrouter_client
+
+
+# pending -> warming -> ready | degraded (a step failed; that dependency loads
+# on first use instead), or skipped when WARMUP_ENABLED is off
+warmup_state: Dict[str, Any] = {"status": "pending", "seconds": None, "steps": {}, "errors": {}}
+
+
+def _warm_fallback_tables() -> None:
+    # builds the lazy fallback tables and runs each request/response model
+    # through validation and serialization once, outside of any request
+    now = datetime.now(timezone.utc)
+    filler = "Warm-up placeholder text long enough to pass request validation."
+    for treaty_name in ("Paris Agreement", "Vienna Convention on Consular Relations", "Unknown Treaty"):
+        treaty = TreatyAnalyzeRequest.model_validate(
+            {"treaty_name": treaty_name, "treaty_text": filler, "national_law_text": filler}
+        )
+        _build_treaty_fallback(treaty, now, "warm-up").model_dump_json()
+    _treaty_fallback_json()
+    crisis = CrisisGenerateRequest.model_validate(
+        {"mission_location": "Warm-up", "crisis_type": "Warm-up", "nationals_affected": 0, "local_conditions": filler}
+    )
+    _build_crisis_fallback(crisis, now, "warm-up").model_dump_json()
+    _crisis_fallback_json()
+
+
+async def _warm_provider_client() -> None:
+    global _openrouter_client
+    # TLS context setup is the slow part, so build the client off the loop
+    client = await asyncio.to_thread(_new_openrouter_client)
+    if _openrouter_client is None or _openrouter_client.is_closed:
+        _openrouter_client = client
+    else:
+        await client.aclose()
+
+
+async def _warm_up() -> None:
+    steps: List[Tuple[str, Callable[[], Awaitable[Any]]]] = [
+        ("fallback_tables", lambda: asyncio.to_thread(_warm_fallback_tables)),
+        ("provider_client", _warm_provider_client),
+        ("pdf_support", lambda: asyncio.to_thread(load_pdf_support)),
+        ("cpu_offload", cpu_offload.prestart),
+    ]
+    warmup_state["status"] = "warming"
+    started = time.perf_counter()
+    for name, step in steps:
+        step_started = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            warmup_state["errors"][name] = f"{type(e).__name__}: {e}"
+        warmup_state["steps"][name] = round(time.perf_counter() - step_started, 4)
+    warmup_state["seconds"] = round(time.perf_counter() - started, 4)
+    warmup_state["status"] = "degraded" if warmup_state["errors"] else "ready"
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    global _openrouter_client, job_queue
+    # warm-up runs behind the first requests rather than delaying the port bind
+    warmup = asyncio.create_task(_warm_up()) if WARMUP_ENABLED else None
+    if warmup is None:
+        warmup_state["status"] = "skipped"
+    job_queue = JobQueue(
+        JobStore(JOBS_DB),
+        {"treaty": _treaty_job, "crisis": _crisis_job},
+        workers=JOBS_WORKERS,
+        result_ttl_seconds=JOBS_RESULT_TTL_SECONDS,
+        lease_seconds=JOBS_LEASE_SECONDS,
+    )
+    job_queue.start()
+    try:
+        yield
+    finally:
+        if warmup is not None and not warmup.done():
+            warmup.cancel()
+            await asyncio.gather(warmup, return_exceptions=True)
+        queue, job_queue = job_queue, None
+        await queue.stop()
+        queue.store.close()
+        client, _openrouter_client = _openrouter_client, None
+        if client is not None:
+            await client.aclose()
+        pdf_extractor.shutdown()
+        cpu_offload.shutdown()
+
+
+app = FastAPI(title="KhaM Pilot API", lifespan=lifespan)
 
 allowed_origins_env = os.getenv("ALLOWED_ORIGINS", "https://khamlabs.org,https://www.khamlabs.org")
 allowed_origins = [o.strip() for o in allowed_origins_env.split(",") if o.strip()]
@@ -30,9 +313,52 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(OffloadSaturated)
+async def offload_saturated(_: Request, exc: OffloadSaturated) -> Response:
+    # shed before any provider tokens are spent on the request
+    return FastJSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(_: Request, exc: AdmissionRejected) -> Response:
+    retry_after = str(max(1, int(exc.retry_after + 0.5)))
+    return FastJSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": retry_after})
+
+
 @app.get("/api/health")
 def health():
-    return {"ok": True}
+    return {
+        "ok": True,
+        "provider_circuit": provider_breaker.stats(),
+        "cpu_offload": cpu_offload.stats(),
+        "admission": provider_admission.stats(),
+    }
+
+
+@app.get("/api/ready")
+def ready() -> Response:
+    warming = warmup_state["status"] in ("pending", "warming")
+    return FastJSONResponse(
+        warmup_state,
+        status_code=503 if warming else 200,
+        headers={"Retry-After": "1"} if warming else None,
+    )
+
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    return {
+        "responses": response_cache.stats(),
+        "extractions": extraction_cache.stats(),
+        "analyses": analysis_store.stats(),
+        "coalescing": provider_flights.stats(),
+        "warm_plans": warm_plans.stats() if warm_plans is not None else None,
+    }
+
+
+@app.get("/api/metrics")
+def prometheus_metrics() -> Response:
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 
 class ExtractTextResponse(BaseModel):
@@ -40,43 +366,224 @@ class ExtractTextResponse(BaseModel):
     content_type: str
     extracted_text: str
     extracted_chars: int
+    sha256: Optional[str] = None
+    cache_hit: bool = False
 
 
-@app.post("/api/utils/extract-text", response_model=ExtractTextResponse)
-async def extract_text(file: UploadFile = File(...)):
-    filename = file.filename or "uploaded-file"
-    content_type = file.content_type or "application/octet-stream"
+def _upload_kind(filename: str, content_type: str) -> str:
+    filename, content_type = _upload_names(filename, content_type)
     lower = filename.lower()
+    if lower.endswith(".txt") or content_type.startswith("text/"):
+        return "txt"
+    if lower.endswith(".pdf") or content_type == "application/pdf":
+        return "pdf"
+    raise HTTPException(status_code=400, detail="Only .txt and .pdf files are supported")
+
+
+def _upload_names(filename: str, content_type: str) -> Tuple[str, str]:
+    return filename or "uploaded-file", content_type or "application/octet-stream"
+
+
+# the upload is parsed from the request stream, not by FastAPI, so the form is
+# documented here
+_UPLOAD_OPENAPI: Dict[str, Any] = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {"type": "object", "required": ["file"], "properties": {"file": {"type": "string", "format": "binary"}}}
+            }
+        },
+    }
+}
+
 
-    data = await file.read()
-    if not data:
+async def _spool_upload(request: Request) -> SpooledUpload:
+    # the type check runs on the file part's headers, before its body is read
+    try:
+        upload = await spool_multipart(
+            request.headers.get("content-type", ""), request.stream(), "file", EXTRACT_MAX_BYTES, _upload_kind
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if upload.size == 0:
+        _remove_spooled(upload.path)
         raise HTTPException(status_code=400, detail="Uploaded file is empty")
+    return upload
 
-    if lower.endswith(".txt") or content_type.startswith("text/"):
-        try:
-            text = data.decode("utf-8")
-        except UnicodeDecodeError:
-            text = data.decode("utf-8", errors="ignore")
-    elif lower.endswith(".pdf") or content_type == "application/pdf":
-        try:
-            reader = PdfReader(BytesIO(data))
-            pages: List[str] = []
-            for page in reader.pages:
-                pages.append(page.extract_text() or "")
-            text = "\n\n".join(pages).strip()
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Failed to parse PDF: {e}")
-    else:
-        raise HTTPException(status_code=400, detail="Only .txt and .pdf files are supported")
+
+def _remove_spooled(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _read_text_upload(path: str) -> str:
+    with open(path, "rb") as fh:
+        data = fh.read()
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode("utf-8", errors="ignore")
+
+
+async def _pdf_page_count(path: str) -> int:
+    try:
+        page_count = await pdf_extractor.page_count(path)
+    except OffloadSaturated:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse PDF: {e}")
+    if EXTRACT_MAX_PAGES > 0 and page_count > EXTRACT_MAX_PAGES:
+        raise HTTPException(status_code=413, detail=f"PDF has {page_count} pages; limit is {EXTRACT_MAX_PAGES}")
+    return page_count
+
+
+async def _extract_pdf_pages(path: str, digest: str) -> List[str]:
+    page_count = await _pdf_page_count(path)
+    try:
+        with metrics.stage("pdf_extract"):
+            pages = await pdf_extractor.extract(path, page_count)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse PDF: {e}")
+    await asyncio.to_thread(extraction_cache.put, digest, pages)
+    return pages
+
+
+def _extract_text_response(**fields: Any) -> FastJSONResponse:
+    # every field is built here, so skip validating extracted_text again
+    return FastJSONResponse(ExtractTextResponse.model_construct(**fields))
+
+
+@app.post("/api/utils/extract-text", response_model=ExtractTextResponse, openapi_extra=_UPLOAD_OPENAPI)
+async def extract_text(request: Request):
+    metrics.endpoint_label.set("extract_text")
+    upload = await _spool_upload(request)
+    filename, content_type = _upload_names(upload.filename, upload.content_type)
+    kind = _upload_kind(filename, content_type)
+    path, digest = upload.path, upload.sha256
+    cache_hit = False
+    try:
+        if kind == "txt":
+            text = await asyncio.to_thread(_read_text_upload, path)
+        else:
+            pages = await asyncio.to_thread(extraction_cache.get, digest)
+            cache_hit = pages is not None
+            if pages is None:
+                pages = await _extract_pdf_pages(path, digest)
+            text = PAGE_BREAK.join(pages).strip()
+    finally:
+        _remove_spooled(path)
 
     if len(text.strip()) == 0:
         raise HTTPException(status_code=400, detail="No extractable text found in file")
 
-    return ExtractTextResponse(
+    return _extract_text_response(
         filename=filename,
         content_type=content_type,
         extracted_text=text,
         extracted_chars=len(text),
+        sha256=digest,
+        cache_hit=cache_hit,
+    )
+
+
+@app.get("/api/utils/extract-text/by-hash/{sha256}", response_model=ExtractTextResponse)
+async def extract_text_by_hash(sha256: str, filename: str = "uploaded-file.pdf"):
+    digest = sha256.lower()
+    pages = await asyncio.to_thread(extraction_cache.get, digest)
+    if pages is None:
+        raise HTTPException(status_code=404, detail="Unknown file hash; upload the file to extract it")
+    text = PAGE_BREAK.join(pages).strip()
+    return _extract_text_response(
+        filename=filename,
+        content_type="application/pdf",
+        extracted_text=text,
+        extracted_chars=len(text),
+        sha256=digest,
+        cache_hit=True,
+    )
+
+
+def _ndjson(data: Dict[str, Any]) -> bytes:
+    return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE)
+
+
+async def _extract_page_stream(
+    path: str,
+    digest: str,
+    kind: str,
+    page_count: int,
+    cached_pages: Optional[List[str]],
+    filename: str,
+    content_type: str,
+) -> AsyncIterator[bytes]:
+    try:
+        yield _ndjson(
+            {
+                "type": "meta",
+                "filename": filename,
+                "content_type": content_type,
+                "pages": page_count,
+                "sha256": digest,
+                "cache_hit": cached_pages is not None,
+            }
+        )
+        extracted_chars = 0
+        if kind == "txt":
+            text = await asyncio.to_thread(_read_text_upload, path)
+            extracted_chars = len(text)
+            yield _ndjson({"type": "page", "page": 1, "text": text})
+        elif cached_pages is not None:
+            for idx, text in enumerate(cached_pages):
+                extracted_chars += len(text)
+                yield _ndjson({"type": "page", "page": idx + 1, "text": text})
+        else:
+            pages: List[str] = [""] * page_count
+            started = time.perf_counter()
+            try:
+                async for start, texts in pdf_extractor.iter_pages(path, page_count):
+                    pages[start : start + len(texts)] = texts
+                    for offset, text in enumerate(texts):
+                        extracted_chars += len(text)
+                        yield _ndjson({"type": "page", "page": start + offset + 1, "text": text})
+            except Exception as e:
+                yield _ndjson({"type": "error", "detail": f"Failed to parse PDF: {e}"})
+                return
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, endpoint="extract_text_stream", stage="pdf_extract")
+            await asyncio.to_thread(extraction_cache.put, digest, pages)
+        if extracted_chars == 0:
+            yield _ndjson({"type": "error", "detail": "No extractable text found in file"})
+            return
+        yield _ndjson({"type": "done", "pages": page_count, "extracted_chars": extracted_chars})
+    finally:
+        _remove_spooled(path)
+
+
+@app.post("/api/utils/extract-text/stream", openapi_extra=_UPLOAD_OPENAPI)
+async def extract_text_stream(request: Request) -> StreamingResponse:
+    metrics.endpoint_label.set("extract_text")
+    upload = await _spool_upload(request)
+    filename, content_type = _upload_names(upload.filename, upload.content_type)
+    kind = _upload_kind(filename, content_type)
+    path, digest = upload.path, upload.sha256
+    cached_pages: Optional[List[str]] = None
+    try:
+        if kind == "txt":
+            page_count = 1
+        else:
+            cached_pages = await asyncio.to_thread(extraction_cache.get, digest)
+            page_count = len(cached_pages) if cached_pages is not None else await _pdf_page_count(path)
+    except BaseException:
+        _remove_spooled(path)
+        raise
+
+    return StreamingResponse(
+        _extract_page_stream(path, digest, kind, page_count, cached_pages, filename, content_type),
+        media_type="application/x-ndjson",
     )
 
 
@@ -101,7 +608,23 @@ class ModeUsed(str, Enum):
     fallback = "fallback"
 
 
-def _safe_parse_json(raw_text: str) -> Optional[Dict[str, Any]]:
+class RowOrigin(str, Enum):
+    reused = "reused"
+    fresh = "fresh"
+
+
+class CrisisGenerationMode(str, Enum):
+    single = "single"
+    sectioned = "sectioned"
+
+
+class AnalysisMode(str, Enum):
+    auto = "auto"
+    single = "single"
+    segmented = "segmented"
+
+
+async def _safe_parse_json(raw_text: str) -> Optional[Dict[str, Any]]:
     if not raw_text:
         return None
 
@@ -109,33 +632,35 @@ def _safe_parse_json(raw_text: str) -> Optional[Dict[str, Any]]:
     if not raw:
         return None
 
-    candidates: List[str] = [raw]
-    fenced = re.search(r"```(?:json)?\s*(\{.*\})\s*```", raw, flags=re.DOTALL | re.IGNORECASE)
-    if fenced:
-        candidates.append(fenced.group(1).strip())
-
-    start = raw.find("{")
-    end = raw.rfind("}")
-    if start != -1 and end != -1 and end > start:
-        candidates.append(raw[start : end + 1])
-
-    for candidate in candidates:
-        try:
-            parsed = json.loads(candidate)
-        except json.JSONDecodeError:
-            continue
-        if isinstance(parsed, dict):
-            return parsed
-    return None
-
-
-def _truncate_for_prompt(text: Optional[str], limit: int = 12000) -> str:
-    if not text:
-        return "(none)"
-    trimmed = text.strip()
-    if len(trimmed) <= limit:
-        return trimmed
-    return f"{trimmed[:limit]}\n...[truncated {len(trimmed) - limit} chars]"
+    parsed, repaired = await cpu_offload.run("parse_json", load_object, raw, size=len(raw))
+    if repaired:
+        metrics.record_json_repair(parsed is not None)
+    return parsed
+
+
+async def _stream_json(scanner: ArrayItemStream) -> Optional[Dict[str, Any]]:
+    # the scanner has already walked the text, so a truncated stream is
+    # repaired from its state instead of being parsed again
+    parsed = scanner.repaired()
+    if not isinstance(parsed, dict):
+        # prose with braces ahead of a fenced block sends the scanner after
+        # the wrong object; parse the whole text as a plain completion is
+        return await _safe_parse_json(scanner.text)
+    if not scanner.complete:
+        metrics.record_json_repair(True)
+    return parsed
+
+
+def _budgeted_fields(
+    raw: Dict[str, Optional[str]], compacted: Dict[str, str], budget: int, weights: Optional[Dict[str, float]] = None
+) -> Dict[str, str]:
+    fitted = fit_fields(compacted, budget, weights)
+    metrics.record_prompt_tokens(
+        sum(map(estimate_tokens, raw.values())),
+        sum(map(estimate_tokens, compacted.values())),
+        sum(map(estimate_tokens, fitted.values())),
+    )
+    return {name: text or "(none)" for name, text in fitted.items()}
 
 
 def _coerce_string_list(value: Any, max_items: int = 10) -> List[str]:
@@ -153,34 +678,22 @@ def _coerce_string_list(value: Any, max_items: int = 10) -> List[str]:
     return out
 
 
-def _relevance_check(text: str, keywords: List[str]) -> Tuple[str, float]:
-    base = (text or "").lower()
-    if not base.strip():
-        return ("low", 0.0)
-
-    hits = 0
-    for kw in keywords:
-        if kw and kw.lower() in base:
-            hits += 1
-
-    score = min(1.0, hits / max(1, len(keywords)))
-    if score >= 0.5:
-        return ("high", score)
-    if score >= 0.2:
-        return ("medium", score)
-    return ("low", score)
-
+TREATY_KEYWORDS = KeywordMatcher(["article", "party", "agreement", "convention", "treaty", "protocol"])
+LAW_KEYWORDS = KeywordMatcher(["act", "section", "rule", "policy", "order", "law"])
+CRISIS_KEYWORDS = KeywordMatcher(
+    ["mission", "crisis", "evac", "consular", "security", "nationals", "hotline", "shelter", "roadblock", "telecom"]
+)
 
-def _openrouter_json_completion(system_prompt: str, user_prompt: str) -> Optional[Dict[str, Any]]:
-    if not OPENROUTER_API_KEY:
-        return None
 
+def _openrouter_request(
+    system_prompt: str, user_prompt: str, stream: bool = False
+) -> Tuple[Dict[str, str], Dict[str, Any]]:
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
         "Content-Type": "application/json",
     }
 
-    payload = {
+    payload: Dict[str, Any] = {
         "model": OPENROUTER_MODEL,
         "messages": [
             {"role": "system", "content": system_prompt},
@@ -189,17 +702,144 @@ def _openrouter_json_completion(system_prompt: str, user_prompt: str) -> Optiona
         "response_format": {"type": "json_object"},
         "temperature": 0.2,
     }
+    if stream:
+        payload["stream"] = True
+    return headers, payload
+
 
+def _provider_failure_reason(status: str) -> str:
+    if status.isdigit():
+        return f"provider_http_{status}"
+    return {"timeout": "provider_timeout", "circuit_open": "circuit_open"}.get(status, "provider_transport_error")
+
+
+def _hedge_delay() -> Optional[float]:
+    if not OPENROUTER_HEDGE:
+        return None
+    observed = provider_latency.percentile(OPENROUTER_HEDGE_PERCENTILE, OPENROUTER_HEDGE_MIN_SAMPLES)
+    return None if observed is None else max(OPENROUTER_HEDGE_MIN_SECONDS, observed)
+
+
+async def _openrouter_post(headers: Dict[str, str], payload: Dict[str, Any]) -> "httpx.Response":
+    client = _get_openrouter_client()
+    delay = _hedge_delay()
+    if delay is None:
+        return await client.post(OPENROUTER_API_URL, headers=headers, json=payload)
+
+    tasks = {asyncio.ensure_future(client.post(OPENROUTER_API_URL, headers=headers, json=payload))}
     try:
-        with httpx.Client(timeout=45.0) as client:
-            response = client.post(OPENROUTER_API_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            body = response.json()
-    except Exception:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        # the primary is slower than the recent p95: race a second identical
+        # request, but only in a free admission slot of its own
+        if not done and provider_admission.try_acquire(admission_priority.get()):
+            metrics.PROVIDER_HEDGES.inc(endpoint=metrics.endpoint_label.get())
+            hedge = asyncio.ensure_future(client.post(OPENROUTER_API_URL, headers=headers, json=payload))
+            hedge.add_done_callback(lambda _: provider_admission.release())
+            tasks.add(hedge)
+        pending = set(tasks)
+        unsuccessful: Optional[httpx.Response] = None
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                elif task.result().is_success:
+                    return task.result()
+                else:
+                    unsuccessful = task.result()
+        if unsuccessful is not None:
+            return unsuccessful
+        assert error is not None
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def _admit_provider_call() -> bool:
+    # every attempt queues for its own slot, so a retry backing off does not hold one
+    priority = admission_priority.get()
+    try:
+        waited = await provider_admission.acquire(priority)
+    except AdmissionRejected as e:
+        metrics.record_queue_wait(PRIORITY_NAMES[priority], e.waited)
+        metrics.record_admission_shed(PRIORITY_NAMES[priority], e.reason)
+        note_provider_failure("admission_shed")
+        provider_breaker.abandon()
+        return False
+    metrics.record_queue_wait(PRIORITY_NAMES[priority], waited)
+    return True
+
+
+async def _openrouter_post_with_retries(headers: Dict[str, str], payload: Dict[str, Any]) -> Optional["httpx.Response"]:
+    import httpx
+
+    attempt = 0
+    while True:
+        if not await _admit_provider_call():
+            return None
+        status = "error"
+        response: Optional[httpx.Response] = None
+        started = time.perf_counter()
+        try:
+            with metrics.stage("provider_call"):
+                response = await _openrouter_post(headers, payload)
+            status = str(response.status_code)
+        except httpx.TimeoutException:
+            status = "timeout"
+        except Exception:
+            pass
+        finally:
+            provider_admission.release()
+            metrics.record_provider_status(status)
+        elapsed = time.perf_counter() - started
+
+        if response is not None and response.is_success:
+            provider_breaker.record(True, elapsed)
+            provider_latency.observe(elapsed)
+            return response
+
+        provider_breaker.record(False, elapsed)
+        retryable = (response is None and status != "timeout") or status == "429" or status.startswith("5")
+        if not retryable or attempt >= OPENROUTER_RETRIES or not provider_breaker.allow():
+            note_provider_failure(_provider_failure_reason(status))
+            return None
+        retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        await asyncio.sleep(retry_delay(attempt, OPENROUTER_RETRY_BASE_SECONDS, OPENROUTER_RETRY_MAX_SECONDS, retry_after))
+        metrics.PROVIDER_RETRIES.inc(endpoint=metrics.endpoint_label.get(), status=status)
+        attempt += 1
+
+
+async def _openrouter_json_completion(system_prompt: str, user_prompt: str) -> Optional[Dict[str, Any]]:
+    if not OPENROUTER_API_KEY:
+        return None
+    if not provider_breaker.allow():
+        metrics.record_provider_status("circuit_open")
+        note_provider_failure("circuit_open")
+        return None
+
+    headers, payload = _openrouter_request(system_prompt, user_prompt)
+    try:
+        response = await _openrouter_post_with_retries(headers, payload)
+    except asyncio.CancelledError:
+        # cancelled while queued, in flight or backing off: nothing was
+        # learned about the provider, but a half-open probe must be freed
+        provider_breaker.abandon()
+        raise
+    if response is None:
+        return None
+
+    try:
+        body = response.json()
+    except ValueError:
+        note_provider_failure("provider_invalid_body")
         return None
 
-    choices = body.get("choices", [])
+    choices = body.get("choices", []) if isinstance(body, dict) else []
     if not choices:
+        note_provider_failure("provider_empty_response")
         return None
 
     content: Any = choices[0].get("message", {}).get("content", "")
@@ -210,7 +850,86 @@ def _openrouter_json_completion(system_prompt: str, user_prompt: str) -> Optiona
     if not isinstance(content, str):
         content = str(content)
 
-    return _safe_parse_json(content)
+    with metrics.stage("parse_json"):
+        parsed = await _safe_parse_json(content)
+    if parsed is None:
+        note_provider_failure("provider_invalid_json")
+    return parsed
+
+
+async def _openrouter_stream_completion(system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+    if not OPENROUTER_API_KEY:
+        return
+    if not provider_breaker.allow():
+        metrics.record_provider_status("circuit_open")
+        note_provider_failure("circuit_open")
+        return
+
+    import httpx
+
+    headers, payload = _openrouter_request(system_prompt, user_prompt, stream=True)
+    try:
+        admitted = await _admit_provider_call()
+    except (GeneratorExit, asyncio.CancelledError):
+        provider_breaker.abandon()
+        raise
+    if not admitted:
+        return
+
+    status = "error"
+    ok = False
+    abandoned = False
+    started = time.perf_counter()
+    try:
+        async with _get_openrouter_client().stream("POST", OPENROUTER_API_URL, headers=headers, json=payload) as response:
+            status = str(response.status_code)
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    event = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                choices = event.get("choices") or []
+                if not choices:
+                    continue
+                delta = choices[0].get("delta", {}).get("content")
+                if isinstance(delta, str) and delta:
+                    yield delta
+            ok = True
+    except httpx.TimeoutException:
+        status = "timeout"
+    except (GeneratorExit, asyncio.CancelledError):
+        # the consumer went away; that says nothing about provider health,
+        # but a half-open probe must be freed for the next caller
+        abandoned = True
+        provider_breaker.abandon()
+        raise
+    except Exception:
+        return
+    finally:
+        elapsed = time.perf_counter() - started
+        if not abandoned:
+            provider_breaker.record(ok, elapsed)
+        if not ok and not abandoned:
+            note_provider_failure(_provider_failure_reason(status))
+        provider_admission.release()
+        metrics.record_provider_status(status)
+        metrics.STAGE_SECONDS.observe(elapsed, endpoint=metrics.endpoint_label.get(), stage="provider_call")
+
+
+def _fallback_reason(failures: List[str]) -> Optional[str]:
+    if not OPENROUTER_API_KEY:
+        return None
+    if not failures:
+        return "provider_response_incomplete"
+    if failures[-1] in ("circuit_open", "admission_shed"):
+        return failures[-1]
+    return f"{failures[-1]} (circuit {provider_breaker.state})"
 
 
 class TreatyAnalyzeRequest(StrictSchema):
@@ -220,6 +939,9 @@ class TreatyAnalyzeRequest(StrictSchema):
     law_doc_text: Optional[str] = Field(default=None, max_length=240000)
     treaty_name: str = Field(default="Unknown Treaty", min_length=1, max_length=255)
     law_name: str = Field(default="Unknown Law", min_length=1, max_length=255)
+    analysis_mode: AnalysisMode = AnalysisMode.auto
+    # analysis_id of an earlier AI analysis of the same treaty and law
+    previous_analysis_id: Optional[str] = Field(default=None, pattern=r"^[0-9a-f]{32}$")
 
     @field_validator("treaty_text", "national_law_text", "treaty_name", "law_name")
     @classmethod
@@ -258,6 +980,7 @@ class TreatyAnalysisResult(StrictSchema):
     recommendation: str
     confidence: float = Field(..., ge=0.0, le=1.0)
     confidence_rationale: str
+    origin: Optional[RowOrigin] = None
 
 
 class QualityGate(StrictSchema):
@@ -270,6 +993,9 @@ class TreatyAnalyzeResponse(StrictSchema):
     law: str
     generated_at: str
     reference_no: str
+    # set on AI analyses, which are kept for incremental re-analysis
+    analysis_id: Optional[str] = None
+    previous_reference_no: Optional[str] = None
     mode_used: ModeUsed
     fallback_reason: Optional[str] = None
     relevance_status: str = "medium"
@@ -284,11 +1010,9 @@ class TreatyAnalyzeResponse(StrictSchema):
     results: List[TreatyAnalysisResult] = Field(default_factory=list)
 
 
-def _pick_treaty_rows(treaty_name: str, law_name: str) -> List[TreatyAnalysisResult]:
-    tn = treaty_name.lower()
-
-    if "paris" in tn or "unfccc" in tn or "kyoto" in tn:
-        return [
+def _fallback_row_table(law_name: str) -> Dict[str, List[TreatyAnalysisResult]]:
+    return {
+        "climate": [
             TreatyAnalysisResult(treaty_article="Article 4", obligation="Prepare, communicate, and maintain NDCs.", treaty_clause_text="Each Party shall prepare, communicate and maintain successive nationally determined contributions.", national_mapping=f"{law_name}: climate planning instruments mention mitigation commitments.", domestic_clause_text=f"{law_name}: mitigation duties exist but NDC preparation cadence is not explicitly codified.", status=ComplianceStatus.partial, severity=SeverityLevel.high, recommendation="MoEFCC to issue NDC preparation and update rules by gazette notification.", confidence=0.79, confidence_rationale="Domestic language captures mitigation intent but lacks explicit statutory NDC drafting trigger."),
             TreatyAnalysisResult(treaty_article="Article 5", obligation="Conserve and enhance sinks and reservoirs.", treaty_clause_text="Parties should take action to conserve and enhance sinks and reservoirs of greenhouse gases.", national_mapping=f"{law_name}: forestry and conservation references exist across policy instruments.", domestic_clause_text=f"{law_name}: enforceable sink accounting and MRV obligations are not explicit.", status=ComplianceStatus.partial, severity=SeverityLevel.medium, recommendation="Forest Department and DoE to publish sink accounting protocol with annual disclosure.", confidence=0.73, confidence_rationale="Programmatic alignment exists; direct legal MRV mandate is incomplete."),
             TreatyAnalysisResult(treaty_article="Article 6", obligation="Support cooperative approaches and robust accounting.", treaty_clause_text="Parties engaging on a voluntary basis in cooperative approaches shall promote sustainable development and ensure environmental integrity.", national_mapping="Carbon market governance references are fragmented.", domestic_clause_text="No consolidated legal framework for Article 6 accounting integrity was identified.", status=ComplianceStatus.gap, severity=SeverityLevel.high, recommendation="MoEFCC and Ministry of Finance to draft Article 6 market participation regulation.", confidence=0.68, confidence_rationale="Explicit domestic transposition language appears absent in provided text."),
@@ -297,10 +1021,8 @@ def _pick_treaty_rows(treaty_name: str, law_name: str) -> List[TreatyAnalysisRes
             TreatyAnalysisResult(treaty_article="Article 10", obligation="Promote technology development and transfer.", treaty_clause_text="Parties share a long-term vision on the importance of fully realizing technology development and transfer.", national_mapping="Technology cooperation appears in planning documents.", domestic_clause_text="No binding domestic implementation timetable for technology transfer was found.", status=ComplianceStatus.partial, severity=SeverityLevel.medium, recommendation="BIDA and MoEFCC to issue technology-transfer implementation roadmap with milestones.", confidence=0.69, confidence_rationale="Intentional alignment exists without binding timeline obligations."),
             TreatyAnalysisResult(treaty_article="Article 13", obligation="Provide transparency reports to track progress.", treaty_clause_text="Each Party shall provide information necessary to track progress made in implementing and achieving its NDC.", national_mapping="Administrative reporting exists.", domestic_clause_text="Statutory annual transparency reporting requirement is not explicit.", status=ComplianceStatus.gap, severity=SeverityLevel.high, recommendation="MoEFCC to codify annual ETF reporting duty and designate accountable directorate.", confidence=0.72, confidence_rationale="Practice-level reporting exists but enforceable legal wording is limited."),
             TreatyAnalysisResult(treaty_article="Article 14", obligation="Participate in global stocktake and align domestic cycle.", treaty_clause_text="The Conference of the Parties serving as the meeting of the Parties to this Agreement shall periodically take stock.", national_mapping="Domestic review mechanisms are present but not synchronized to stocktake cycle.", domestic_clause_text="No explicit legal trigger aligning domestic review cycle to global stocktake timeline was found.", status=ComplianceStatus.partial, severity=SeverityLevel.medium, recommendation="Cabinet Division and MoEFCC to set statutory review cycle aligned with global stocktake.", confidence=0.71, confidence_rationale="Review architecture exists but legal synchronization clause is missing."),
-        ]
-
-    if "vienna convention on consular" in tn:
-        return [
+        ],
+        "consular": [
             TreatyAnalysisResult(treaty_article="Article 5", obligation="Perform core consular functions.", treaty_clause_text="Consular functions consist in protecting interests and assisting nationals.", national_mapping=f"{law_name}: broad consular authority framework exists.", domestic_clause_text=f"{law_name}: function-level authority exists, but mission SOP depth is uneven.", status=ComplianceStatus.partial, severity=SeverityLevel.medium, recommendation="MoFA Consular Wing to issue mandatory mission SOP baseline.", confidence=0.76, confidence_rationale="Authority is explicit, standardization duty is incomplete."),
             TreatyAnalysisResult(treaty_article="Article 8", obligation="Perform consular functions in third state when authorized.", treaty_clause_text="Upon appropriate notification, a consular post may perform functions in a third State.", national_mapping="Third-state contingency practice exists.", domestic_clause_text="No unified legal protocol for third-state activation timelines was found.", status=ComplianceStatus.partial, severity=SeverityLevel.medium, recommendation="MoFA Legal Affairs to formalize third-state consular activation SOP.", confidence=0.69, confidence_rationale="Operational practice is plausible; explicit legal standard is limited."),
             TreatyAnalysisResult(treaty_article="Article 23", obligation="Consular officers may be declared persona non grata; response readiness required.", treaty_clause_text="The receiving State may notify that a consular officer is persona non grata.", national_mapping="Diplomatic response pathways exist.", domestic_clause_text="Mission continuity protocol after persona non grata action is not fully codified.", status=ComplianceStatus.partial, severity=SeverityLevel.medium, recommendation="MoFA to codify mission continuity checklist for persona non grata scenarios.", confidence=0.67, confidence_rationale="Framework exists but procedural legal detail is incomplete."),
@@ -309,12 +1031,51 @@ def _pick_treaty_rows(treaty_name: str, law_name: str) -> List[TreatyAnalysisRes
             TreatyAnalysisResult(treaty_article="Article 36", obligation="Enable consular communication/access for detained nationals.", treaty_clause_text="Consular officers shall be free to communicate with nationals and have access to them.", national_mapping="Detention support is recognized in practice.", domestic_clause_text="Uniform 24-hour notification and escalation SLA is not codified.", status=ComplianceStatus.partial, severity=SeverityLevel.high, recommendation="MoFA Consular Wing to impose 24-hour detention notification SLA with auditable logs.", confidence=0.73, confidence_rationale="Legal principle maps strongly; SLA-level domestic language is missing."),
             TreatyAnalysisResult(treaty_article="Article 37", obligation="Receive notification in guardianship/death/wreck cases.", treaty_clause_text="If relevant information is available, authorities shall inform the consular post.", national_mapping="Incident notification channels exist.", domestic_clause_text="Case-type specific notification forms and timelines are not standardized.", status=ComplianceStatus.partial, severity=SeverityLevel.medium, recommendation="MoFA to standardize incident notification templates for Article 37 triggers.", confidence=0.68, confidence_rationale="Duty is reflected broadly, but procedural precision is limited."),
             TreatyAnalysisResult(treaty_article="Article 55", obligation="Respect laws/regulations of receiving state while exercising functions.", treaty_clause_text="Without prejudice to privileges and immunities, all persons enjoying such privileges and immunities have a duty to respect the laws.", national_mapping="Conduct compliance guidance exists.", domestic_clause_text="Mission-level annual legal compliance refresher requirement is not mandatory.", status=ComplianceStatus.partial, severity=SeverityLevel.low, recommendation="MoFA to require annual legal compliance certification for mission staff.", confidence=0.71, confidence_rationale="Behavioral compliance exists; annual formalization requirement is not explicit."),
-        ]
+        ],
+        "generic": [
+            TreatyAnalysisResult(treaty_article=f"Article {idx}", obligation="Implement treaty commitments in good faith with article-level domestic transposition.", treaty_clause_text="State Parties shall adopt measures necessary to give effect to treaty obligations.", national_mapping=f"{law_name}: broad alignment language exists in available material.", domestic_clause_text=f"{law_name}: explicit section-level transposition for this article is not clearly evidenced.", status=ComplianceStatus.partial, severity=SeverityLevel.medium if idx % 2 == 0 else SeverityLevel.high, recommendation="Relevant line ministry and Law Ministry to issue article-specific implementing instruction.", confidence=0.66, confidence_rationale="Assessment is generalized due to limited article-specific legal text in the provided excerpts.")
+            for idx in range(1, 9)
+        ],
+    }
+
+
+_LAW_PLACEHOLDER = "\x00law\x00"
+
+
+# The fallback tables below are built on first use (normally by warm-up), not
+# at import, so a cold process reaches its first health check sooner.
+@lru_cache(maxsize=None)
+def _treaty_fallback_rows() -> Dict[str, Tuple[TreatyAnalysisResult, ...]]:
+    return {family: tuple(rows) for family, rows in _fallback_row_table(_LAW_PLACEHOLDER).items()}
+
+
+def _treaty_family(treaty_name: str) -> str:
+    tn = treaty_name.lower()
+    if "paris" in tn or "unfccc" in tn or "kyoto" in tn:
+        return "climate"
+    if "vienna convention on consular" in tn:
+        return "consular"
+    return "generic"
+
+
+@lru_cache(maxsize=256)
+def _fallback_rows(family: str, law_name: str) -> Tuple[TreatyAnalysisResult, ...]:
+    return tuple(
+        row.model_copy(
+            update={k: v.replace(_LAW_PLACEHOLDER, law_name) for k, v in row.__dict__.items() if isinstance(v, str) and _LAW_PLACEHOLDER in v}
+        )
+        for row in _treaty_fallback_rows()[family]
+    )
+
+
+def _pick_treaty_rows(treaty_name: str, law_name: str) -> List[TreatyAnalysisResult]:
+    # the cached rows are shared by every fallback; responses get their own
+    # copies so setting origin or editing a row cannot leak into later ones
+    return [row.model_copy() for row in _fallback_rows(_treaty_family(treaty_name), law_name)]
 
-    return [
-        TreatyAnalysisResult(treaty_article=f"Article {idx}", obligation="Implement treaty commitments in good faith with article-level domestic transposition.", treaty_clause_text="State Parties shall adopt measures necessary to give effect to treaty obligations.", national_mapping=f"{law_name}: broad alignment language exists in available material.", domestic_clause_text=f"{law_name}: explicit section-level transposition for this article is not clearly evidenced.", status=ComplianceStatus.partial, severity=SeverityLevel.medium if idx % 2 == 0 else SeverityLevel.high, recommendation="Relevant line ministry and Law Ministry to issue article-specific implementing instruction.", confidence=0.66, confidence_rationale="Assessment is generalized due to limited article-specific legal text in the provided excerpts.")
-        for idx in range(1, 9)
-    ]
+
+def _spliced_json(model: BaseModel, static_fields: FrozenSet[str], static_json: str) -> str:
+    return f"{model.model_dump_json(exclude=static_fields)[:-1]},{static_json}}}"
 
 
 def _coerce_treaty_results(raw_results: Any) -> List[TreatyAnalysisResult]:
@@ -405,43 +1166,198 @@ def _normalize_30_60_90_actions(actions: List[str]) -> List[str]:
     return out
 
 
-def _build_treaty_fallback(payload: TreatyAnalyzeRequest, now: datetime, ref: str) -> TreatyAnalyzeResponse:
-    results = _pick_treaty_rows(payload.treaty_name, payload.law_name)
-    top_gaps = [
-        f"{r.treaty_article}: {r.recommendation}" for r in results if r.status != ComplianceStatus.compliant
-    ][:5]
+_TREATY_FALLBACK_STATIC = frozenset({"top_urgent_gaps", "action_list_30_60_90", "human_review_disclaimer", "results"})
+
+
+@lru_cache(maxsize=None)
+def _treaty_fallback_templates() -> Dict[str, TreatyAnalyzeResponse]:
+    return {
+        family: TreatyAnalyzeResponse(
+            treaty="",
+            law=_LAW_PLACEHOLDER,
+            generated_at="",
+            reference_no="",
+            mode_used=ModeUsed.fallback,
+            fallback_reason="openrouter_unavailable_or_invalid_response",
+            executive_summary="",
+            top_urgent_gaps=[f"{r.treaty_article}: {r.recommendation}" for r in rows if r.status != ComplianceStatus.compliant][:5],
+            action_list_30_60_90=_normalize_30_60_90_actions([
+                "30 days: MoEFCC and Ministry of Law convene legal focal points and validate each article-to-clause mapping with annexed source text.",
+                "60 days: MoEFCC issues draft ministerial circular package for high-severity gaps with named implementing authorities.",
+                "90 days: Cabinet Division publishes compliance roadmap, review dashboard, and international review briefing schedule.",
+            ]),
+            human_review_disclaimer=(
+                "Fallback mode generated this report without successful live LLM completion. Treat as structured draft and validate by legal officers before policy action."
+            ),
+            quality_gate=QualityGate(passed=True, reasons=[]),
+            results=list(rows),
+        )
+        for family, rows in _treaty_fallback_rows().items()
+    }
 
-    return TreatyAnalyzeResponse(
-        treaty=payload.treaty_name,
-        law=payload.law_name,
-        generated_at=now.isoformat(),
-        reference_no=ref,
-        mode_used=ModeUsed.fallback,
-        fallback_reason="openrouter_unavailable_or_invalid_response",
-        executive_summary=(
-            "Detailed fallback analysis indicates partial treaty alignment with concrete policy exposure areas. "
-            f"Input coverage: treaty excerpt {len(payload.treaty_text)} chars; treaty doc {len(payload.treaty_doc_text or '')} chars; "
-            f"national instrument excerpt {len(payload.national_law_text)} chars; law doc {len(payload.law_doc_text or '')} chars."
-        ),
-        top_urgent_gaps=top_gaps,
-        action_list_30_60_90=_normalize_30_60_90_actions([
-            "30 days: MoEFCC and Ministry of Law convene legal focal points and validate each article-to-clause mapping with annexed source text.",
-            "60 days: MoEFCC issues draft ministerial circular package for high-severity gaps with named implementing authorities.",
-            "90 days: Cabinet Division publishes compliance roadmap, review dashboard, and international review briefing schedule.",
-        ]),
-        human_review_disclaimer=(
-            "Fallback mode generated this report without successful live LLM completion. Treat as structured draft and validate by legal officers before policy action."
-        ),
-        quality_gate=QualityGate(passed=True, reasons=[]),
-        results=results,
+
+@lru_cache(maxsize=None)
+def _treaty_fallback_json() -> Dict[str, str]:
+    return {
+        family: template.model_dump_json(include=_TREATY_FALLBACK_STATIC)[1:-1]
+        for family, template in _treaty_fallback_templates().items()
+    }
+
+
+_LAW_PLACEHOLDER_JSON = json.dumps(_LAW_PLACEHOLDER)[1:-1]
+
+
+def _build_treaty_fallback(
+    payload: TreatyAnalyzeRequest, now: datetime, ref: str, reason: Optional[str] = None
+) -> TreatyAnalyzeResponse:
+    template = _treaty_fallback_templates()[_treaty_family(payload.treaty_name)]
+    return template.model_copy(
+        update={
+            "fallback_reason": reason or template.fallback_reason,
+            "treaty": payload.treaty_name,
+            "law": payload.law_name,
+            "generated_at": now.isoformat(),
+            "reference_no": ref,
+            "executive_summary": (
+                "Detailed fallback analysis indicates partial treaty alignment with concrete policy exposure areas. "
+                f"Input coverage: treaty excerpt {len(payload.treaty_text)} chars; treaty doc {len(payload.treaty_doc_text or '')} chars; "
+                f"national instrument excerpt {len(payload.national_law_text)} chars; law doc {len(payload.law_doc_text or '')} chars."
+            ),
+            "top_urgent_gaps": list(template.top_urgent_gaps),
+            "action_list_30_60_90": list(template.action_list_30_60_90),
+            "results": _pick_treaty_rows(payload.treaty_name, payload.law_name),
+        }
     )
 
 
-def _build_treaty_ai_response(
-    payload: TreatyAnalyzeRequest, now: datetime, ref: str
-) -> Optional[TreatyAnalyzeResponse]:
-    ai_json = _openrouter_json_completion(
-        system_prompt=(
+def _treaty_response_json(response: TreatyAnalyzeResponse) -> str:
+    with metrics.stage("serialization"):
+        if response.mode_used != ModeUsed.fallback:
+            return response.model_dump_json()
+        static_json = _treaty_fallback_json()[_treaty_family(response.treaty)]
+        law_json = json.dumps(response.law, ensure_ascii=False)[1:-1]
+        return _spliced_json(response, _TREATY_FALLBACK_STATIC, static_json.replace(_LAW_PLACEHOLDER_JSON, law_json))
+
+
+def _treaty_prompt_fields(payload: TreatyAnalyzeRequest) -> Dict[str, str]:
+    treaty_text = compact_text(payload.treaty_text)
+    law_text = compact_text(payload.national_law_text)
+    return {
+        "treaty_text": treaty_text,
+        "treaty_doc_text": drop_shared_lines(compact_text(payload.treaty_doc_text), treaty_text),
+        "national_law_text": law_text,
+        "law_doc_text": drop_shared_lines(compact_text(payload.law_doc_text), law_text),
+    }
+
+
+def _law_source(payload: TreatyAnalyzeRequest) -> str:
+    fields = _treaty_prompt_fields(payload)
+    return "\n\n".join(text for text in (fields["national_law_text"], fields["law_doc_text"]) if text)
+
+
+@lru_cache(maxsize=32)
+def _law_index(law_text: str) -> Tuple[List[Tuple[str, str]], BM25Index]:
+    sections = split_sections(law_text)
+    return sections, BM25Index([f"{label}\n{body}" for label, body in sections])
+
+
+def _retrieve_law_clauses(payload: TreatyAnalyzeRequest, treaty_text: str) -> Optional[str]:
+    if not LAW_RETRIEVAL_ENABLED:
+        return None
+    law_text = _law_source(payload)
+    if len(law_text) < LAW_RETRIEVAL_MIN_CHARS:
+        return None
+    sections, index = _law_index(law_text)
+    if len(sections) < 2:
+        return None
+
+    articles = [(label, body) for label, body in split_articles(treaty_text) if label != "Preamble"]
+    top_k = LAW_RETRIEVAL_TOP_K
+    if not articles:
+        articles = [("Treaty text", treaty_text)]
+        top_k = LAW_RETRIEVAL_TOP_K * 4
+
+    ranked: List[Tuple[str, List[int]]] = []
+    for label, body in articles:
+        hits = [doc_id for doc_id, _ in index.search(body[:2000], k=top_k)]
+        if hits:
+            ranked.append((label, hits))
+    if not ranked:
+        return None
+
+    chosen: List[int] = []
+    used = 0
+    for rank in range(top_k):
+        for _, hits in ranked:
+            if rank >= len(hits) or hits[rank] in chosen:
+                continue
+            size = len(sections[hits[rank]][1])
+            if used + size > LAW_RETRIEVAL_MAX_CHARS and chosen:
+                continue
+            chosen.append(hits[rank])
+            used += size
+
+    clause_lines = [f"[{sections[doc_id][0]}]\n{sections[doc_id][1]}" for doc_id in sorted(chosen)]
+    mapping_lines = [
+        f"{label}: {', '.join(sections[doc_id][0] for doc_id in hits if doc_id in chosen)}"
+        for label, hits in ranked
+    ]
+    return (
+        f"Retrieved domestic clauses (top {top_k} lexical matches per treaty article from {len(sections)} law sections):\n"
+        + "\n\n".join(clause_lines)
+        + "\n\nCandidate domestic clauses by treaty article:\n"
+        + "\n".join(mapping_lines)
+        + "\n"
+    )
+
+
+_LAW_FIELDS = ("national_law_text", "law_doc_text")
+
+
+def _law_excerpt_block(texts: Dict[str, str]) -> str:
+    return f"National law excerpt:\n{texts['national_law_text']}\n\nLaw document text:\n{texts['law_doc_text']}\n"
+
+
+def _law_prompt_block(payload: TreatyAnalyzeRequest, treaty_text: str, budget: int) -> str:
+    retrieved = _retrieve_law_clauses(payload, treaty_text)
+    if retrieved is not None:
+        return retrieved
+    fields = _treaty_prompt_fields(payload)
+    return _law_excerpt_block(
+        _budgeted_fields({name: getattr(payload, name) for name in _LAW_FIELDS}, {name: fields[name] for name in _LAW_FIELDS}, budget)
+    )
+
+
+_TREATY_RESULTS_SCHEMA = (
+    '  "results": [\n'
+    "    {\n"
+    '      "treaty_article": string,\n'
+    '      "obligation": string,\n'
+    '      "treaty_clause_text": string,\n'
+    '      "national_mapping": string,\n'
+    '      "domestic_clause_text": string,\n'
+    '      "status": "compliant" | "partial" | "gap",\n'
+    '      "severity": "low" | "medium" | "high",\n'
+    '      "recommendation": string,\n'
+    '      "confidence": number,\n'
+    '      "confidence_rationale": string\n'
+    "    }\n"
+    "  ]\n"
+)
+
+
+def _treaty_prompts(payload: TreatyAnalyzeRequest) -> Tuple[str, str]:
+    fields = _treaty_prompt_fields(payload)
+    retrieved = _retrieve_law_clauses(payload, f"{fields['treaty_text'][:12000]}\n\n{fields['treaty_doc_text'][:12000]}")
+    names = ["treaty_text", "treaty_doc_text"] + ([] if retrieved is not None else list(_LAW_FIELDS))
+    texts = _budgeted_fields(
+        {name: getattr(payload, name) for name in names},
+        {name: fields[name] for name in names},
+        TREATY_PROMPT_TOKEN_BUDGET - estimate_tokens(retrieved),
+    )
+    law_block = retrieved if retrieved is not None else _law_excerpt_block(texts)
+    return (
+        (
             "You are a senior legal compliance analyst embedded in the Ministry of Foreign Affairs of Bangladesh. "
             "You specialize in mapping international treaty obligations to domestic legislative and regulatory frameworks. "
             "Return only valid JSON. No markdown, no code fences, no text outside JSON. "
@@ -456,42 +1372,37 @@ def _build_treaty_ai_response(
             "Order top_urgent_gaps by highest severity then lowest confidence. "
             "You must complete full JSON object; do not truncate or summarize. Incomplete JSON causes system error."
         ),
-        user_prompt=(
+        (
             "Build a treaty compliance analysis JSON using this schema:\n"
             "{\n"
             '  "executive_summary": string,\n'
             '  "top_urgent_gaps": string[],\n'
             '  "action_list_30_60_90": string[],\n'
             '  "human_review_disclaimer": string,\n'
-            '  "results": [\n'
-            "    {\n"
-            '      "treaty_article": string,\n'
-            '      "obligation": string,\n'
-            '      "treaty_clause_text": string,\n'
-            '      "national_mapping": string,\n'
-            '      "domestic_clause_text": string,\n'
-            '      "status": "compliant" | "partial" | "gap",\n'
-            '      "severity": "low" | "medium" | "high",\n'
-            '      "recommendation": string,\n'
-            '      "confidence": number,\n'
-            '      "confidence_rationale": string\n'
-            "    }\n"
-            "  ]\n"
+            f"{_TREATY_RESULTS_SCHEMA}"
             "}\n\n"
             "Hard constraints: analyze minimum 8 treaty articles; include exact side-by-side citations; do not finalize unless 30/60/90 action slots are all present with named authorities.\n\n"
             f"Treaty Name: {payload.treaty_name}\n"
             f"Law Name: {payload.law_name}\n\n"
-            f"Treaty excerpt:\n{_truncate_for_prompt(payload.treaty_text)}\n\n"
-            f"Treaty document text:\n{_truncate_for_prompt(payload.treaty_doc_text)}\n\n"
-            f"National law excerpt:\n{_truncate_for_prompt(payload.national_law_text)}\n\n"
-            f"Law document text:\n{_truncate_for_prompt(payload.law_doc_text)}\n"
+            f"Treaty excerpt:\n{texts['treaty_text']}\n\n"
+            f"Treaty document text:\n{texts['treaty_doc_text']}\n\n"
+            f"{law_block}"
         ),
     )
 
+
+def _treaty_response_from_json(
+    payload: TreatyAnalyzeRequest,
+    ai_json: Optional[Dict[str, Any]],
+    now: datetime,
+    ref: str,
+    results: Optional[List[TreatyAnalysisResult]] = None,
+) -> Optional[TreatyAnalyzeResponse]:
     if not ai_json:
         return None
 
-    results = _coerce_treaty_results(ai_json.get("results"))
+    if results is None:
+        results = _coerce_treaty_results(ai_json.get("results"))
     if len(results) < 8:
         return None
 
@@ -518,46 +1429,674 @@ def _build_treaty_ai_response(
     )
 
 
-def _build_treaty_quality_gate(response: TreatyAnalyzeResponse) -> QualityGate:
-    reasons: List[str] = []
+def _treaty_follow_up_source(payload: TreatyAnalyzeRequest, rows: List[TreatyAnalysisResult]) -> Optional[str]:
+    # the articles the first pass left out, or the whole (compacted) treaty
+    # when it has no article headings to pick from
+    need = 8 - len(rows)
+    if not FOLLOW_UP_ENABLED or not rows or need <= 0 or need > FOLLOW_UP_MAX_MISSING:
+        return None
+    articles = _treaty_articles(payload)
+    if not articles:
+        return _treaty_segment_source(payload) or None
+    covered = {_article_key(row.treaty_article) for row in rows}
+    missing = [body for label, body in articles if _article_key(label) not in covered]
+    return "\n\n".join(missing[: need + 2]) or None
+
+
+async def _treaty_follow_up(
+    payload: TreatyAnalyzeRequest, rows: List[TreatyAnalysisResult]
+) -> Optional[Dict[str, Any]]:
+    with metrics.stage("prompt_build"):
+        source = _treaty_follow_up_source(payload, rows)
+        if source is None:
+            return None
+        system_prompt, user_prompt = _treaty_segment_prompts(
+            payload, fit_to_tokens(source, TREATY_PROMPT_TOKEN_BUDGET // 2), 0, 1
+        )
+        user_prompt += (
+            f"\nFollow-up: these articles are already analyzed; do not repeat them: "
+            f"{', '.join(row.treaty_article for row in rows)}. "
+            f"Return at least {8 - len(rows)} further articles.\n"
+        )
+    return await _openrouter_json_completion(system_prompt, user_prompt)
+
+
+def _merge_treaty_follow_up(
+    ai_json: Dict[str, Any], rows: List[TreatyAnalysisResult], follow_up: Optional[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], List[TreatyAnalysisResult]]:
+    if not follow_up:
+        return ai_json, rows
+    covered = {_article_key(row.treaty_article) for row in rows}
+    extra = [row for row in _coerce_treaty_results(follow_up.get("results")) if _article_key(row.treaty_article) not in covered]
+    actions = _coerce_string_list(ai_json.get("action_list_30_60_90"), max_items=10)
+    actions += _coerce_string_list(follow_up.get("action_list_30_60_90"), max_items=10)
+    return dict(ai_json, action_list_30_60_90=actions), rows + extra
+
+
+def _treaty_follow_up_wanted(ai_json: Optional[Dict[str, Any]], rows: List[TreatyAnalysisResult]) -> bool:
+    # only worth it when the rest of the answer is usable
+    return bool(
+        ai_json
+        and str(ai_json.get("executive_summary", "")).strip()
+        and str(ai_json.get("human_review_disclaimer", "")).strip()
+        and 0 < len(rows) < 8
+    )
 
-    if len(response.results) < 8:
-        reasons.append("Minimum article coverage failed: fewer than 8 treaty articles mapped.")
 
-    for day in ["30", "60", "90"]:
-        action = next((a for a in response.action_list_30_60_90 if day in a), None)
-        if action is None:
-            reasons.append(f"Action plan incomplete: missing {day}-day action.")
-        elif not _is_authority_named(action):
-            reasons.append(f"Action plan authority missing: {day}-day action has no named ministry/authority.")
+async def _treaty_response_with_follow_up(
+    payload: TreatyAnalyzeRequest, ai_json: Optional[Dict[str, Any]], now: datetime, ref: str
+) -> Optional[TreatyAnalyzeResponse]:
+    with metrics.stage("coercion"):
+        rows = _coerce_treaty_results((ai_json or {}).get("results"))
+        response = _treaty_response_from_json(payload, ai_json, now, ref, results=rows)
+    if response is not None or not _treaty_follow_up_wanted(ai_json, rows):
+        return response
+    follow_up = await _treaty_follow_up(payload, rows)
+    with metrics.stage("coercion"):
+        merged_json, merged_rows = _merge_treaty_follow_up(ai_json, rows, follow_up)
+        response = _treaty_response_from_json(payload, merged_json, now, ref, results=merged_rows)
+    if follow_up is not None:
+        metrics.record_follow_up(response is not None)
+    return response
 
-    return QualityGate(passed=len(reasons) == 0, reasons=reasons)
 
+async def _build_full_treaty_response(
+    payload: TreatyAnalyzeRequest, now: datetime, ref: str
+) -> Optional[TreatyAnalyzeResponse]:
+    segments = _treaty_segments(payload)
+    if segments:
+        return await _build_treaty_segmented_response(payload, segments, now, ref)
+    with metrics.stage("prompt_build"):
+        system_prompt, user_prompt = _treaty_prompts(payload)
+    ai_json = await _openrouter_json_completion(system_prompt, user_prompt)
+    return await _treaty_response_with_follow_up(payload, ai_json, now, ref)
 
-@app.post("/api/treaty/analyze", response_model=TreatyAnalyzeResponse)
-def treaty_analyze(payload: TreatyAnalyzeRequest) -> TreatyAnalyzeResponse:
-    now = datetime.now(timezone.utc)
-    ref = f"KHM-GOV-{now.strftime('%Y%m%d')}-TC-{now.strftime('%H%M%S')}"
 
-    treaty_input = f"{payload.treaty_name}\n{payload.treaty_text}\n{payload.treaty_doc_text or ''}".lower()
-    law_input = f"{payload.law_name}\n{payload.national_law_text}\n{payload.law_doc_text or ''}".lower()
-    treaty_status, treaty_score = _relevance_check(treaty_input, ["article", "party", "agreement", "convention", "treaty", "protocol"])
-    law_status, law_score = _relevance_check(law_input, ["act", "section", "rule", "policy", "order", "law"])
-    relevance_score = round((treaty_score + law_score) / 2, 3)
-    relevance_status = "low" if (treaty_status == "low" or law_status == "low") else ("high" if treaty_status == "high" and law_status == "high" else "medium")
-    relevance_warning = None
+async def _build_treaty_ai_response(
+    payload: TreatyAnalyzeRequest, now: datetime, ref: str
+) -> Optional[TreatyAnalyzeResponse]:
+    if not payload.previous_analysis_id:
+        return await _build_full_treaty_response(payload, now, ref)
+    snapshot = _previous_treaty_snapshot(payload)
+    if snapshot is not None:
+        response = await _build_incremental_treaty_response(payload, snapshot, now, ref)
+        if response is not None:
+            return response
+    response = await _build_full_treaty_response(payload, now, ref)
+    if response is not None:
+        if snapshot is not None:
+            response.previous_reference_no = snapshot["response"]["reference_no"]
+        for row in response.results:
+            row.origin = RowOrigin.fresh
+    return response
+
+
+def _treaty_segment_source(payload: TreatyAnalyzeRequest) -> str:
+    return compact_text(payload.treaty_doc_text) or compact_text(payload.treaty_text)
+
+
+@lru_cache(maxsize=32)
+def _treaty_groups(source: str) -> List[str]:
+    return group_articles(source, max_chars=TREATY_SEGMENT_CHARS, max_groups=TREATY_SEGMENT_MAX_GROUPS)
+
+
+def _treaty_segments(payload: TreatyAnalyzeRequest) -> List[str]:
+    if payload.analysis_mode == AnalysisMode.single:
+        return []
+    source = _treaty_segment_source(payload)
+    if payload.analysis_mode == AnalysisMode.auto and len(source) <= TREATY_SEGMENT_CHARS:
+        return []
+    groups = _treaty_groups(source)
+    if payload.analysis_mode == AnalysisMode.auto and len(groups) < 2:
+        return []
+    return groups
+
+
+def _treaty_segment_prompts(payload: TreatyAnalyzeRequest, segment: str, index: int, total: int) -> Tuple[str, str]:
+    excerpt = ""
+    if payload.treaty_doc_text and payload.treaty_text:
+        excerpt = f"Analyst focus excerpt:\n{fit_to_tokens(compact_text(payload.treaty_text), 500)}\n\n"
+    return (
+        (
+            "You are a senior legal compliance analyst embedded in the Ministry of Foreign Affairs of Bangladesh. "
+            "You are analyzing one segment of a longer treaty; other segments are analyzed separately. "
+            "Return only valid JSON. No markdown, no code fences, no text outside JSON. "
+            "Analyze every treaty article that appears in this segment and only those articles. "
+            "Every result row must include exact treaty article and exact domestic clause mapping. "
+            "If no domestic clause is found, set status='gap' and state that clearly. "
+            "Confidence rules: >0.85 explicit direct textual correspondence; 0.65-0.85 reasonable mapping needing interpretation; <0.65 inferred mapping requiring strong human legal review. "
+            "Always provide confidence_rationale per row. "
+            "Severity rules: high=direct treaty exposure/violation risk, medium=implementation weakness, low=procedural/admin gap. "
+            "action_list_30_60_90 actions must each name a specific ministry or government authority. "
+            "You must complete full JSON object; do not truncate or summarize. Incomplete JSON causes system error."
+        ),
+        (
+            "Build a treaty compliance analysis JSON for this segment using this schema:\n"
+            "{\n"
+            '  "segment_summary": string,\n'
+            '  "action_list_30_60_90": string[],\n'
+            f"{_TREATY_RESULTS_SCHEMA}"
+            "}\n\n"
+            f"Treaty Name: {payload.treaty_name}\n"
+            f"Law Name: {payload.law_name}\n"
+            f"Segment: {index + 1} of {total}\n\n"
+            f"{excerpt}"
+            f"Treaty segment text:\n{segment}\n\n"
+            f"{_law_prompt_block(payload, segment, TREATY_PROMPT_TOKEN_BUDGET // 2)}"
+        ),
+    )
+
+
+async def _iter_treaty_segment_results(
+    payload: TreatyAnalyzeRequest, segments: List[str]
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    semaphore = asyncio.Semaphore(TREATY_SEGMENT_CONCURRENCY)
+
+    async def run(index: int, segment: str) -> Tuple[int, Optional[Dict[str, Any]]]:
+        with metrics.stage("prompt_build"):
+            system_prompt, user_prompt = _treaty_segment_prompts(payload, segment, index, len(segments))
+        async with semaphore:
+            return index, await _openrouter_json_completion(system_prompt, user_prompt)
+
+    tasks = [asyncio.ensure_future(run(idx, seg)) for idx, seg in enumerate(segments)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+_SEVERITY_RANK = {SeverityLevel.high: 0, SeverityLevel.medium: 1, SeverityLevel.low: 2}
+
+
+def _article_key(treaty_article: str) -> str:
+    return " ".join(treaty_article.lower().replace(".", " ").split())
+
+
+def _article_sort_key(row: TreatyAnalysisResult) -> Tuple[int, str]:
+    match = re.search(r"\d+", row.treaty_article)
+    return (int(match.group(0)) if match else 10**9, row.treaty_article)
+
+
+def _merge_treaty_rows(row_groups: List[List[TreatyAnalysisResult]]) -> List[TreatyAnalysisResult]:
+    merged: Dict[str, TreatyAnalysisResult] = {}
+    for rows in row_groups:
+        for row in rows:
+            key = _article_key(row.treaty_article)
+            current = merged.get(key)
+            if current is None or row.confidence > current.confidence:
+                merged[key] = row
+    return sorted(merged.values(), key=_article_sort_key)
+
+
+def _rank_urgent_gaps(results: List[TreatyAnalysisResult], limit: int = 5) -> List[str]:
+    gaps = [r for r in results if r.status != ComplianceStatus.compliant]
+    gaps.sort(key=lambda r: (_SEVERITY_RANK[r.severity], r.confidence))
+    return [f"{r.treaty_article}: {r.recommendation}" for r in gaps[:limit]]
+
+
+def _treaty_segmented_response(
+    payload: TreatyAnalyzeRequest,
+    segment_json: Dict[int, Optional[Dict[str, Any]]],
+    total: int,
+    now: datetime,
+    ref: str,
+) -> Optional[TreatyAnalyzeResponse]:
+    row_groups: List[List[TreatyAnalysisResult]] = []
+    summaries: List[str] = []
+    actions: List[str] = []
+    for index in sorted(segment_json):
+        ai_json = segment_json[index]
+        if not ai_json:
+            continue
+        row_groups.append(_coerce_treaty_results(ai_json.get("results")))
+        summary = str(ai_json.get("segment_summary", "")).strip()
+        if summary:
+            summaries.append(summary)
+        actions.extend(_coerce_string_list(ai_json.get("action_list_30_60_90"), max_items=10))
+
+    results = _merge_treaty_rows(row_groups)
+    if len(results) < 8:
+        return None
+
+    analyzed = sum(1 for index, value in segment_json.items() if value and index < total)
+    executive_summary = (
+        f"Segmented analysis covered {analyzed} of {total} treaty article groups and mapped {len(results)} articles. "
+        + " ".join(summaries)
+    ).strip()
+
+    return TreatyAnalyzeResponse(
+        treaty=payload.treaty_name,
+        law=payload.law_name,
+        generated_at=now.isoformat(),
+        reference_no=ref,
+        mode_used=ModeUsed.ai,
+        executive_summary=executive_summary,
+        top_urgent_gaps=_rank_urgent_gaps(results),
+        action_list_30_60_90=_normalize_30_60_90_actions(actions),
+        human_review_disclaimer=(
+            "AI-assisted segmented analysis. Each article group was analyzed separately and merged; "
+            "validate article-to-clause mappings with legal officers before policy action."
+        ),
+        quality_gate=QualityGate(passed=True, reasons=[]),
+        results=results,
+    )
+
+
+async def _treaty_segmented_with_follow_up(
+    payload: TreatyAnalyzeRequest,
+    segment_json: Dict[int, Optional[Dict[str, Any]]],
+    total: int,
+    now: datetime,
+    ref: str,
+) -> Tuple[Optional[TreatyAnalyzeResponse], Optional[Dict[str, Any]]]:
+    # a short merge gets one follow-up for the missing articles, folded in as
+    # an extra segment
+    with metrics.stage("coercion"):
+        response = _treaty_segmented_response(payload, segment_json, total, now, ref)
+        if response is not None:
+            return response, None
+        rows = _merge_treaty_rows([_coerce_treaty_results(value.get("results")) for value in segment_json.values() if value])
+    follow_up = await _treaty_follow_up(payload, rows)
+    if follow_up is None:
+        return None, None
+    segment_json[total] = follow_up
+    with metrics.stage("coercion"):
+        response = _treaty_segmented_response(payload, segment_json, total, now, ref)
+    metrics.record_follow_up(response is not None)
+    return response, follow_up
+
+
+async def _build_treaty_segmented_response(
+    payload: TreatyAnalyzeRequest, segments: List[str], now: datetime, ref: str
+) -> Optional[TreatyAnalyzeResponse]:
+    segment_json: Dict[int, Optional[Dict[str, Any]]] = {}
+    async for index, ai_json in _iter_treaty_segment_results(payload, segments):
+        segment_json[index] = ai_json
+    response, _ = await _treaty_segmented_with_follow_up(payload, segment_json, len(segments), now, ref)
+    return response
+
+
+def _treaty_articles(payload: TreatyAnalyzeRequest) -> List[Tuple[str, str]]:
+    return [(label, body) for label, body in split_articles(_treaty_segment_source(payload)) if label != "Preamble"]
+
+
+def _treaty_snapshot(payload: TreatyAnalyzeRequest, response: TreatyAnalyzeResponse) -> Dict[str, Any]:
+    return {
+        "treaty_digest": fingerprints([("treaty", _treaty_segment_source(payload))])["treaty"],
+        "articles": fingerprints(_treaty_articles(payload)),
+        "sections": fingerprints(split_sections(_law_source(payload))),
+        "response": response.model_dump(mode="json"),
+    }
+
+
+def _remember_treaty_analysis(payload: TreatyAnalyzeRequest, response: TreatyAnalyzeResponse) -> None:
+    # keyed by a random id, not the reference number: references are readable
+    # and repeat across workers, and a stored analysis must not be loadable
+    # by guessing one
+    if response.mode_used == ModeUsed.ai:
+        response.analysis_id = uuid.uuid4().hex
+        analysis_store.put(response.analysis_id, _treaty_snapshot(payload, response))
+
+
+def _previous_treaty_snapshot(payload: TreatyAnalyzeRequest) -> Optional[Dict[str, Any]]:
+    snapshot = analysis_store.get(payload.previous_analysis_id) if payload.previous_analysis_id else None
+    if snapshot is None:
+        return None
+    previous = snapshot["response"]
+    # rows are only carried over between analyses of the same treaty and law
+    if previous.get("treaty") != payload.treaty_name or previous.get("law") != payload.law_name:
+        return None
+    return snapshot
+
+
+def _incremental_segment(
+    dirty: List[str], articles: Dict[str, str], previous_rows: Dict[str, TreatyAnalysisResult]
+) -> str:
+    pieces: List[str] = []
+    for key in dirty:
+        if key in articles:
+            pieces.append(articles[key])
+        else:
+            row = previous_rows[key]
+            pieces.append(f"{row.treaty_article}\n{row.treaty_clause_text}")
+    return "\n\n".join(pieces)
+
+
+async def _build_incremental_treaty_response(
+    payload: TreatyAnalyzeRequest, snapshot: Dict[str, Any], now: datetime, ref: str
+) -> Optional[TreatyAnalyzeResponse]:
+    with metrics.stage("diff"):
+        previous = TreatyAnalyzeResponse.model_validate(snapshot["response"])
+        articles = _treaty_articles(payload)
+        sections = split_sections(_law_source(payload))
+        changed_articles: Set[str] = set()
+        removed_articles: Set[str] = set()
+        if fingerprints([("treaty", _treaty_segment_source(payload))])["treaty"] != snapshot["treaty_digest"]:
+            diff = dirty_articles(snapshot["articles"], fingerprints(articles))
+            if diff is None:
+                return None
+            changed_articles, removed_articles = diff
+        changed_sections = changed_labels(snapshot["sections"], fingerprints(sections))
+
+        removed = {_article_key(label) for label in removed_articles}
+        previous_rows = {
+            _article_key(row.treaty_article): row for row in previous.results if _article_key(row.treaty_article) not in removed
+        }
+        keys = list(previous_rows)
+        touched = rows_touched_by_sections(
+            [f"{r.treaty_article} {r.obligation} {r.treaty_clause_text} {r.national_mapping} {r.domestic_clause_text}" for r in previous_rows.values()],
+            changed_sections,
+            dict(sections),
+        )
+        dirty = {keys[idx] for idx in touched} | {_article_key(label) for label in changed_articles}
+        if len(dirty) > INCREMENTAL_MAX_CHANGED_RATIO * max(1, len(dirty | set(keys))):
+            return None
+
+    fresh: Dict[str, TreatyAnalysisResult] = {}
+    ai_json: Dict[str, Any] = {}
+    if dirty:
+        article_bodies = {_article_key(label): body for label, body in articles}
+        with metrics.stage("prompt_build"):
+            segment = _incremental_segment(sorted(dirty), article_bodies, previous_rows)
+            system_prompt, user_prompt = _treaty_segment_prompts(payload, segment, 0, 1)
+        ai_json = await _openrouter_json_completion(system_prompt, user_prompt) or {}
+        with metrics.stage("coercion"):
+            for row in _coerce_treaty_results(ai_json.get("results")):
+                key = _article_key(row.treaty_article)
+                if key in dirty:
+                    row.origin = RowOrigin.fresh
+                    fresh[key] = row
+        # a dirty row the model skipped may no longer hold after the change, so
+        # it cannot be carried over; re-analyze everything instead
+        if dirty - fresh.keys():
+            return None
+
+    with metrics.stage("coercion"):
+        results = list(fresh.values()) + [
+            row.model_copy(update={"origin": RowOrigin.reused}) for key, row in previous_rows.items() if key not in dirty
+        ]
+        results.sort(key=_article_sort_key)
+        if len(results) < 8:
+            return None
+        summary = str(ai_json.get("segment_summary", "")).strip()
+        executive_summary = (
+            f"Incremental re-analysis of {previous.reference_no}: {len(fresh)} of {len(results)} articles re-analyzed "
+            f"after {len(changed_articles)} treaty article and {len(changed_sections)} law section changes; "
+            f"{len(results) - len(fresh)} rows reused. {summary}"
+        ).strip()
+        actions = _coerce_string_list(ai_json.get("action_list_30_60_90"), max_items=10) + previous.action_list_30_60_90
+        return TreatyAnalyzeResponse(
+            treaty=payload.treaty_name,
+            law=payload.law_name,
+            generated_at=now.isoformat(),
+            reference_no=ref,
+            previous_reference_no=previous.reference_no,
+            mode_used=ModeUsed.ai,
+            executive_summary=executive_summary,
+            top_urgent_gaps=_rank_urgent_gaps(results),
+            action_list_30_60_90=_normalize_30_60_90_actions(actions),
+            human_review_disclaimer=(
+                "AI-assisted incremental analysis. Rows marked reused carry over from the previous analysis unchanged; "
+                "validate article-to-clause mappings with legal officers before policy action."
+            ),
+            quality_gate=QualityGate(passed=True, reasons=[]),
+            results=results,
+        )
+
+
+AIResponse = TypeVar("AIResponse", bound=BaseModel)
+
+
+async def _coalesced_ai_response(
+    cache_key: str,
+    build: Callable[[], Awaitable[Optional[AIResponse]]],
+    now: datetime,
+    ref: str,
+    cacheable: Callable[[AIResponse], bool] = lambda response: True,
+) -> Optional[AIResponse]:
+    async def build_and_cache() -> Tuple[Optional[AIResponse], List[str]]:
+        failures = track_provider_failures()
+        response = await build()
+        if response is not None and cacheable(response):
+            response_cache.put(cache_key, response.model_dump(mode="json"))
+        return response, failures
+
+    # the shared call queues for provider slots at the leader's priority, so
+    # a crisis request never waits on a low-priority batch item or job
+    flight_key = f"{cache_key}:{PRIORITY_NAMES[admission_priority.get()]}"
+    (response, failures), shared = await provider_flights.do(flight_key, build_and_cache)
+    metrics.record_coalesced(shared)
+    for reason in failures:
+        note_provider_failure(reason)
+    if shared and response is not None:
+        # the leader owns the original; followers stamp their own reference
+        response = response.model_copy(deep=True, update={"generated_at": now.isoformat(), "reference_no": ref})
+    return response
+
+
+def _treaty_cache_key(payload: TreatyAnalyzeRequest) -> str:
+    return content_key("treaty", payload.model_dump(), model=OPENROUTER_MODEL, prompt_version=TREATY_PROMPT_VERSION)
+
+
+def _cached_treaty_response(key: str, now: datetime, ref: str) -> Optional[TreatyAnalyzeResponse]:
+    cached = response_cache.get(key)
+    if cached is None:
+        return None
+    response = TreatyAnalyzeResponse.model_validate(cached)
+    response.generated_at = now.isoformat()
+    response.reference_no = ref
+    return response
+
+
+def _build_treaty_quality_gate(response: TreatyAnalyzeResponse) -> QualityGate:
+    reasons: List[str] = []
+
+    if len(response.results) < 8:
+        reasons.append("Minimum article coverage failed: fewer than 8 treaty articles mapped.")
+
+    for day in ["30", "60", "90"]:
+        action = next((a for a in response.action_list_30_60_90 if day in a), None)
+        if action is None:
+            reasons.append(f"Action plan incomplete: missing {day}-day action.")
+        elif not _is_authority_named(action):
+            reasons.append(f"Action plan authority missing: {day}-day action has no named ministry/authority.")
+
+    return QualityGate(passed=len(reasons) == 0, reasons=reasons)
+
+
+def _treaty_reference(now: datetime) -> str:
+    return f"KHM-GOV-{now.strftime('%Y%m%d')}-TC-{now.strftime('%H%M%S')}"
+
+
+def _field_chars(fields: Dict[str, Optional[str]]) -> int:
+    return sum(len(text) for text in fields.values() if text)
+
+
+async def _keyword_score(matcher: KeywordMatcher, fields: Dict[str, Optional[str]], shed: bool) -> RelevanceScore:
+    return await cpu_offload.run("relevance", matcher.score, fields, size=_field_chars(fields), shed=shed)
+
+
+async def _treaty_relevance(payload: TreatyAnalyzeRequest, shed: bool = True) -> Tuple[str, float, Optional[str]]:
+    (treaty_status, treaty_score, _), (law_status, law_score, _) = await asyncio.gather(
+        _keyword_score(
+            TREATY_KEYWORDS,
+            {"treaty_name": payload.treaty_name, "treaty_text": payload.treaty_text, "treaty_doc_text": payload.treaty_doc_text},
+            shed,
+        ),
+        _keyword_score(
+            LAW_KEYWORDS,
+            {"law_name": payload.law_name, "national_law_text": payload.national_law_text, "law_doc_text": payload.law_doc_text},
+            shed,
+        ),
+    )
+    relevance_score = round((treaty_score + law_score) / 2, 3)
+    relevance_status = "low" if (treaty_status == "low" or law_status == "low") else ("high" if treaty_status == "high" and law_status == "high" else "medium")
+    relevance_warning = None
     if relevance_status == "low":
         relevance_warning = "Uploaded or pasted text appears weakly related to treaty/law analysis. Results may be unreliable."
+    return relevance_status, relevance_score, relevance_warning
 
-    ai_response = _build_treaty_ai_response(payload, now, ref) if OPENROUTER_API_KEY else None
-    response = ai_response if ai_response is not None else _build_treaty_fallback(payload, now, ref)
-    response.relevance_status = relevance_status
-    response.relevance_score = relevance_score
-    response.relevance_warning = relevance_warning
-    response.quality_gate = _build_treaty_quality_gate(response)
+
+def _finalize_treaty_response(
+    response: TreatyAnalyzeResponse, relevance: Tuple[str, float, Optional[str]]
+) -> TreatyAnalyzeResponse:
+    response.relevance_status, response.relevance_score, response.relevance_warning = relevance
+    with metrics.stage("quality_gate"):
+        response.quality_gate = _build_treaty_quality_gate(response)
+    metrics.record_outcome(response.mode_used.value, response.fallback_reason, response.quality_gate.passed)
+    return response
+
+
+def _shed_if_backlogged() -> None:
+    # refuse at the door instead of queueing behind a backlog only to fall back
+    priority = admission_priority.get()
+    try:
+        provider_admission.check(priority)
+    except AdmissionRejected:
+        metrics.record_admission_shed(PRIORITY_NAMES[priority], "entry")
+        raise
+
+
+def _queue_wait_headers(waits: List[float]) -> Dict[str, str]:
+    return {"X-Queue-Wait-Ms": f"{sum(waits) * 1000.0:.1f}"}
+
+
+async def _analyze_treaty(payload: TreatyAnalyzeRequest, shed: bool = True) -> TreatyAnalyzeResponse:
+    now = datetime.now(timezone.utc)
+    ref = _treaty_reference(now)
+    with metrics.stage("relevance"):
+        relevance = await _treaty_relevance(payload, shed)
+
+    failures = track_provider_failures()
+    cache_key = _treaty_cache_key(payload)
+    ai_response = _cached_treaty_response(cache_key, now, ref)
+    if ai_response is None and OPENROUTER_API_KEY:
+        if shed:
+            _shed_if_backlogged()
+        ai_response = await _coalesced_ai_response(
+            cache_key, lambda: _build_treaty_ai_response(payload, now, ref), now, ref
+        )
+    response = ai_response if ai_response is not None else _build_treaty_fallback(payload, now, ref, _fallback_reason(failures))
+    response = _finalize_treaty_response(response, relevance)
+    _remember_treaty_analysis(payload, response)
     return response
 
 
+def _json_response(content: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return FastJSONResponse(RawJSON(content.encode("utf-8")), headers=headers)
+
+
+@app.post("/api/treaty/analyze", response_model=TreatyAnalyzeResponse)
+async def treaty_analyze(payload: TreatyAnalyzeRequest) -> Response:
+    metrics.endpoint_label.set("treaty")
+    waits = track_queue_wait()
+    response = await _analyze_treaty(payload)
+    return _json_response(_treaty_response_json(response), _queue_wait_headers(waits))
+
+
+def _sse_event(event: str, data: Any) -> str:
+    return _sse_frame(event, json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+
+def _sse_frame(event: str, encoded: str) -> str:
+    return f"event: {event}\ndata: {encoded}\n\n"
+
+
+async def _treaty_event_stream(payload: TreatyAnalyzeRequest) -> AsyncIterator[str]:
+    metrics.endpoint_label.set("treaty_stream")
+    waits = track_queue_wait()
+    now = datetime.now(timezone.utc)
+    ref = _treaty_reference(now)
+    with metrics.stage("relevance"):
+        # the stream has started by now, so a saturated pool is not a reason to stop
+        relevance = await _treaty_relevance(payload, shed=False)
+    yield _sse_event(
+        "meta",
+        {
+            "reference_no": ref,
+            "generated_at": now.isoformat(),
+            "relevance_status": relevance[0],
+            "relevance_score": relevance[1],
+            "relevance_warning": relevance[2],
+        },
+    )
+
+    failures = track_provider_failures()
+    cache_key = _treaty_cache_key(payload)
+    ai_response = _cached_treaty_response(cache_key, now, ref)
+    if ai_response is not None:
+        for index, row in enumerate(ai_response.results):
+            yield _sse_event("row", {"index": index, "row": row.model_dump(mode="json")})
+    elif OPENROUTER_API_KEY and (segments := _treaty_segments(payload)):
+        segment_json: Dict[int, Optional[Dict[str, Any]]] = {}
+        streamed = 0
+        async for index, segment_result in _iter_treaty_segment_results(payload, segments):
+            segment_json[index] = segment_result
+            for row in _coerce_treaty_results((segment_result or {}).get("results")):
+                yield _sse_event("row", {"index": streamed, "segment": index, "row": row.model_dump(mode="json")})
+                streamed += 1
+        ai_response, follow_up = await _treaty_segmented_with_follow_up(payload, segment_json, len(segments), now, ref)
+        for row in _coerce_treaty_results((follow_up or {}).get("results")):
+            yield _sse_event("row", {"index": streamed, "segment": len(segments), "row": row.model_dump(mode="json")})
+            streamed += 1
+        if ai_response is not None:
+            response_cache.put(cache_key, ai_response.model_dump(mode="json"))
+    elif OPENROUTER_API_KEY:
+        with metrics.stage("prompt_build"):
+            system_prompt, user_prompt = _treaty_prompts(payload)
+        scanner = ArrayItemStream("results")
+        rows: List[TreatyAnalysisResult] = []
+        async for delta in _openrouter_stream_completion(system_prompt, user_prompt):
+            for item in scanner.feed(delta):
+                coerced = _coerce_treaty_results([item])
+                if not coerced:
+                    continue
+                rows.append(coerced[0])
+                yield _sse_event("row", {"index": len(rows) - 1, "row": coerced[0].model_dump(mode="json")})
+        with metrics.stage("parse_json"):
+            ai_json = await _stream_json(scanner)
+        if ai_json is not None and not rows:
+            # nothing was streamed, so the rows come from the full parse
+            rows = _coerce_treaty_results(ai_json.get("results"))
+            for index, row in enumerate(rows):
+                yield _sse_event("row", {"index": index, "row": row.model_dump(mode="json")})
+        with metrics.stage("coercion"):
+            ai_response = _treaty_response_from_json(payload, ai_json, now, ref, results=rows)
+        if ai_response is None and _treaty_follow_up_wanted(ai_json, rows):
+            follow_up = await _treaty_follow_up(payload, rows)
+            with metrics.stage("coercion"):
+                merged_json, merged_rows = _merge_treaty_follow_up(ai_json or {}, rows, follow_up)
+            for index in range(len(rows), len(merged_rows)):
+                yield _sse_event("row", {"index": index, "row": merged_rows[index].model_dump(mode="json")})
+            with metrics.stage("coercion"):
+                ai_response = _treaty_response_from_json(payload, merged_json, now, ref, results=merged_rows)
+            if follow_up is not None:
+                metrics.record_follow_up(ai_response is not None)
+        if ai_response is not None:
+            response_cache.put(cache_key, ai_response.model_dump(mode="json"))
+
+    if ai_response is None:
+        ai_response = _build_treaty_fallback(payload, now, ref, _fallback_reason(failures))
+    response = _finalize_treaty_response(ai_response, relevance)
+    _remember_treaty_analysis(payload, response)
+    yield _sse_event("queue", {"queue_wait_ms": round(sum(waits) * 1000.0, 1)})
+    yield _sse_frame("final", _treaty_response_json(response))
+
+
+@app.post("/api/treaty/analyze/stream")
+async def treaty_analyze_stream(payload: TreatyAnalyzeRequest) -> StreamingResponse:
+    metrics.endpoint_label.set("treaty_stream")
+    if OPENROUTER_API_KEY:
+        _shed_if_backlogged()
+    return StreamingResponse(
+        _treaty_event_stream(payload),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 class CrisisGenerateRequest(StrictSchema):
     mission_location: str = Field(..., min_length=1, max_length=255)
     crisis_type: str = Field(..., min_length=1, max_length=255)
@@ -566,6 +2105,7 @@ class CrisisGenerateRequest(StrictSchema):
     constraints: List[str] = Field(default_factory=list, max_length=50)
     local_conditions: str = Field(..., min_length=30, max_length=5000)
     scenario_doc_text: Optional[str] = Field(default=None, max_length=240000)
+    generation_mode: CrisisGenerationMode = CrisisGenerationMode(CRISIS_GENERATION_MODE)
 
     @field_validator("mission_location", "crisis_type", "local_conditions")
     @classmethod
@@ -643,24 +2183,37 @@ class CrisisGenerateResponse(StrictSchema):
     assumptions_and_unknowns: List[str]
     human_review_disclaimer: str
     quality_gate: QualityGate
+    fallback_sections: List[str] = Field(default_factory=list)
+    warm_plan_id: Optional[str] = None
 
 
-def _build_crisis_fallback(payload: CrisisGenerateRequest, now: datetime, ref: str) -> CrisisGenerateResponse:
-    constraints_text = ", ".join(payload.constraints) if payload.constraints else "No specific constraints provided"
+_CRISIS_FALLBACK_STATIC = frozenset({
+    "condition_orange",
+    "condition_red",
+    "role_assigned_tasks",
+    "timeline",
+    "communication_templates",
+    "evacuation_plan",
+    "sitrep_template",
+    "assumptions_and_unknowns",
+    "human_review_disclaimer",
+})
+
 
+@lru_cache(maxsize=None)
+def _crisis_fallback_template() -> CrisisGenerateResponse:
     return CrisisGenerateResponse(
-        reference_no=ref,
-        generated_at=now.isoformat(),
+        reference_no="",
+        generated_at="",
         mode_used=ModeUsed.fallback,
         fallback_reason="openrouter_unavailable_or_invalid_response",
-        mission_location=payload.mission_location,
-        crisis_type=payload.crisis_type,
-        nationals_affected=payload.nationals_affected,
+        mission_location="",
+        crisis_type="",
+        nationals_affected=0,
         condition_yellow=[
             "Activate mission crisis cell, nominate shift lead, and open incident log within 15 minutes.",
             "Issue first advisory notice to registered nationals, employers, and diaspora channels with hotline protocol.",
             "Verify contact tree coverage by district and mark unreachable groups for escalation.",
-            f"Record immediate constraints and operational limits: {constraints_text}.",
         ],
         condition_orange=[
             "Pre-position transport, medical support, emergency food/water, and temporary shelter coordination assets.",
@@ -737,6 +2290,38 @@ def _build_crisis_fallback(payload: CrisisGenerateRequest, now: datetime, ref: s
     )
 
 
+@lru_cache(maxsize=None)
+def _crisis_fallback_json() -> str:
+    return _crisis_fallback_template().model_dump_json(include=_CRISIS_FALLBACK_STATIC)[1:-1]
+
+
+def _build_crisis_fallback(
+    payload: CrisisGenerateRequest, now: datetime, ref: str, reason: Optional[str] = None
+) -> CrisisGenerateResponse:
+    constraints_text = ", ".join(payload.constraints) if payload.constraints else "No specific constraints provided"
+    template = _crisis_fallback_template()
+    update: Dict[str, Any] = {name: list(value) for name, value in template if name in _CRISIS_FALLBACK_STATIC and isinstance(value, list)}
+    update.update(
+        reference_no=ref,
+        generated_at=now.isoformat(),
+        fallback_reason=reason or template.fallback_reason,
+        mission_location=payload.mission_location,
+        crisis_type=payload.crisis_type,
+        nationals_affected=payload.nationals_affected,
+        condition_yellow=[*template.condition_yellow, f"Record immediate constraints and operational limits: {constraints_text}."],
+    )
+    return template.model_copy(update=update)
+
+
+def _crisis_response_json(response: CrisisGenerateResponse) -> str:
+    with metrics.stage("serialization"):
+        # only the template plan has pre-rendered sections; an unadapted warm
+        # plan is a fallback with sections of its own
+        if response.mode_used != ModeUsed.fallback or response.warm_plan_id:
+            return response.model_dump_json()
+        return _spliced_json(response, _CRISIS_FALLBACK_STATIC, _crisis_fallback_json())
+
+
 def _coerce_role_tasks(raw_tasks: Any) -> List[RoleTask]:
     if not isinstance(raw_tasks, list):
         return []
@@ -765,10 +2350,13 @@ def _coerce_timeline(raw_timeline: Any) -> List[TimelinePhase]:
     return out
 
 
+_CRISIS_PHASES = ("0-2 hours", "2-6 hours", "6-24 hours", "24-72 hours")
+_EVACUATION_FIELDS = ("assembly_points", "priority_categories", "movement_windows", "coordination_requirements")
+
+
 def _timeline_is_complete(timeline: List[TimelinePhase]) -> bool:
-    required_phases = ["0-2 hours", "2-6 hours", "6-24 hours", "24-72 hours"]
     by_phase = {t.phase.lower(): t for t in timeline}
-    for phase in required_phases:
+    for phase in _CRISIS_PHASES:
         item = by_phase.get(phase)
         if item is None or len(item.actions) < 3:
             return False
@@ -789,25 +2377,48 @@ def _coerce_evacuation_plan(raw_plan: Any) -> Optional[EvacuationPlan]:
     return plan
 
 
-def _build_crisis_ai_response(
-    payload: CrisisGenerateRequest, now: datetime, ref: str
-) -> Optional[CrisisGenerateResponse]:
-    ai_json = _openrouter_json_completion(
-        system_prompt=(
-            "You are a senior consular emergency management advisor producing an operational order for Bangladesh missions. "
-            "Return only valid JSON. No markdown, no code fences, no text outside JSON. "
-            "All recommendations must be scenario-specific and constraint-aware (telecom outage, airport closure, etc.). "
-            "Condition tiers must be distinct: Yellow=monitor/prepare, Orange=active controlled response, Red=full emergency execution. "
-            "Use exact roles: Head of Mission, Deputy Head of Mission, Consular Officer, Political Officer, Security Officer, Admin and Logistics Officer, Communications Officer. "
-            "Timeline phases must be exactly: 0-2 hours, 2-6 hours, 6-24 hours, 24-72 hours. "
-            "Each timeline phase must contain at least 3 specific, operationally distinct actions; avoid generic phrasing. "
-            "Assumptions and unknowns must include at least three each, specific to this scenario and not generic. "
-            "Communication templates should use realistic placeholders (e.g., +880-2-XXXXXXXX), not unresolved token names. "
-            "Include a mandatory evacuation_plan object with assembly_points, priority_categories (highest to lowest), movement_windows, and coordination_requirements. "
-            "SITREP template must be fillable with <placeholders> and completable in under five minutes. "
-            "You must complete full JSON object; do not truncate or summarize. Incomplete JSON causes system error."
-        ),
-        user_prompt=(
+_CRISIS_SYSTEM_PROMPT = (
+    "You are a senior consular emergency management advisor producing an operational order for Bangladesh missions. "
+    "Return only valid JSON. No markdown, no code fences, no text outside JSON. "
+    "All recommendations must be scenario-specific and constraint-aware (telecom outage, airport closure, etc.). "
+    "Condition tiers must be distinct: Yellow=monitor/prepare, Orange=active controlled response, Red=full emergency execution. "
+    "Use exact roles: Head of Mission, Deputy Head of Mission, Consular Officer, Political Officer, Security Officer, Admin and Logistics Officer, Communications Officer. "
+    "Timeline phases must be exactly: 0-2 hours, 2-6 hours, 6-24 hours, 24-72 hours. "
+    "Each timeline phase must contain at least 3 specific, operationally distinct actions; avoid generic phrasing. "
+    "Assumptions and unknowns must include at least three each, specific to this scenario and not generic. "
+    "Communication templates should use realistic placeholders (e.g., +880-2-XXXXXXXX), not unresolved token names. "
+    "Include a mandatory evacuation_plan object with assembly_points, priority_categories (highest to lowest), movement_windows, and coordination_requirements. "
+    "SITREP template must be fillable with <placeholders> and completable in under five minutes. "
+    "You must complete full JSON object; do not truncate or summarize. Incomplete JSON causes system error."
+)
+
+
+def _crisis_scenario_block(payload: CrisisGenerateRequest, budget: int) -> str:
+    local_conditions = compact_text(payload.local_conditions)
+    texts = _budgeted_fields(
+        {"local_conditions": payload.local_conditions, "scenario_doc_text": payload.scenario_doc_text},
+        {
+            "local_conditions": local_conditions,
+            "scenario_doc_text": drop_shared_lines(compact_text(payload.scenario_doc_text), local_conditions),
+        },
+        budget,
+        {"local_conditions": 1.0, "scenario_doc_text": 2.0},
+    )
+    return (
+        f"Mission location: {payload.mission_location}\n"
+        f"Crisis type: {payload.crisis_type}\n"
+        f"Nationals affected: {payload.nationals_affected}\n"
+        f"Embassy resources: {', '.join(payload.embassy_resources)}\n"
+        f"Constraints: {', '.join(payload.constraints)}\n"
+        f"Local conditions: {texts['local_conditions']}\n"
+        f"Scenario document text: {texts['scenario_doc_text']}\n"
+    )
+
+
+def _crisis_prompts(payload: CrisisGenerateRequest) -> Tuple[str, str]:
+    return (
+        _CRISIS_SYSTEM_PROMPT,
+        (
             "Build an operational response plan JSON using this schema:\n"
             "{\n"
             '  "condition_yellow": string[],\n'
@@ -826,35 +2437,70 @@ def _build_crisis_ai_response(
             '  "assumptions_and_unknowns": string[],\n'
             '  "human_review_disclaimer": string\n'
             "}\n\n"
-            f"Mission location: {payload.mission_location}\n"
-            f"Crisis type: {payload.crisis_type}\n"
-            f"Nationals affected: {payload.nationals_affected}\n"
-            f"Embassy resources: {', '.join(payload.embassy_resources)}\n"
-            f"Constraints: {', '.join(payload.constraints)}\n"
-            f"Local conditions: {_truncate_for_prompt(payload.local_conditions, limit=6000)}\n"
-            f"Scenario document text: {_truncate_for_prompt(payload.scenario_doc_text)}\n"
+            f"{_crisis_scenario_block(payload, CRISIS_PROMPT_TOKEN_BUDGET)}"
         ),
     )
 
-    if not ai_json:
-        return None
 
-    yellow = _coerce_string_list(ai_json.get("condition_yellow"), max_items=10)
-    orange = _coerce_string_list(ai_json.get("condition_orange"), max_items=10)
-    red = _coerce_string_list(ai_json.get("condition_red"), max_items=10)
-    role_tasks = _coerce_role_tasks(ai_json.get("role_assigned_tasks"))
-    timeline = _coerce_timeline(ai_json.get("timeline"))
-    comms = _coerce_string_list(ai_json.get("communication_templates"), max_items=10)
-    assumptions = _coerce_string_list(ai_json.get("assumptions_and_unknowns"), max_items=10)
-    evacuation_plan = _coerce_evacuation_plan(ai_json.get("evacuation_plan"))
-    sitrep = str(ai_json.get("sitrep_template", "")).strip()
-    human_review = str(ai_json.get("human_review_disclaimer", "")).strip()
-
-    if not yellow or not orange or not red or not role_tasks or not timeline or not comms or evacuation_plan is None:
-        return None
-    if not _timeline_is_complete(timeline):
+def _coerce_text(value: Any) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _coerce_crisis_list(value: Any) -> List[str]:
+    return _coerce_string_list(value, max_items=10)
+
+
+_CRISIS_COERCERS: Dict[str, Callable[[Any], Any]] = {
+    "condition_yellow": _coerce_crisis_list,
+    "condition_orange": _coerce_crisis_list,
+    "condition_red": _coerce_crisis_list,
+    "role_assigned_tasks": _coerce_role_tasks,
+    "timeline": _coerce_timeline,
+    "communication_templates": _coerce_crisis_list,
+    "evacuation_plan": _coerce_evacuation_plan,
+    "sitrep_template": _coerce_text,
+    "assumptions_and_unknowns": _coerce_crisis_list,
+    "human_review_disclaimer": _coerce_text,
+}
+_CRISIS_FIELD_SCHEMA = {
+    "condition_yellow": "string[]",
+    "condition_orange": "string[]",
+    "condition_red": "string[]",
+    "role_assigned_tasks": '[{"role": string, "task": string}]',
+    "timeline": '[{"phase": string, "actions": string[]}]',
+    "communication_templates": "string[]",
+    "evacuation_plan": (
+        '{"assembly_points": string[], "priority_categories": string[], '
+        '"movement_windows": string[], "coordination_requirements": string[]}'
+    ),
+    "sitrep_template": "string",
+    "assumptions_and_unknowns": "string[]",
+    "human_review_disclaimer": "string",
+}
+
+
+def _crisis_field_ok(name: str, value: Any) -> bool:
+    if name == "timeline":
+        return bool(value) and _timeline_is_complete(value)
+    if name == "assumptions_and_unknowns":
+        return True
+    return bool(value)
+
+
+def _coerce_crisis_fields(ai_json: Optional[Dict[str, Any]], names: Iterable[str]) -> Optional[Dict[str, Any]]:
+    # coerced values for names, or None when any of them is unusable
+    ai_json = ai_json or {}
+    values = {name: _CRISIS_COERCERS[name](ai_json.get(name)) for name in names}
+    return values if all(_crisis_field_ok(name, value) for name, value in values.items()) else None
+
+
+def _crisis_response_from_json(
+    payload: CrisisGenerateRequest, ai_json: Optional[Dict[str, Any]], now: datetime, ref: str
+) -> Optional[CrisisGenerateResponse]:
+    if not ai_json:
         return None
-    if not sitrep or not human_review:
+    values = _coerce_crisis_fields(ai_json, _CRISIS_COERCERS)
+    if values is None:
         return None
 
     return CrisisGenerateResponse(
@@ -864,20 +2510,289 @@ def _build_crisis_ai_response(
         mission_location=payload.mission_location,
         crisis_type=payload.crisis_type,
         nationals_affected=payload.nationals_affected,
-        condition_yellow=yellow,
-        condition_orange=orange,
-        condition_red=red,
-        role_assigned_tasks=role_tasks,
-        timeline=timeline,
-        communication_templates=comms,
-        evacuation_plan=evacuation_plan,
-        sitrep_template=sitrep,
-        assumptions_and_unknowns=assumptions,
-        human_review_disclaimer=human_review,
         quality_gate=QualityGate(passed=True, reasons=[]),
+        **values,
+    )
+
+
+_CRISIS_FOLLOW_UP_FIELDS = tuple(name for name in _CRISIS_FIELD_SCHEMA if name not in ("timeline", "evacuation_plan"))
+
+
+def _crisis_field_missing(ai_json: Dict[str, Any], name: str) -> bool:
+    return not _crisis_field_ok(name, _CRISIS_COERCERS[name](ai_json.get(name)))
+
+
+def _crisis_timeline_by_phase(raw_timeline: Any) -> Dict[str, TimelinePhase]:
+    return {t.phase.lower(): t for t in _coerce_timeline(raw_timeline)}
+
+
+def _crisis_gaps(ai_json: Dict[str, Any]) -> Tuple[List[str], List[str], List[str]]:
+    # (top-level fields, timeline phases, evacuation_plan fields) that keep a
+    # draft from passing _crisis_response_from_json
+    fields = [name for name in _CRISIS_FOLLOW_UP_FIELDS if _crisis_field_missing(ai_json, name)]
+    by_phase = _crisis_timeline_by_phase(ai_json.get("timeline"))
+    phases = [phase for phase in _CRISIS_PHASES if phase not in by_phase or len(by_phase[phase].actions) < 3]
+    plan = ai_json.get("evacuation_plan")
+    plan = plan if isinstance(plan, dict) else {}
+    evacuation = [name for name in _EVACUATION_FIELDS if not _coerce_string_list(plan.get(name), max_items=10)]
+    return fields, phases, evacuation
+
+
+def _crisis_follow_up_prompts(
+    payload: CrisisGenerateRequest, ai_json: Dict[str, Any], fields: List[str], phases: List[str], evacuation: List[str]
+) -> Tuple[str, str]:
+    schema = [f'  "{name}": {_CRISIS_FIELD_SCHEMA[name]}' for name in fields]
+    notes: List[str] = []
+    if phases:
+        schema.append('  "timeline": [{"phase": string, "actions": string[]}]')
+        by_phase = _crisis_timeline_by_phase(ai_json.get("timeline"))
+        for phase in phases:
+            planned = by_phase[phase].actions if phase in by_phase else []
+            note = f"Timeline phase {phase}: return at least {3 - len(planned)} new actions"
+            if planned:
+                note += f"; already planned, do not repeat: {'; '.join(planned)}"
+            notes.append(note + ".")
+    if evacuation:
+        schema.append('  "evacuation_plan": {' + ", ".join(f'"{name}": string[]' for name in evacuation) + "}")
+    return (
+        _CRISIS_SYSTEM_PROMPT,
+        (
+            "An earlier draft of this operational response plan is missing the parts below. "
+            "Return JSON with only these keys:\n"
+            "{\n" + ",\n".join(schema) + "\n}\n\n"
+            + ("\n".join(notes) + "\n\n" if notes else "")
+            + _crisis_scenario_block(payload, CRISIS_PROMPT_TOKEN_BUDGET // 2)
+        ),
     )
 
 
+def _merge_crisis_follow_up(ai_json: Dict[str, Any], follow_up: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(ai_json)
+    for name in _CRISIS_FOLLOW_UP_FIELDS:
+        if name in follow_up and _crisis_field_missing(merged, name):
+            merged[name] = follow_up[name]
+
+    timeline = _crisis_timeline_by_phase(ai_json.get("timeline"))
+    for phase in _coerce_timeline(follow_up.get("timeline")):
+        current = timeline.get(phase.phase.lower())
+        if current is None:
+            timeline[phase.phase.lower()] = phase
+        else:
+            current.actions = list(dict.fromkeys(current.actions + phase.actions))[:10]
+    order = {phase: idx for idx, phase in enumerate(_CRISIS_PHASES)}
+    merged["timeline"] = [
+        t.model_dump() for key, t in sorted(timeline.items(), key=lambda item: order.get(item[0], len(order)))
+    ]
+
+    plan = ai_json.get("evacuation_plan")
+    plan = dict(plan) if isinstance(plan, dict) else {}
+    extra = follow_up.get("evacuation_plan")
+    if isinstance(extra, dict):
+        for name in _EVACUATION_FIELDS:
+            if not _coerce_string_list(plan.get(name), max_items=10):
+                plan[name] = extra.get(name)
+    merged["evacuation_plan"] = plan
+    return merged
+
+
+async def _crisis_response_with_follow_up(
+    payload: CrisisGenerateRequest, ai_json: Optional[Dict[str, Any]], now: datetime, ref: str
+) -> Optional[CrisisGenerateResponse]:
+    with metrics.stage("coercion"):
+        response = _crisis_response_from_json(payload, ai_json, now, ref)
+    if response is not None or not ai_json or not FOLLOW_UP_ENABLED:
+        return response
+    fields, phases, evacuation = _crisis_gaps(ai_json)
+    if not 0 < len(fields) + len(phases) + (1 if evacuation else 0) <= FOLLOW_UP_MAX_MISSING:
+        return None
+    with metrics.stage("prompt_build"):
+        system_prompt, user_prompt = _crisis_follow_up_prompts(payload, ai_json, fields, phases, evacuation)
+    follow_up = await _openrouter_json_completion(system_prompt, user_prompt)
+    if follow_up is None:
+        return None
+    with metrics.stage("coercion"):
+        response = _crisis_response_from_json(payload, _merge_crisis_follow_up(ai_json, follow_up), now, ref)
+    metrics.record_follow_up(response is not None)
+    return response
+
+
+_CRISIS_SECTIONS: Dict[str, Tuple[str, ...]] = {
+    "conditions_roles": ("condition_yellow", "condition_orange", "condition_red", "role_assigned_tasks"),
+    "timeline": ("timeline",),
+    "evacuation_comms": ("evacuation_plan", "communication_templates"),
+    "sitrep_assumptions": ("sitrep_template", "assumptions_and_unknowns", "human_review_disclaimer"),
+}
+
+
+def _crisis_section_prompt(scenario: str, section: str) -> str:
+    # the scenario goes first so the four prompts share one prefix
+    schema = ",\n".join(f'  "{name}": {_CRISIS_FIELD_SCHEMA[name]}' for name in _CRISIS_SECTIONS[section])
+    return (
+        f"{scenario}\n"
+        "Other sections of this operational response plan are drafted separately from the same scenario. "
+        "Build only this section as JSON using this schema:\n"
+        "{\n" + schema + "\n}\n"
+    )
+
+
+async def _build_crisis_sectioned_response(
+    payload: CrisisGenerateRequest, now: datetime, ref: str
+) -> Optional[CrisisGenerateResponse]:
+    with metrics.stage("prompt_build"):
+        scenario = _crisis_scenario_block(payload, CRISIS_PROMPT_TOKEN_BUDGET)
+        prompts = [_crisis_section_prompt(scenario, section) for section in _CRISIS_SECTIONS]
+    drafts = await asyncio.gather(*(_openrouter_json_completion(_CRISIS_SYSTEM_PROMPT, prompt) for prompt in prompts))
+
+    values: Dict[str, Any] = {}
+    failed: List[str] = []
+    with metrics.stage("coercion"):
+        for (section, names), draft in zip(_CRISIS_SECTIONS.items(), drafts):
+            section_values = _coerce_crisis_fields(draft, names)
+            metrics.record_crisis_section(section, section_values is not None)
+            if section_values is None:
+                failed.append(section)
+            else:
+                values.update(section_values)
+        if len(failed) == len(_CRISIS_SECTIONS):
+            return None
+        # each failed section falls back on its own to the template fields
+        fallback = _build_crisis_fallback(payload, now, ref)
+        for section in failed:
+            values.update({name: getattr(fallback, name) for name in _CRISIS_SECTIONS[section]})
+        if failed:
+            values["human_review_disclaimer"] = (
+                f"{values['human_review_disclaimer']} Sections from the fallback template, not live generation: "
+                f"{', '.join(failed)}."
+            )
+        return CrisisGenerateResponse(
+            reference_no=ref,
+            generated_at=now.isoformat(),
+            mode_used=ModeUsed.ai,
+            mission_location=payload.mission_location,
+            crisis_type=payload.crisis_type,
+            nationals_affected=payload.nationals_affected,
+            quality_gate=QualityGate(passed=True, reasons=[]),
+            fallback_sections=failed,
+            **values,
+        )
+
+
+async def _build_crisis_ai_response(
+    payload: CrisisGenerateRequest, now: datetime, ref: str
+) -> Optional[CrisisGenerateResponse]:
+    if payload.generation_mode == CrisisGenerationMode.sectioned:
+        return await _build_crisis_sectioned_response(payload, now, ref)
+    with metrics.stage("prompt_build"):
+        system_prompt, user_prompt = _crisis_prompts(payload)
+    ai_json = await _openrouter_json_completion(system_prompt, user_prompt)
+    return await _crisis_response_with_follow_up(payload, ai_json, now, ref)
+
+
+def _warm_plan_response(
+    payload: CrisisGenerateRequest,
+    match: PlanMatch,
+    now: datetime,
+    ref: str,
+    note: str,
+    fallback_reason: Optional[str] = None,
+) -> CrisisGenerateResponse:
+    response = CrisisGenerateResponse.model_validate(
+        {
+            **match.plan,
+            "reference_no": ref,
+            "generated_at": now.isoformat(),
+            "mode_used": ModeUsed.fallback if fallback_reason else ModeUsed.ai,
+            "fallback_reason": fallback_reason,
+            "mission_location": payload.mission_location,
+            "crisis_type": payload.crisis_type,
+            "nationals_affected": payload.nationals_affected,
+            "quality_gate": QualityGate(passed=True, reasons=[]),
+            "warm_plan_id": match.combination.get("id"),
+        }
+    )
+    response.human_review_disclaimer = f"{response.human_review_disclaimer} {note}"
+    return response
+
+
+def _crisis_refine_prompts(payload: CrisisGenerateRequest, match: PlanMatch) -> Tuple[str, str]:
+    combination = match.combination
+    return (
+        _CRISIS_SYSTEM_PROMPT,
+        (
+            f"{_crisis_scenario_block(payload, CRISIS_PROMPT_TOKEN_BUDGET // 2)}\n"
+            f"A plan drafted for a closely related scenario ({combination.get('mission')}; "
+            f"{combination.get('crisis_type')}; {combination.get('constraint')}) follows. "
+            "Adapt it to the scenario above. Return JSON with only the keys whose content must change, "
+            "using the same schema as the draft; omit keys that can stay as they are.\n\n"
+            f"Draft plan:\n{json.dumps(match.plan, ensure_ascii=False, separators=(',', ':'))}\n"
+        ),
+    )
+
+
+async def _refine_warm_plan(
+    payload: CrisisGenerateRequest, match: PlanMatch, now: datetime, ref: str
+) -> Optional[CrisisGenerateResponse]:
+    with metrics.stage("prompt_build"):
+        system_prompt, user_prompt = _crisis_refine_prompts(payload, match)
+    changes = await _openrouter_json_completion(system_prompt, user_prompt)
+    if changes is None:
+        return None
+    merged = {**match.plan, **{name: value for name, value in changes.items() if name in _CRISIS_COERCERS}}
+    response = await _crisis_response_with_follow_up(payload, merged, now, ref)
+    if response is not None:
+        response.warm_plan_id = match.combination.get("id")
+    return response
+
+
+async def _warm_crisis_response(
+    payload: CrisisGenerateRequest, cache_key: str, now: datetime, ref: str
+) -> Optional[CrisisGenerateResponse]:
+    if warm_plans is None:
+        return None
+    with metrics.stage("warm_plan"):
+        match = warm_plans.closest(payload.mission_location, payload.crisis_type, payload.constraints)
+    if match is None:
+        return None
+    if match.exact:
+        metrics.record_warm_plan("served")
+        return _warm_plan_response(
+            payload, match, now, ref, f"Pre-generated plan {match.combination.get('id')}; confirm figures against current conditions."
+        )
+    if OPENROUTER_API_KEY and provider_breaker.state != CIRCUIT_OPEN:
+        response = await _coalesced_ai_response(cache_key, lambda: _refine_warm_plan(payload, match, now, ref), now, ref)
+        if response is not None:
+            metrics.record_warm_plan("refined")
+            return response
+        return None
+    # provider unavailable: a plan for the same crisis type beats the generic
+    # template, but it was written for another scenario and is labelled so
+    metrics.record_warm_plan("seed_served")
+    plan_id = match.combination.get("id")
+    return _warm_plan_response(
+        payload,
+        match,
+        now,
+        ref,
+        f"Provider unavailable; this is pre-generated plan {plan_id} for a related scenario, "
+        "not adapted to this request. Review every section against current conditions.",
+        fallback_reason=f"unadapted_warm_plan {plan_id} ({'circuit_open' if OPENROUTER_API_KEY else 'provider_not_configured'})",
+    )
+
+
+def _crisis_cache_key(payload: CrisisGenerateRequest) -> str:
+    return content_key("crisis", payload.model_dump(), model=OPENROUTER_MODEL, prompt_version=CRISIS_PROMPT_VERSION)
+
+
+def _cached_crisis_response(key: str, now: datetime, ref: str) -> Optional[CrisisGenerateResponse]:
+    cached = response_cache.get(key)
+    if cached is None:
+        return None
+    response = CrisisGenerateResponse.model_validate(cached)
+    response.generated_at = now.isoformat()
+    response.reference_no = ref
+    return response
+
+
 def _build_crisis_quality_gate(response: CrisisGenerateResponse) -> QualityGate:
     reasons: List[str] = []
 
@@ -897,27 +2812,266 @@ def _build_crisis_quality_gate(response: CrisisGenerateResponse) -> QualityGate:
     return QualityGate(passed=len(reasons) == 0, reasons=reasons)
 
 
-@app.post("/api/crisis/generate", response_model=CrisisGenerateResponse)
-def crisis_generate(payload: CrisisGenerateRequest) -> CrisisGenerateResponse:
-    now = datetime.now(timezone.utc)
-    ref = f"KHM-GOV-{now.strftime('%Y%m%d')}-CR-{now.strftime('%H%M%S')}"
-
-    crisis_input = (
-        f"{payload.mission_location}\n{payload.crisis_type}\n{payload.local_conditions}\n"
-        f"{' '.join(payload.constraints)}\n{' '.join(payload.embassy_resources)}\n{payload.scenario_doc_text or ''}"
-    ).lower()
-    relevance_status, relevance_score = _relevance_check(
-        crisis_input,
-        ["mission", "crisis", "evac", "consular", "security", "nationals", "hotline", "shelter", "roadblock", "telecom"],
+async def _crisis_relevance(payload: CrisisGenerateRequest, shed: bool = True) -> Tuple[str, float, Optional[str]]:
+    relevance_status, relevance_score, _ = await _keyword_score(
+        CRISIS_KEYWORDS,
+        {
+            "mission_location": payload.mission_location,
+            "crisis_type": payload.crisis_type,
+            "local_conditions": payload.local_conditions,
+            "constraints": " ".join(payload.constraints),
+            "embassy_resources": " ".join(payload.embassy_resources),
+            "scenario_doc_text": payload.scenario_doc_text,
+        },
+        shed,
     )
     relevance_warning = None
     if relevance_status == "low":
         relevance_warning = "Scenario inputs appear weakly related to consular crisis planning. Output may be unreliable."
+    return relevance_status, round(relevance_score, 3), relevance_warning
 
-    ai_response = _build_crisis_ai_response(payload, now, ref) if OPENROUTER_API_KEY else None
-    response = ai_response if ai_response is not None else _build_crisis_fallback(payload, now, ref)
+
+async def _generate_crisis(payload: CrisisGenerateRequest, shed: bool = True) -> CrisisGenerateResponse:
+    now = datetime.now(timezone.utc)
+    ref = f"KHM-GOV-{now.strftime('%Y%m%d')}-CR-{now.strftime('%H%M%S')}"
+    with metrics.stage("relevance"):
+        relevance_status, relevance_score, relevance_warning = await _crisis_relevance(payload, shed)
+
+    failures = track_provider_failures()
+    cache_key = _crisis_cache_key(payload)
+    ai_response = _cached_crisis_response(cache_key, now, ref)
+    if ai_response is None:
+        ai_response = await _warm_crisis_response(payload, cache_key, now, ref)
+    if ai_response is None and OPENROUTER_API_KEY:
+        ai_response = await _coalesced_ai_response(
+            cache_key,
+            lambda: _build_crisis_ai_response(payload, now, ref),
+            now,
+            ref,
+            # a partly templated plan is worth retrying on the next request
+            cacheable=lambda response: not response.fallback_sections,
+        )
+    response = ai_response if ai_response is not None else _build_crisis_fallback(payload, now, ref, _fallback_reason(failures))
     response.relevance_status = relevance_status
-    response.relevance_score = round(relevance_score, 3)
+    response.relevance_score = relevance_score
     response.relevance_warning = relevance_warning
-    response.quality_gate = _build_crisis_quality_gate(response)
+    with metrics.stage("quality_gate"):
+        response.quality_gate = _build_crisis_quality_gate(response)
+    metrics.record_outcome(response.mode_used.value, response.fallback_reason, response.quality_gate.passed)
     return response
+
+
+@app.post("/api/crisis/generate", response_model=CrisisGenerateResponse)
+async def crisis_generate(payload: CrisisGenerateRequest) -> Response:
+    metrics.endpoint_label.set("crisis")
+    # never refused at the door: a saturated CPU pool scores relevance inline
+    # and a shed provider call falls back to the template plan
+    admission_priority.set(HIGH)
+    waits = track_queue_wait()
+    response = await _generate_crisis(payload, shed=False)
+    return _json_response(_crisis_response_json(response), _queue_wait_headers(waits))
+
+
+async def _read_batch_body(request: Request) -> str:
+    chunks: List[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if BATCH_MAX_BYTES > 0 and size > BATCH_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Batch body exceeds {BATCH_MAX_BYTES} bytes")
+        chunks.append(chunk)
+    body = b"".join(chunks).decode("utf-8", errors="replace")
+    if not body.strip():
+        raise HTTPException(status_code=400, detail="Batch body is empty; send one JSON object per line")
+    return body
+
+
+def _batch_items(body: str, pilot: str) -> List[Tuple[int, str, Any]]:
+    items = parse_items(body, DataFileReader(BATCH_DATA_ROOT), pilot)
+    if BATCH_MAX_ITEMS > 0 and len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch has {len(items)} items; limit is {BATCH_MAX_ITEMS}")
+    return items
+
+
+async def _run_batch(
+    items: List[Tuple[int, str, Any]],
+    request_model: Any,
+    run: Any,
+    concurrency: int,
+    endpoint: str,
+) -> AsyncIterator[bytes]:
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, BATCH_MAX_CONCURRENCY)))
+
+    async def run_item(line_no: int, item_id: str, fields: Any) -> Dict[str, Any]:
+        metrics.endpoint_label.set(endpoint)
+        waits = track_queue_wait()
+        async with semaphore:
+            item_started = time.perf_counter()
+            record: Dict[str, Any] = {"type": "result", "id": item_id, "line": line_no}
+            try:
+                if isinstance(fields, Exception):
+                    raise fields
+                # the batch was admitted as a whole; items wait for slots rather than fail
+                response = await run(request_model.model_validate(fields), shed=False)
+                with metrics.stage("serialization"):
+                    record.update(ok=True, response=response.model_dump())
+            except ValidationError as e:
+                record.update(ok=False, error="validation_error", detail=e.errors(include_url=False, include_context=False))
+            except Exception as e:
+                record.update(ok=False, error=type(e).__name__, detail=str(e))
+            record["elapsed_ms"] = round((time.perf_counter() - item_started) * 1000, 1)
+            record["queue_wait_ms"] = round(sum(waits) * 1000.0, 1)
+            return record
+
+    tasks = [asyncio.ensure_future(run_item(*item)) for item in items]
+    succeeded = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            record = await next_done
+            succeeded += 1 if record["ok"] else 0
+            yield _ndjson(record)
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield _ndjson(
+        {
+            "type": "summary",
+            "items": len(items),
+            "ok": succeeded,
+            "failed": len(items) - succeeded,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    )
+
+
+@app.post("/api/treaty/analyze-batch")
+async def treaty_analyze_batch(request: Request, concurrency: int = BATCH_DEFAULT_CONCURRENCY) -> StreamingResponse:
+    metrics.endpoint_label.set("treaty_batch")
+    if OPENROUTER_API_KEY:
+        _shed_if_backlogged()
+    items = _batch_items(await _read_batch_body(request), "treaty")
+    return StreamingResponse(
+        _run_batch(items, TreatyAnalyzeRequest, _analyze_treaty, concurrency, "treaty_batch"),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.post("/api/crisis/generate-batch")
+async def crisis_generate_batch(request: Request, concurrency: int = BATCH_DEFAULT_CONCURRENCY) -> StreamingResponse:
+    metrics.endpoint_label.set("crisis_batch")
+    if OPENROUTER_API_KEY:
+        _shed_if_backlogged()
+    items = _batch_items(await _read_batch_body(request), "crisis")
+    return StreamingResponse(
+        _run_batch(items, CrisisGenerateRequest, _generate_crisis, concurrency, "crisis_batch"),
+        media_type="application/x-ndjson",
+    )
+
+
+class JobKind(str, Enum):
+    treaty = "treaty"
+    crisis = "crisis"
+
+
+class JobSubmitRequest(StrictSchema):
+    kind: JobKind
+    payload: Dict[str, Any]
+    webhook_url: Optional[str] = Field(default=None, max_length=2048)
+
+
+class JobStatusResponse(StrictSchema):
+    job_id: str
+    kind: JobKind
+    status: str
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+    finished_at: Optional[str] = None
+    poll_url: str
+    result_url: str
+
+
+async def _treaty_job(payload: Dict[str, Any], final_attempt: bool) -> Dict[str, Any]:
+    metrics.endpoint_label.set("treaty_job")
+    # workers run one job after another in the same context
+    admission_priority.set(LOW)
+    response = await _analyze_treaty(TreatyAnalyzeRequest.model_validate(payload), shed=False)
+    if response.mode_used == ModeUsed.fallback and OPENROUTER_API_KEY and not final_attempt:
+        raise RetryableJobError(response.fallback_reason or "fallback")
+    return response.model_dump(mode="json")
+
+
+async def _crisis_job(payload: Dict[str, Any], final_attempt: bool) -> Dict[str, Any]:
+    metrics.endpoint_label.set("crisis_job")
+    admission_priority.set(HIGH)
+    response = await _generate_crisis(CrisisGenerateRequest.model_validate(payload), shed=False)
+    if response.mode_used == ModeUsed.fallback and OPENROUTER_API_KEY and not final_attempt:
+        raise RetryableJobError(response.fallback_reason or "fallback")
+    return response.model_dump(mode="json")
+
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=timezone.utc).isoformat()
+
+
+def _job_status(job: Dict[str, Any]) -> JobStatusResponse:
+    return JobStatusResponse(
+        job_id=job["id"],
+        kind=JobKind(job["kind"]),
+        status=job["status"],
+        attempts=job["attempts"],
+        max_attempts=job["max_attempts"],
+        error=job["error"],
+        created_at=_timestamp(job["created_at"]) or "",
+        updated_at=_timestamp(job["updated_at"]) or "",
+        finished_at=_timestamp(job["finished_at"]),
+        poll_url=f"/api/jobs/{job['id']}",
+        result_url=f"/api/jobs/{job['id']}/result",
+    )
+
+
+def _require_job_queue() -> JobQueue:
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue is not running")
+    return job_queue
+
+
+async def _require_job(job_id: str) -> Dict[str, Any]:
+    job = await asyncio.to_thread(_require_job_queue().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id")
+    return job
+
+
+@app.post("/api/jobs", response_model=JobStatusResponse, status_code=202)
+async def submit_job(request: JobSubmitRequest) -> Response:
+    queue = _require_job_queue()
+    model = TreatyAnalyzeRequest if request.kind == JobKind.treaty else CrisisGenerateRequest
+    try:
+        payload = model.model_validate(request.payload)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    if request.webhook_url and not webhook_allowed(request.webhook_url, JOBS_WEBHOOK_ALLOWED_HOSTS):
+        raise HTTPException(status_code=400, detail="webhook_url must point to an allowed local host")
+    job = await queue.submit(request.kind.value, payload.model_dump(mode="json"), JOBS_MAX_ATTEMPTS, request.webhook_url)
+    return FastJSONResponse(_job_status(job), status_code=202)
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str) -> Response:
+    return FastJSONResponse(_job_status(await _require_job(job_id)))
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str) -> Response:
+    job = await _require_job(job_id)
+    if job["status"] == SUCCEEDED:
+        return FastJSONResponse(RawJSON(job["result"].encode("utf-8")))
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=409, detail=f"Job failed: {job['error']}")
+    return FastJSONResponse(_job_status(job), status_code=202, headers={"Retry-After": "5"})
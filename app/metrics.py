@@ -0,0 +1,236 @@
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+endpoint_label: "contextvars.ContextVar[str]" = contextvars.ContextVar("endpoint_label", default="unknown")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], buckets: Sequence[float] = STAGE_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # one slot per finite bucket, then +Inf, sum and count
+                series = self._series[key] = [0.0] * (len(self.buckets) + 3)
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[idx] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0.0
+            for idx, bound in enumerate(self.buckets + (math.inf,)):
+                cumulative += series[idx]
+                labels = _format_labels(self.labels, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(series[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[object] = []
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str]) -> Counter:
+        metric = Counter(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str], buckets: Sequence[float] = STAGE_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())  # type: ignore[attr-defined]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "kham_stage_duration_seconds", "Time spent in each analysis pipeline stage.", ("endpoint", "stage")
+)
+MODE_USED = registry.counter("kham_responses_total", "Responses returned, by mode_used.", ("endpoint", "mode"))
+FALLBACKS = registry.counter("kham_fallbacks_total", "Fallback responses, by fallback_reason.", ("endpoint", "reason"))
+QUALITY_GATE_FAILURES = registry.counter(
+    "kham_quality_gate_failures_total", "Responses whose quality gate did not pass.", ("endpoint",)
+)
+PROVIDER_RESPONSES = registry.counter(
+    "kham_provider_responses_total", "Provider calls, by HTTP status or transport error.", ("endpoint", "status")
+)
+PROVIDER_RETRIES = registry.counter(
+    "kham_provider_retries_total", "Provider calls retried after a 429/5xx or transport error.", ("endpoint", "status")
+)
+PROVIDER_HEDGES = registry.counter(
+    "kham_provider_hedges_total", "Hedged provider requests sent after the p95 delay.", ("endpoint",)
+)
+PROMPT_TOKENS = registry.counter(
+    "kham_prompt_tokens_total",
+    "Estimated document tokens per prompt: as received, after compaction, and as sent.",
+    ("endpoint", "phase"),
+)
+COALESCED = registry.counter(
+    "kham_coalesced_requests_total",
+    "Provider-bound requests by single-flight role: leader made the call, follower shared it.",
+    ("endpoint", "role"),
+)
+JSON_REPAIRS = registry.counter(
+    "kham_json_repairs_total",
+    "Provider completions that were not valid JSON as sent, by whether the repair parser salvaged an object.",
+    ("endpoint", "outcome"),
+)
+FOLLOW_UPS = registry.counter(
+    "kham_follow_ups_total",
+    "Targeted follow-up completions for short AI responses, by whether the merged response was usable.",
+    ("endpoint", "outcome"),
+)
+CRISIS_SECTIONS = registry.counter(
+    "kham_crisis_sections_total",
+    "Sectioned crisis generation, by section and whether it was generated or fell back to the template.",
+    ("endpoint", "section", "outcome"),
+)
+WARM_PLANS = registry.counter(
+    "kham_warm_plans_total",
+    "Crisis requests answered from the pre-generated plan store: served as is, refined, or served as a seed.",
+    ("endpoint", "outcome"),
+)
+QUEUE_WAIT = registry.histogram(
+    "kham_admission_wait_seconds",
+    "Time provider calls waited for an admission slot, by priority.",
+    ("endpoint", "priority"),
+)
+ADMISSION_SHED = registry.counter(
+    "kham_admission_shed_total",
+    "Work refused by admission control: at the entry point, on a full queue, or after waiting too long.",
+    ("endpoint", "priority", "reason"),
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint_label.get(), stage=name)
+
+
+def record_provider_status(status: str) -> None:
+    PROVIDER_RESPONSES.inc(endpoint=endpoint_label.get(), status=status)
+
+
+def record_prompt_tokens(received: int, compacted: int, sent: int) -> None:
+    endpoint = endpoint_label.get()
+    PROMPT_TOKENS.inc(received, endpoint=endpoint, phase="received")
+    PROMPT_TOKENS.inc(compacted, endpoint=endpoint, phase="compacted")
+    PROMPT_TOKENS.inc(sent, endpoint=endpoint, phase="sent")
+
+
+def record_coalesced(shared: bool) -> None:
+    COALESCED.inc(endpoint=endpoint_label.get(), role="follower" if shared else "leader")
+
+
+def record_json_repair(salvaged: bool) -> None:
+    JSON_REPAIRS.inc(endpoint=endpoint_label.get(), outcome="salvaged" if salvaged else "unrecoverable")
+
+
+def record_follow_up(rescued: bool) -> None:
+    FOLLOW_UPS.inc(endpoint=endpoint_label.get(), outcome="rescued" if rescued else "still_short")
+
+
+def record_crisis_section(section: str, generated: bool) -> None:
+    CRISIS_SECTIONS.inc(endpoint=endpoint_label.get(), section=section, outcome="ai" if generated else "fallback")
+
+
+def record_warm_plan(outcome: str) -> None:
+    WARM_PLANS.inc(endpoint=endpoint_label.get(), outcome=outcome)
+
+
+def record_queue_wait(priority: str, seconds: float) -> None:
+    QUEUE_WAIT.observe(seconds, endpoint=endpoint_label.get(), priority=priority)
+
+
+def record_admission_shed(priority: str, reason: str) -> None:
+    ADMISSION_SHED.inc(endpoint=endpoint_label.get(), priority=priority, reason=reason)
+
+
+def record_outcome(mode: str, fallback_reason: Optional[str], gate_passed: bool) -> None:
+    endpoint = endpoint_label.get()
+    MODE_USED.inc(endpoint=endpoint, mode=mode)
+    if mode == "fallback":
+        FALLBACKS.inc(endpoint=endpoint, reason=fallback_reason or "unspecified")
+    if not gate_passed:
+        QUALITY_GATE_FAILURES.inc(endpoint=endpoint)
@@ -0,0 +1,118 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+INLINE = "inline"
+THREAD = "thread"
+PROCESS = "process"
+MODES = (INLINE, THREAD, PROCESS)
+
+
+class OffloadSaturated(Exception):
+    pass
+
+
+class CpuOffload:
+    # Moves CPU-bound stages off the event loop. "process" runs them in
+    # parallel in spawned workers, so the function and its arguments must
+    # pickle and the function must live in a module that is cheap to import
+    # (not app.main). "thread" is for work that releases the GIL; for work
+    # that does not it still keeps the loop answering between switch
+    # intervals. "inline" runs everything in place. Inputs under
+    # inline_max_chars always run inline, where the hand-off would cost more
+    # than the work. At most max_pending tasks are queued or running; past
+    # that a stage runs inline, or raises OffloadSaturated if it asked to be
+    # shed instead. A stage that must never block the loop passes
+    # allow_inline=False and gets a plain thread wherever it would run inline.
+
+    def __init__(self, mode: str = THREAD, workers: int = 0, max_pending: int = 0, inline_max_chars: int = 32768) -> None:
+        if mode not in MODES:
+            raise ValueError(f"unknown offload mode '{mode}'; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.workers = workers if workers > 0 else min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending if max_pending > 0 else self.workers * 4
+        self.inline_max_chars = inline_max_chars
+        self._pool: Optional[Executor] = None
+        # only touched from the event loop thread
+        self._pending = 0
+        self._placements: Dict[Tuple[str, str], int] = {}
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def saturated(self) -> bool:
+        return self.mode != INLINE and self._pending >= self.max_pending
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            if self.mode == PROCESS:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kham-cpu")
+        return self._pool
+
+    def _place(self, stage: str, placement: str) -> None:
+        key = (stage, placement)
+        self._placements[key] = self._placements.get(key, 0) + 1
+
+    async def run(
+        self,
+        stage: str,
+        fn: Callable[..., T],
+        *args: Any,
+        size: Optional[int] = None,
+        shed: bool = False,
+        allow_inline: bool = True,
+    ) -> T:
+        if self.mode == INLINE or (size is not None and size < self.inline_max_chars):
+            return await self._in_place(stage, "inline", allow_inline, fn, *args)
+        if self._pending >= self.max_pending:
+            if shed:
+                self._place(stage, "rejected")
+                raise OffloadSaturated(f"{self._pending} CPU-bound tasks are already pending; retry shortly")
+            return await self._in_place(stage, "overflow", allow_inline, fn, *args)
+        self._place(stage, self.mode)
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor(), fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def _in_place(self, stage: str, placement: str, allow_inline: bool, fn: Callable[..., T], *args: Any) -> T:
+        if allow_inline:
+            self._place(stage, placement)
+            return fn(*args)
+        self._place(stage, f"{placement}_thread")
+        return await asyncio.to_thread(fn, *args)
+
+    async def prestart(self) -> None:
+        # spawned workers take a while to boot; start them before traffic does
+        if self.mode == INLINE:
+            return
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        await asyncio.gather(*(loop.run_in_executor(pool, os.getpid) for _ in range(self.workers)))
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        placements: Dict[str, Dict[str, int]] = {}
+        for (stage, placement), count in sorted(self._placements.items()):
+            placements.setdefault(stage, {})[placement] = count
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "saturated": self.saturated,
+            "placements": placements,
+        }
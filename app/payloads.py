@@ -0,0 +1,134 @@
+import json
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_DATA_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "synthetic-data")
+DEFAULT_EMBASSY_RESOURCES = ["Mission crisis cell", "Consular section", "Warden network", "Mission vehicles"]
+
+TREATY_FIELDS = {
+    "treaty_text",
+    "national_law_text",
+    "treaty_doc_text",
+    "law_doc_text",
+    "treaty_name",
+    "law_name",
+    "analysis_mode",
+    "previous_reference_no",
+}
+CRISIS_FIELDS = {
+    "mission_location",
+    "crisis_type",
+    "nationals_affected",
+    "embassy_resources",
+    "constraints",
+    "local_conditions",
+    "scenario_doc_text",
+    "generation_mode",
+}
+
+
+class PayloadError(ValueError):
+    pass
+
+
+class DataFileReader:
+    def __init__(self, root: Optional[str]) -> None:
+        self.root = os.path.realpath(root) if root else None
+        self._cache: Dict[str, str] = {}
+
+    def read(self, relative: str) -> str:
+        if not self.root:
+            raise PayloadError("file references are disabled on this server")
+        path = os.path.realpath(os.path.join(self.root, relative))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise PayloadError(f"file reference escapes data root: {relative}")
+        if path not in self._cache:
+            try:
+                with open(path, "r", encoding="utf-8") as fh:
+                    self._cache[path] = fh.read()
+            except OSError as e:
+                raise PayloadError(f"cannot read {relative}: {e.strerror}")
+        return self._cache[path]
+
+
+def iter_jsonl(body: str) -> Iterator[Tuple[int, Any]]:
+    for line_no, line in enumerate(body.splitlines(), start=1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        try:
+            yield line_no, json.loads(stripped)
+        except json.JSONDecodeError as e:
+            yield line_no, PayloadError(f"invalid JSON: {e.msg}")
+
+
+def _item_id(item: Dict[str, Any], line_no: int) -> str:
+    return str(item.get("id") or f"line-{line_no}")
+
+
+def treaty_request_fields(item: Dict[str, Any], reader: DataFileReader) -> Dict[str, Any]:
+    if isinstance(item.get("payload"), dict):
+        return dict(item["payload"])
+    if "txt_file" not in item and "law_txt_file" not in item:
+        return {k: v for k, v in item.items() if k in TREATY_FIELDS}
+
+    fields: Dict[str, Any] = {
+        "treaty_name": item.get("treaty") or item.get("treaty_name") or "Unknown Treaty",
+        "law_name": item.get("national_instrument") or item.get("law_name") or "Unknown Law",
+    }
+    if item.get("txt_file"):
+        fields["treaty_doc_text"] = reader.read(item["txt_file"])
+    if item.get("law_txt_file"):
+        fields["law_doc_text"] = reader.read(item["law_txt_file"])
+    fields.update({k: v for k, v in item.items() if k in TREATY_FIELDS})
+    return fields
+
+
+_SITUATION = re.compile(r"Situation Summary\s*\n(.+?)\n\s*\n", re.DOTALL)
+_REGISTERED = re.compile(r"Registered nationals in area:\s*([0-9]+)")
+
+
+def crisis_request_fields(item: Dict[str, Any], reader: DataFileReader) -> Dict[str, Any]:
+    if isinstance(item.get("payload"), dict):
+        return dict(item["payload"])
+    if "txt_file" not in item:
+        return {k: v for k, v in item.items() if k in CRISIS_FIELDS}
+
+    scenario = reader.read(item["txt_file"])
+    mission = str(item.get("mission", ""))
+    crisis_type = str(item.get("crisis_type", ""))
+    constraint = str(item.get("constraint", ""))
+    situation = _SITUATION.search(scenario)
+    registered = _REGISTERED.search(scenario)
+    summary = " ".join(situation.group(1).split()) if situation else ""
+    fields: Dict[str, Any] = {
+        "mission_location": mission,
+        "crisis_type": crisis_type,
+        "nationals_affected": int(registered.group(1)) if registered else 0,
+        "embassy_resources": list(DEFAULT_EMBASSY_RESOURCES),
+        "constraints": [constraint] if constraint else [],
+        "local_conditions": f"{crisis_type} affecting {mission or 'the mission area'}; primary constraint: {constraint or 'none stated'}. {summary}".strip()[:5000],
+        "scenario_doc_text": scenario,
+    }
+    fields.update({k: v for k, v in item.items() if k in CRISIS_FIELDS})
+    return fields
+
+
+def parse_items(
+    body: str, reader: DataFileReader, pilot: str
+) -> List[Tuple[int, str, Any]]:
+    build = treaty_request_fields if pilot == "treaty" else crisis_request_fields
+    items: List[Tuple[int, str, Any]] = []
+    for line_no, item in iter_jsonl(body):
+        if isinstance(item, PayloadError):
+            items.append((line_no, f"line-{line_no}", item))
+            continue
+        if not isinstance(item, dict):
+            items.append((line_no, f"line-{line_no}", PayloadError("each line must be a JSON object")))
+            continue
+        try:
+            items.append((line_no, _item_id(item, line_no), build(item, reader)))
+        except PayloadError as e:
+            items.append((line_no, _item_id(item, line_no), e))
+    return items
@@ -0,0 +1,112 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_label(value: str) -> str:
+    # "Civil-Disturbance" and "civil disturbance" name the same thing
+    return " ".join(_NON_WORD.split(value.lower())).strip()
+
+
+def combination_key(mission: str, crisis_type: str, constraint: str) -> str:
+    return "|".join(normalize_label(part) for part in (mission, crisis_type, constraint))
+
+
+class PlanMatch(NamedTuple):
+    combination: Dict[str, str]
+    plan: Dict[str, Any]
+    exact: bool
+
+
+class PlanStore:
+    # Pre-generated crisis plans for the mission x crisis type x constraint
+    # matrix. Plans are zlib-compressed JSON in SQLite; the match index for
+    # all combinations is kept in memory, plan bodies are read on demand.
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS warm_plans ("
+            "key TEXT PRIMARY KEY, combination TEXT NOT NULL, plan BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        # crisis type -> [(mission, constraint, key)]
+        self._index: Dict[str, List[Tuple[str, str, str]]] = {}
+        self.exact_hits = 0
+        self.seed_hits = 0
+        self.misses = 0
+        for key, in self._db.execute("SELECT key FROM warm_plans"):
+            self._index_key(key)
+
+    def _index_key(self, key: str) -> None:
+        mission, crisis_type, constraint = key.split("|")
+        entries = self._index.setdefault(crisis_type, [])
+        if (mission, constraint, key) not in entries:
+            entries.append((mission, constraint, key))
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._index.values())
+
+    def has(self, key: str) -> bool:
+        mission, crisis_type, constraint = key.split("|")
+        return (mission, constraint, key) in self._index.get(crisis_type, [])
+
+    def put(self, combination: Dict[str, str], plan: Dict[str, Any]) -> None:
+        key = combination_key(combination["mission"], combination["crisis_type"], combination["constraint"])
+        blob = zlib.compress(json.dumps(plan, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 9)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO warm_plans (key, combination, plan, created_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(combination, separators=(",", ":")), blob, time.time()),
+            )
+            self._index_key(key)
+
+    def _load(self, key: str) -> Optional[Tuple[Dict[str, str], Dict[str, Any]]]:
+        with self._lock:
+            row = self._db.execute("SELECT combination, plan FROM warm_plans WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), json.loads(zlib.decompress(row[1]).decode("utf-8"))
+
+    def closest(self, mission: str, crisis_type: str, constraints: Sequence[str]) -> Optional[PlanMatch]:
+        # Only plans for the same crisis type are candidates. A plan for the same
+        # mission and the request's only constraint is exact; one that shares
+        # the mission or a constraint is a seed for refinement.
+        mission_key = normalize_label(mission)
+        constraint_keys = {normalize_label(c) for c in constraints}
+        best: Optional[Tuple[int, str]] = None
+        for entry_mission, entry_constraint, key in self._index.get(normalize_label(crisis_type), []):
+            score = (2 if entry_mission == mission_key else 0) + (1 if entry_constraint in constraint_keys else 0)
+            if score and (best is None or score > best[0]):
+                best = (score, key)
+        loaded = self._load(best[1]) if best is not None else None
+        if best is None or loaded is None:
+            self.misses += 1
+            return None
+        exact = best[0] == 3 and len(constraint_keys) == 1
+        if exact:
+            self.exact_hits += 1
+        else:
+            self.seed_hits += 1
+        return PlanMatch(loaded[0], loaded[1], exact)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self),
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "exact_hits": self.exact_hits,
+            "seed_hits": self.seed_hits,
+            "misses": self.misses,
+        }
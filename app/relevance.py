@@ -0,0 +1,121 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+KeywordSpec = Union[str, Tuple[str, float]]
+
+SCAN_CHUNK_CHARS = 16384
+
+
+class RelevanceScore(NamedTuple):
+    status: str
+    score: float
+    field_scores: Dict[str, float]
+
+
+def relevance_status(score: float, high: float = 0.5, medium: float = 0.2) -> str:
+    if score >= high:
+        return "high"
+    if score >= medium:
+        return "medium"
+    return "low"
+
+
+class KeywordMatcher:
+    # Keywords match at a word start (and a word end too with whole_words,
+    # unless written as "evac*"). str.find rejects absent keywords at memchr
+    # speed before the boundary-checking pattern runs, and chunked lowering
+    # stops the scan once every keyword has been seen.
+
+    def __init__(
+        self,
+        keywords: Sequence[KeywordSpec],
+        whole_words: bool = False,
+        cache_size: int = 32,
+        chunk_chars: int = SCAN_CHUNK_CHARS,
+    ) -> None:
+        self.weights: Dict[str, float] = {}
+        self._patterns: List[Tuple[str, "re.Pattern[str]"]] = []
+        for spec in keywords:
+            word, weight = (spec, 1.0) if isinstance(spec, str) else spec
+            word = word.strip().lower()
+            prefix = word.endswith("*") or not whole_words
+            word = word.rstrip("*")
+            if not word or word in self.weights:
+                continue
+            self.weights[word] = float(weight)
+            escaped = re.escape(word)
+            tail = "" if prefix else r"(?!\w)"
+            self._patterns.append((word, re.compile(f"{escaped}(?<!\\w{escaped}){tail}")))
+        self.total_weight = sum(self.weights.values())
+        self._overlap = max((len(word) for word in self.weights), default=0) + 1
+        self._chunk = max(chunk_chars, self._overlap * 4)
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # offload workers get the compiled patterns, not the cache or the lock
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_cache"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def found(self, text: Optional[str]) -> FrozenSet[str]:
+        if not text or not self._patterns:
+            return frozenset()
+        if self._cache_size > 0:
+            with self._lock:
+                cached = self._cache.get(text)
+                if cached is not None:
+                    self._cache.move_to_end(text)
+                    return cached
+        hits = self._scan(text)
+        if self._cache_size > 0:
+            with self._lock:
+                self._cache[text] = hits
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return hits
+
+    def _scan(self, text: str) -> FrozenSet[str]:
+        pending = list(self._patterns)
+        hits = set()
+        length = len(text)
+        pos = 0
+        while pos < length and pending:
+            start = max(0, pos - self._overlap)
+            window = text[start : pos + self._chunk + 1].lower()
+            offset = 1 if start else 0
+            remaining = []
+            for word, pattern in pending:
+                idx = window.find(word, offset)
+                if idx != -1 and pattern.search(window, idx):
+                    hits.add(word)
+                else:
+                    remaining.append((word, pattern))
+            pending = remaining
+            pos += self._chunk
+        return frozenset(hits)
+
+    def weight_of(self, hits: FrozenSet[str]) -> float:
+        if self.total_weight <= 0:
+            return 0.0
+        return min(1.0, sum(self.weights[word] for word in hits) / self.total_weight)
+
+    def score(self, fields: Mapping[str, Optional[str]], high: float = 0.5, medium: float = 0.2) -> RelevanceScore:
+        if not any(text and not text.isspace() for text in fields.values()):
+            return RelevanceScore("low", 0.0, {name: 0.0 for name in fields})
+        per_field = {name: self.found(text) for name, text in fields.items()}
+        combined: FrozenSet[str] = frozenset().union(*per_field.values())
+        score = self.weight_of(combined)
+        return RelevanceScore(
+            relevance_status(score, high, medium),
+            score,
+            {name: round(self.weight_of(hits), 3) for name, hits in per_field.items()},
+        )
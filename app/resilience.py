@@ -0,0 +1,148 @@
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+provider_failures: "contextvars.ContextVar[Optional[List[str]]]" = contextvars.ContextVar(
+    "provider_failures", default=None
+)
+
+
+def track_provider_failures() -> List[str]:
+    failures: List[str] = []
+    provider_failures.set(failures)
+    return failures
+
+
+def note_provider_failure(reason: str) -> None:
+    failures = provider_failures.get()
+    if failures is not None:
+        failures.append(reason)
+
+
+def retry_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    # full jitter: spreads retries from many callers over the whole window
+    delay = random.uniform(0.0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(cap, retry_after))
+    return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    # Trips when, over the last window_seconds and at least min_calls calls,
+    # the failure rate or the share of calls slower than slow_call_seconds
+    # crosses its threshold. After open_seconds a single probe is let through;
+    # its outcome closes the breaker again or re-opens it.
+
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.trips = 0
+        self.rejected = 0
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def abandon(self) -> None:
+        # the caller was let through but never made the call; free the probe
+        # so the next caller can make it instead
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def record(self, ok: bool, seconds: float) -> None:
+        now = time.monotonic()
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if ok and not slow:
+                    self.state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._trip(now)
+                return
+            self._calls.append((now, ok, slow))
+            while self._calls and now - self._calls[0][0] > self.window_seconds:
+                self._calls.popleft()
+            if self.state != CLOSED or len(self._calls) < self.min_calls:
+                return
+            failed = sum(1 for _, call_ok, _ in self._calls if not call_ok)
+            slowed = sum(1 for _, _, call_slow in self._calls if call_slow)
+            if failed / len(self._calls) >= self.failure_rate or slowed / len(self._calls) >= self.slow_call_rate:
+                self._trip(now)
+
+    def _trip(self, now: float) -> None:
+        self.state = OPEN
+        self.trips += 1
+        self._opened_at = now
+        self._calls.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "window_calls": len(self._calls),
+                "window_failures": sum(1 for _, ok, _ in self._calls if not ok),
+            }
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
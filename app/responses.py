@@ -0,0 +1,28 @@
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+class RawJSON(bytes):
+    # A body that is already rendered JSON, such as a spliced fallback or a
+    # stored job result. Only this type is sent as is; a plain str or bytes
+    # is encoded like any other value.
+    pass
+
+
+class FastJSONResponse(ORJSONResponse):
+    # Endpoints return this for objects the pipeline built and validated
+    # itself, which skips FastAPI's response_model pass; the route's
+    # response_model still documents the schema. RawJSON passes through,
+    # models go straight to pydantic-core's encoder, anything else through
+    # orjson. Models are not sent through orjson because that needs a
+    # model_dump() copy first, and orjson reserves ~4 bytes per character of
+    # output, which adds up on extracted_text.
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, RawJSON):
+            return bytes(content)
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return super().render(content)
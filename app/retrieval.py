@@ -0,0 +1,49 @@
+from collections import Counter
+import math
+import re
+from typing import Dict, List, Sequence, Tuple
+
+TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or shall such that the this to which with "
+    "any all may must not be been being other under upon into their there these those than".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+class BM25Index:
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        self._lengths: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, doc in enumerate(documents):
+            counts = Counter(tokenize(doc))
+            self._lengths.append(sum(counts.values()))
+            for term, freq in counts.items():
+                self._postings.setdefault(term, []).append((doc_id, freq))
+        self._avg_length = (sum(self._lengths) / self.size) if self.size else 0.0
+        self._idf = {
+            term: math.log(1.0 + (self.size - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[int, float]]:
+        if not self.size or k <= 0:
+            return []
+        scores: Dict[int, float] = {}
+        avg = self._avg_length or 1.0
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for doc_id, freq in postings:
+                norm = freq + self.k1 * (1.0 - self.b + self.b * self._lengths[doc_id] / avg)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.k1 + 1.0) / norm
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
@@ -0,0 +1,102 @@
+import math
+import re
+from typing import List, Tuple
+
+ARTICLE_HEADING = re.compile(
+    r"^[ \t]*(?:ARTICLE|Article|Art\.)[ \t]+([0-9]+[A-Za-z]?|[IVXLCDM]+)\b[^\n]*$",
+    re.MULTILINE,
+)
+PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+
+
+def split_articles(text: str) -> List[Tuple[str, str]]:
+    matches = list(ARTICLE_HEADING.finditer(text or ""))
+    if not matches:
+        return []
+
+    out: List[Tuple[str, str]] = []
+    preamble = text[: matches[0].start()].strip()
+    if preamble:
+        out.append(("Preamble", preamble))
+    for idx, match in enumerate(matches):
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(text)
+        body = text[match.start() : end].strip()
+        if body:
+            out.append((f"Article {match.group(1)}", body))
+    return out
+
+
+def _hard_split(text: str, limit: int) -> List[str]:
+    return [text[i : i + limit] for i in range(0, len(text), limit)]
+
+
+def _pieces(text: str, limit: int) -> List[str]:
+    articles = split_articles(text)
+    units = [body for _, body in articles] if articles else [p.strip() for p in PARAGRAPH_BREAK.split(text) if p.strip()]
+    out: List[str] = []
+    for unit in units:
+        out.extend(_hard_split(unit, limit) if len(unit) > limit else [unit])
+    return out
+
+
+def _pack(pieces: List[str], limit: int) -> List[str]:
+    groups: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in pieces:
+        if current and size + len(piece) + 2 > limit:
+            groups.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 2
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
+
+
+def group_articles(text: str, max_chars: int = 12000, max_groups: int = 12) -> List[str]:
+    text = (text or "").strip()
+    if not text:
+        return []
+    limit = max(1000, max_chars)
+    if max_groups > 0:
+        limit = max(limit, math.ceil(len(text) / max_groups) + 2)
+    groups = _pack(_pieces(text, limit), limit)
+    while max_groups > 0 and len(groups) > max_groups:
+        limit = math.ceil(limit * 1.25)
+        groups = _pack(_pieces(text, limit), limit)
+    return groups
+
+
+SECTION_HEADING = re.compile(
+    r"^[ \t]*(?:SECTION|Section|Sec\.|RULE|Rule|CHAPTER|Chapter|§)[ \t]*([0-9]+[A-Za-z]?(?:\.[0-9]+)*|[IVXLCDM]+)\b[^\n]*$",
+    re.MULTILINE,
+)
+
+
+def split_sections(text: str, max_chars: int = 2000) -> List[Tuple[str, str]]:
+    text = (text or "").strip()
+    if not text:
+        return []
+    matches = list(SECTION_HEADING.finditer(text))
+    out: List[Tuple[str, str]] = []
+    if matches:
+        preamble = text[: matches[0].start()].strip()
+        if preamble:
+            out.append(("Preamble", preamble))
+        for idx, match in enumerate(matches):
+            end = matches[idx + 1].start() if idx + 1 < len(matches) else len(text)
+            body = text[match.start() : end].strip()
+            if body:
+                out.append((f"Section {match.group(1)}", body))
+    else:
+        out = [(f"Paragraph {idx + 1}", p.strip()) for idx, p in enumerate(PARAGRAPH_BREAK.split(text)) if p.strip()]
+
+    sized: List[Tuple[str, str]] = []
+    for label, body in out:
+        if len(body) <= max_chars:
+            sized.append((label, body))
+            continue
+        for part, chunk in enumerate(_hard_split(body, max_chars)):
+            sized.append((f"{label} (part {part + 1})", chunk))
+    return sized
@@ -0,0 +1,125 @@
+"""Pre-generate crisis plans for the valid-combinations matrix into the warm plan store.
+
+    python -m app.warm_plans --concurrency 8 --mode sectioned
+
+Uses the configured provider (OPENROUTER_API_KEY / OPENROUTER_API_URL, which may
+point at bench.mock_provider). Combinations already in the store are skipped
+unless --force is given. Prints a JSON report.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from app import main as api
+from app.payloads import DEFAULT_DATA_ROOT, DEFAULT_EMBASSY_RESOURCES, DataFileReader, crisis_request_fields
+from app.plans import PlanStore, combination_key
+
+MATRIX_FILE = "crisis-planner/valid-combinations-matrix.json"
+SCENARIO_DIR = "crisis-planner/inputs/txt/scenario"
+
+
+def matrix_requests(data_root: str, nationals: int) -> List[Tuple[Dict[str, str], Dict[str, Any]]]:
+    reader = DataFileReader(data_root)
+    with open(os.path.join(data_root, MATRIX_FILE), "r", encoding="utf-8") as fh:
+        matrix = json.load(fh)
+    scenario_dir = os.path.join(data_root, SCENARIO_DIR)
+    scenarios = {
+        name.split("_", 1)[0]: f"{SCENARIO_DIR}/{name}"
+        for name in (os.listdir(scenario_dir) if os.path.isdir(scenario_dir) else [])
+        if name.endswith(".txt")
+    }
+
+    out: List[Tuple[Dict[str, str], Dict[str, Any]]] = []
+    for entry in matrix.get("combinations", []):
+        combination = {
+            "id": str(entry["id"]),
+            "mission": str(entry["mission"]),
+            "crisis_type": str(entry["crisisType"]),
+            "constraint": str(entry["constraint"]),
+        }
+        item = {key: combination[key] for key in ("mission", "crisis_type", "constraint")}
+        if combination["id"] in scenarios:
+            fields = crisis_request_fields(dict(item, txt_file=scenarios[combination["id"]]), reader)
+        else:
+            fields = {
+                "mission_location": combination["mission"],
+                "crisis_type": combination["crisis_type"],
+                "nationals_affected": nationals,
+                "embassy_resources": list(DEFAULT_EMBASSY_RESOURCES),
+                "constraints": [combination["constraint"]],
+                "local_conditions": (
+                    f"{combination['crisis_type']} affecting {combination['mission']}; "
+                    f"primary constraint: {combination['constraint']}. Baseline plan for this combination."
+                ),
+            }
+        out.append((combination, fields))
+    return out
+
+
+async def warm(args: argparse.Namespace) -> Dict[str, Any]:
+    store = PlanStore(args.db)
+    todo = [
+        (combination, fields)
+        for combination, fields in matrix_requests(args.data_root, args.nationals)
+        if args.force or not store.has(combination_key(combination["mission"], combination["crisis_type"], combination["constraint"]))
+    ]
+    if args.limit:
+        todo = todo[: args.limit]
+
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    latencies: List[float] = []
+    failed: List[str] = []
+
+    async def one(combination: Dict[str, str], fields: Dict[str, Any]) -> None:
+        payload = api.CrisisGenerateRequest.model_validate(dict(fields, generation_mode=args.mode))
+        async with semaphore:
+            started = time.perf_counter()
+            response = await api._build_crisis_ai_response(payload, datetime.now(timezone.utc), combination["id"])
+            latencies.append(time.perf_counter() - started)
+        # only fully generated plans are worth serving later
+        if response is None or response.fallback_sections:
+            failed.append(combination["id"])
+            return
+        store.put(combination, response.model_dump(mode="json", include=set(api._CRISIS_COERCERS)))
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(combination, fields) for combination, fields in todo))
+    finally:
+        await api._get_openrouter_client().aclose()
+    report = {
+        "db": args.db,
+        "attempted": len(todo),
+        "stored": len(todo) - len(failed),
+        "failed": sorted(failed),
+        "seconds": round(time.perf_counter() - started, 2),
+        "mean_plan_seconds": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "store": store.stats(),
+    }
+    store.close()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=api.WARM_PLANS_DB)
+    parser.add_argument("--data-root", default=DEFAULT_DATA_ROOT)
+    parser.add_argument("--mode", choices=[mode.value for mode in api.CrisisGenerationMode], default="sectioned")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--nationals", type=int, default=500, help="nationals_affected for combinations without a scenario file")
+    parser.add_argument("--force", action="store_true", help="regenerate combinations already in the store")
+    args = parser.parse_args()
+    if not api.OPENROUTER_API_KEY:
+        sys.exit("OPENROUTER_API_KEY is not set")
+    print(json.dumps(asyncio.run(warm(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Measure crisis latency while routine treaty traffic saturates the provider.
+
+    python -m bench.admission --duration 20 --treaty-concurrency 48 --provider-max-concurrent 16
+
+Runs the API against a simulated provider that answers 429 past
+--provider-max-concurrent in-flight calls. For --duration seconds,
+--treaty-concurrency clients post treaty analyses back to back while
+--crisis-concurrency clients post crisis plans alongside them. The scenario is
+run once with admission control disabled and once with ADMISSION_MAX_IN_FLIGHT
+set to --max-in-flight, and reports latency, the X-Queue-Wait-Ms header,
+status codes, mode_used and fallback reasons per pilot. Prints a JSON report.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from app.payloads import DEFAULT_DATA_ROOT
+from bench.load import ENDPOINTS, git_commit, load_cases, start_api, start_provider, summarize, wait_ready
+
+
+def count(counter: Dict[str, int], key: str) -> None:
+    counter[key] = counter.get(key, 0) + 1
+
+
+async def drive(args: argparse.Namespace, cases: Dict[str, List[Dict[str, Any]]], api_port: int, proc: Any) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Any]] = {
+        pilot: {"latency_ms": [], "queue_wait_ms": [], "statuses": {}, "modes": {}, "fallback_reasons": {}} for pilot in ENDPOINTS
+    }
+    clients = args.treaty_concurrency + args.crisis_concurrency
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{api_port}", timeout=args.request_timeout, limits=limits) as client:
+        await wait_ready(client, proc)
+        deadline = time.perf_counter() + args.duration
+
+        async def worker(pilot: str, offset: int) -> None:
+            out = results[pilot]
+            sent = offset
+            while time.perf_counter() < deadline:
+                fields = cases[pilot][sent % len(cases[pilot])]
+                sent += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.post(ENDPOINTS[pilot], json=fields)
+                except httpx.HTTPError as e:
+                    count(out["statuses"], type(e).__name__)
+                    continue
+                out["latency_ms"].append((time.perf_counter() - started) * 1000.0)
+                count(out["statuses"], str(response.status_code))
+                if "X-Queue-Wait-Ms" in response.headers:
+                    out["queue_wait_ms"].append(float(response.headers["X-Queue-Wait-Ms"]))
+                if response.status_code == 200:
+                    body = response.json()
+                    count(out["modes"], body.get("mode_used", "unknown"))
+                    if body.get("fallback_reason"):
+                        count(out["fallback_reasons"], body["fallback_reason"])
+                elif response.status_code == 503:
+                    await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+        workers = [worker("treaty", idx) for idx in range(args.treaty_concurrency)]
+        workers += [worker("crisis", idx) for idx in range(args.crisis_concurrency)]
+        await asyncio.gather(*workers)
+        health = (await client.get("/api/health")).json()
+
+    report: Dict[str, Any] = {}
+    for pilot, out in results.items():
+        report[pilot] = {
+            "requests": len(out["latency_ms"]),
+            "latency_ms": summarize(out["latency_ms"]),
+            "queue_wait_ms": summarize(out["queue_wait_ms"]),
+            "status_counts": out["statuses"],
+            "mode_used": out["modes"],
+            "fallback_reasons": out["fallback_reasons"],
+        }
+    report["admission"] = health.get("admission")
+    return report
+
+
+def run(args: argparse.Namespace, cases: Dict[str, List[Dict[str, Any]]], max_in_flight: int) -> Dict[str, Any]:
+    provider, provider_port = start_provider(args)
+    os.environ["ADMISSION_MAX_IN_FLIGHT"] = str(max_in_flight)
+    try:
+        with tempfile.TemporaryDirectory(prefix="kham-admission-") as workdir:
+            # no pre-generated plans: every crisis request has to reach the provider
+            os.environ["WARM_PLANS_DB"] = os.path.join(workdir, "warm-plans.sqlite3")
+            proc, api_port = start_api(args, provider_port, workdir)
+            try:
+                result = asyncio.run(drive(args, cases, api_port, proc))
+            finally:
+                proc.terminate()
+                proc.wait(timeout=10)
+    finally:
+        provider.should_exit = True
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--treaty-concurrency", type=int, default=48)
+    parser.add_argument("--crisis-concurrency", type=int, default=2)
+    parser.add_argument("--max-in-flight", type=int, default=16, help="ADMISSION_MAX_IN_FLIGHT for the admission run")
+    parser.add_argument("--provider-max-concurrent", type=int, default=16, help="simulated provider answers 429 past this")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--provider-timeout", type=float, default=45.0)
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--data-root", default=DEFAULT_DATA_ROOT)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+    # start_provider/start_api read the load benchmark's settings
+    args.tokens_per_sec, args.failure_rate, args.cache = 0.0, 0.0, False
+
+    cases: Dict[str, List[Dict[str, Any]]] = {pilot: [] for pilot in ENDPOINTS}
+    for pilot, _, fields in load_cases(list(ENDPOINTS), args.data_root):
+        cases[pilot].append(fields)
+    if not all(cases.values()):
+        parser.error("need at least one valid treaty and one valid crisis payload")
+
+    config = {
+        key: getattr(args, key)
+        for key in (
+            "duration",
+            "treaty_concurrency",
+            "crisis_concurrency",
+            "max_in_flight",
+            "provider_max_concurrent",
+            "latency_ms",
+            "jitter_ms",
+        )
+    }
+    report = {
+        "benchmark": "admission",
+        "commit": git_commit(),
+        "config": config,
+        "uncapped": run(args, cases, 0),
+        "admission": run(args, cases, args.max_in_flight),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
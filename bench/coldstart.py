@@ -0,0 +1,177 @@
+"""Measure import time and time-to-first-byte of a freshly started API process.
+
+    python -m bench.coldstart --runs 3 --target-ms 2500
+
+Each run starts uvicorn from nothing (as after a scale-from-zero) against the
+simulated provider and times the first health check, the first crisis and
+treaty requests while warm-up is still running, /api/ready, and a second,
+warm crisis request. Prints a JSON report and exits non-zero when the median
+time from process start to the first crisis response exceeds --target-ms.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from app.payloads import DEFAULT_DATA_ROOT
+from bench.load import ENDPOINTS, ROOT, git_commit, load_cases, start_api, start_provider
+
+
+def import_profile(module: str, top: int) -> Dict[str, Any]:
+    # -X importtime reports microseconds per module, nested imports indented by depth
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    children: List[Tuple[str, int]] = []
+    imports: List[Tuple[str, int]] = []
+    loaded = set()
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        loaded.add(name.strip())
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        if depth == 1:
+            children.append((name.strip(), int(cumulative)))
+        elif depth == 0:
+            # a module is reported after everything it imported
+            if name.strip() == module:
+                imports, total = children, int(cumulative)
+            children = []
+    heaviest = sorted(imports, key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "total_ms": round(total / 1000.0, 1),
+        "heaviest_ms": {name: round(us / 1000.0, 1) for name, us in heaviest},
+        "loaded": {name: name in loaded for name in ("httpx", "pypdf")},
+    }
+
+
+def import_wall_ms(module: str) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, check=True)
+    return round((time.perf_counter() - started) * 1000.0, 1)
+
+
+async def timed(client: httpx.AsyncClient, method: str, path: str, **kwargs: Any) -> Tuple[float, httpx.Response]:
+    started = time.perf_counter()
+    response = await client.request(method, path, **kwargs)
+    return (time.perf_counter() - started) * 1000.0, response
+
+
+async def cold_run(args: argparse.Namespace, provider_port: int, cases: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="kham-coldstart-") as workdir:
+        spawned = time.perf_counter()
+        proc, api_port = start_api(args, provider_port, workdir)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{api_port}", timeout=args.request_timeout) as client:
+                while True:
+                    if proc.poll() is not None:
+                        raise RuntimeError(f"API server exited with code {proc.returncode}")
+                    try:
+                        if (await client.get("/api/health")).status_code == 200:
+                            break
+                    except httpx.HTTPError:
+                        pass
+                    if time.perf_counter() - spawned > args.startup_timeout:
+                        raise RuntimeError("API server did not become healthy in time")
+                    await asyncio.sleep(0.01)
+                health_ms = (time.perf_counter() - spawned) * 1000.0
+
+                first_crisis_ms, crisis = await timed(client, "POST", ENDPOINTS["crisis"], json=cases["crisis"])
+                first_response_ms = (time.perf_counter() - spawned) * 1000.0
+                first_treaty_ms, treaty = await timed(client, "POST", ENDPOINTS["treaty"], json=cases["treaty"])
+
+                ready: Dict[str, Any] = {}
+                while True:
+                    response = await client.get("/api/ready")
+                    if response.status_code == 200:
+                        ready = response.json()
+                        break
+                    if time.perf_counter() - spawned > args.startup_timeout:
+                        break
+                    await asyncio.sleep(0.01)
+                ready_ms = (time.perf_counter() - spawned) * 1000.0
+
+                warm_crisis_ms, _ = await timed(client, "POST", ENDPOINTS["crisis"], json=cases["crisis"])
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    return {
+        "health_ms": round(health_ms, 1),
+        "first_response_ms": round(first_response_ms, 1),
+        "first_crisis_ms": round(first_crisis_ms, 1),
+        "first_treaty_ms": round(first_treaty_ms, 1),
+        "ready_ms": round(ready_ms, 1),
+        "warm_crisis_ms": round(warm_crisis_ms, 1),
+        "statuses": [crisis.status_code, treaty.status_code],
+        "warmup": ready,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--target-ms", type=float, default=0.0, help="fail when median first_response_ms exceeds this")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--no-warmup", action="store_true", help="start the API with WARMUP_ENABLED=0")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--request-timeout", type=float, default=60.0)
+    parser.add_argument("--top", type=int, default=8, help="heaviest top-level imports to list")
+    parser.add_argument("--data-root", default=DEFAULT_DATA_ROOT)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+    # start_provider/start_api read the load benchmark's settings
+    args.jitter_ms, args.tokens_per_sec, args.failure_rate, args.seed, args.provider_max_concurrent = 0.0, 0.0, 0.0, 7, 0
+    args.provider_timeout, args.cache = 45.0, False
+
+    cases = {pilot: fields for pilot, _, fields in reversed(load_cases(["treaty", "crisis"], args.data_root))}
+    if set(cases) != set(ENDPOINTS):
+        parser.error("need at least one valid treaty and one valid crisis payload")
+    if args.no_warmup:
+        os.environ["WARMUP_ENABLED"] = "0"
+
+    report: Dict[str, Any] = {
+        "benchmark": "coldstart",
+        "commit": git_commit(),
+        "warmup": not args.no_warmup,
+        "import": {"app.main": import_profile("app.main", args.top), "wall_ms": import_wall_ms("app.main")},
+    }
+    provider, provider_port = start_provider(args)
+    try:
+        runs = [asyncio.run(cold_run(args, provider_port, cases)) for _ in range(max(1, args.runs))]
+    finally:
+        provider.should_exit = True
+
+    keys = ("health_ms", "first_response_ms", "first_crisis_ms", "first_treaty_ms", "ready_ms", "warm_crisis_ms")
+    report["median"] = {key: round(statistics.median(run[key] for run in runs), 1) for key in keys}
+    report["runs"] = runs
+    if args.target_ms:
+        report["target_ms"] = args.target_ms
+        report["within_target"] = report["median"]["first_response_ms"] <= args.target_ms
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    if not report.get("within_target", True):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""Replay the synthetic-data payloads against the API backed by a simulated provider.
+
+    python -m bench.load --pilot both --concurrency 16 --requests 200 --latency-ms 800
+
+Prints a JSON report (latency percentiles, throughput, fallback rate, peak RSS).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.payloads import DEFAULT_DATA_ROOT, DataFileReader, parse_items
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAYLOAD_FILES = {
+    "treaty": "treaty-checker/payloads/treaty-checker-payloads.jsonl",
+    "crisis": "crisis-planner/payloads/crisis-planner-payloads.jsonl",
+}
+ENDPOINTS = {"treaty": "/api/treaty/analyze", "crisis": "/api/crisis/generate"}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def load_cases(pilots: List[str], data_root: str) -> List[Tuple[str, str, Dict[str, Any]]]:
+    reader = DataFileReader(data_root)
+    cases: List[Tuple[str, str, Dict[str, Any]]] = []
+    for pilot in pilots:
+        with open(os.path.join(data_root, PAYLOAD_FILES[pilot]), "r", encoding="utf-8") as fh:
+            body = fh.read()
+        for _, item_id, fields in parse_items(body, reader, pilot):
+            if isinstance(fields, dict):
+                cases.append((pilot, item_id, fields))
+    return cases
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return round(ordered[idx], 2)
+
+
+def rss_mb(pid: int) -> Dict[str, float]:
+    out = {"rss_mb": 0.0, "peak_rss_mb": 0.0}
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    out["rss_mb"] = round(int(line.split()[1]) / 1024.0, 1)
+                elif line.startswith("VmHWM:"):
+                    out["peak_rss_mb"] = round(int(line.split()[1]) / 1024.0, 1)
+    except OSError:
+        pass
+    return out
+
+
+def start_provider(args: argparse.Namespace) -> Tuple[Any, int]:
+    import uvicorn
+
+    from bench.mock_provider import create_app
+
+    port = free_port()
+    app = create_app(
+        args.latency_ms, args.jitter_ms, args.tokens_per_sec, args.failure_rate, args.seed, args.provider_max_concurrent
+    )
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, port
+
+
+def start_api(args: argparse.Namespace, provider_port: int, workdir: str) -> Tuple[subprocess.Popen, int]:
+    port = free_port()
+    env = dict(os.environ)
+    env.update(
+        {
+            "OPENROUTER_API_URL": f"http://127.0.0.1:{provider_port}/api/v1/chat/completions",
+            "OPENROUTER_API_KEY": "bench",
+            "OPENROUTER_HTTP2": "false",
+            "OPENROUTER_TIMEOUT_SECONDS": str(args.provider_timeout),
+            "JOBS_DB": os.path.join(workdir, "jobs.sqlite3"),
+            "EXTRACT_CACHE_DIR": os.path.join(workdir, "extract-cache"),
+        }
+    )
+    if not args.cache:
+        env["RESPONSE_CACHE_MAX_ENTRIES"] = "0"
+        env["RESPONSE_CACHE_DB"] = ""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    return proc, port
+
+
+async def wait_ready(client: httpx.AsyncClient, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API server exited with code {proc.returncode}")
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("API server did not become healthy in time")
+
+
+async def drive(args: argparse.Namespace, cases: List[Tuple[str, str, Dict[str, Any]]], api_port: int, proc: subprocess.Popen) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    schedule = [cases[idx % len(cases)] for idx in range(args.requests)]
+    if args.shuffle:
+        rng.shuffle(schedule)
+    queue: "asyncio.Queue[Tuple[str, str, Dict[str, Any]]]" = asyncio.Queue()
+    for case in schedule:
+        queue.put_nowait(case)
+
+    latencies: Dict[str, List[float]] = {pilot: [] for pilot in ENDPOINTS}
+    statuses: Dict[str, int] = {}
+    modes: Dict[str, int] = {}
+    fallbacks = 0
+    peak = {"rss_mb": 0.0, "peak_rss_mb": 0.0}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{api_port}", timeout=args.request_timeout, limits=limits) as client:
+        await wait_ready(client, proc)
+
+        async def worker() -> None:
+            nonlocal fallbacks
+            while True:
+                try:
+                    pilot, _, fields = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                try:
+                    response = await client.post(ENDPOINTS[pilot], json=fields)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    response, status = None, type(e).__name__
+                latencies[pilot].append((time.perf_counter() - started) * 1000.0)
+                statuses[status] = statuses.get(status, 0) + 1
+                if response is not None and response.status_code == 200:
+                    mode = response.json().get("mode_used", "unknown")
+                    modes[mode] = modes.get(mode, 0) + 1
+                    fallbacks += mode == "fallback"
+
+        async def sample_rss() -> None:
+            while True:
+                current = rss_mb(proc.pid)
+                peak["rss_mb"] = max(peak["rss_mb"], current["rss_mb"])
+                peak["peak_rss_mb"] = max(peak["peak_rss_mb"], current["peak_rss_mb"])
+                await asyncio.sleep(0.25)
+
+        sampler = asyncio.create_task(sample_rss())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        duration = time.perf_counter() - started
+        sampler.cancel()
+        current = rss_mb(proc.pid)
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    ok = sum(modes.values())
+    return {
+        "requests": len(all_latencies),
+        "ok": ok,
+        "errors": len(all_latencies) - ok,
+        "status_counts": statuses,
+        "duration_s": round(duration, 3),
+        "requests_per_sec": round(len(all_latencies) / duration, 2) if duration else 0.0,
+        "latency_ms": summarize(all_latencies),
+        "latency_ms_by_pilot": {pilot: summarize(values) for pilot, values in latencies.items() if values},
+        "mode_used": modes,
+        "fallback_rate": round(fallbacks / ok, 4) if ok else 0.0,
+        "rss_mb": current["rss_mb"],
+        "peak_rss_mb": max(peak["peak_rss_mb"], current["peak_rss_mb"]),
+    }
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": round(sum(values) / len(values), 2) if values else 0.0,
+        "max": round(max(values), 2) if values else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pilot", choices=["treaty", "crisis", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--provider-max-concurrent", type=int, default=0, help="simulated provider answers 429 past this")
+    parser.add_argument("--provider-timeout", type=float, default=45.0)
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    parser.add_argument("--shuffle", action="store_true")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--data-root", default=DEFAULT_DATA_ROOT)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    pilots = ["treaty", "crisis"] if args.pilot == "both" else [args.pilot]
+    cases = load_cases(pilots, args.data_root)
+    if not cases:
+        parser.error("no valid payloads found")
+
+    provider, provider_port = start_provider(args)
+    with tempfile.TemporaryDirectory(prefix="kham-bench-") as workdir:
+        proc, api_port = start_api(args, provider_port, workdir)
+        try:
+            result = asyncio.run(drive(args, cases, api_port, proc))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+            provider.should_exit = True
+
+    config = {
+        key: getattr(args, key)
+        for key in (
+            "pilot",
+            "concurrency",
+            "latency_ms",
+            "jitter_ms",
+            "tokens_per_sec",
+            "failure_rate",
+            "provider_max_concurrent",
+            "cache",
+            "seed",
+        )
+    }
+    report = {"benchmark": "load", "commit": git_commit(), "cases": len(cases), "config": config, **result}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
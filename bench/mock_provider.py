@@ -0,0 +1,164 @@
+"""Local stand-in for the OpenRouter chat completions API used by the benchmarks.
+
+Run standalone with ``python -m bench.mock_provider --port 8787`` and point
+``OPENROUTER_API_URL`` at ``http://127.0.0.1:8787/api/v1/chat/completions``.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+PHASES = ["0-2 hours", "2-6 hours", "6-24 hours", "24-72 hours"]
+
+
+def canned_treaty(user_prompt: str) -> Dict[str, Any]:
+    articles = list(dict.fromkeys(re.findall(r"^\s*Article\s+(\d+)", user_prompt, flags=re.MULTILINE)))
+    if len(articles) < 8:
+        articles = [str(i) for i in range(1, 11)]
+    rows = [
+        {
+            "treaty_article": f"Article {article}",
+            "obligation": f"Implement the obligations set out in Article {article}.",
+            "treaty_clause_text": f"Each State Party shall give effect to Article {article}.",
+            "national_mapping": "Section 7 assigns implementation to the competent authority.",
+            "domestic_clause_text": "Section 7: the competent authority shall take all appropriate measures.",
+            "status": ["compliant", "partial", "gap"][idx % 3],
+            "severity": ["low", "medium", "high"][(idx + 1) % 3],
+            "recommendation": f"Ministry of Law to issue an implementing instruction for Article {article}.",
+            "confidence": round(0.6 + (idx % 4) * 0.08, 2),
+            "confidence_rationale": "Stand-in completion generated by the benchmark provider.",
+        }
+        for idx, article in enumerate(articles)
+    ]
+    return {
+        "executive_summary": "Stand-in analysis: partial alignment with several implementation gaps.",
+        "segment_summary": "Stand-in segment analysis.",
+        "top_urgent_gaps": [f"{r['treaty_article']}: {r['recommendation']}" for r in rows if r["status"] == "gap"][:5],
+        "action_list_30_60_90": [
+            "30 days: Ministry of Law to validate article-level mappings.",
+            "60 days: Ministry of Foreign Affairs to circulate draft instruments.",
+            "90 days: Cabinet Division to approve the compliance roadmap.",
+        ],
+        "human_review_disclaimer": "Stand-in output; validate with legal officers.",
+        "results": rows,
+    }
+
+
+def canned_crisis() -> Dict[str, Any]:
+    return {
+        "condition_yellow": ["Activate crisis cell.", "Issue first advisory.", "Verify contact tree."],
+        "condition_orange": ["Pre-position transport.", "Confirm assembly points.", "Start 4-hourly HQ updates."],
+        "condition_red": ["Execute phased evacuation.", "Run hourly SITREP cycle.", "Maintain accountability roster."],
+        "role_assigned_tasks": [
+            {"role": "Head of Mission", "task": "Authorize condition changes."},
+            {"role": "Consular Officer", "task": "Run registry verification and hotline."},
+            {"role": "Security Officer", "task": "Validate routes and assembly points."},
+        ],
+        "timeline": [
+            {"phase": phase, "actions": [f"{phase}: action {n}" for n in range(1, 4)]} for phase in PHASES
+        ],
+        "communication_templates": ["Public advisory: report location via hotline +880-2-XXXXXXXX."],
+        "evacuation_plan": {
+            "assembly_points": ["Mission annex compound"],
+            "priority_categories": ["Critical medical cases", "Children and pregnant women"],
+            "movement_windows": ["0500-0700 local"],
+            "coordination_requirements": ["Host-country police escorts"],
+        },
+        "sitrep_template": "SITREP\nRef: <ref>\nTime: <local>\nCondition Level: <Y/O/R>",
+        "assumptions_and_unknowns": ["Assumption: one corridor stays open.", "Unknown: telecom recovery time."],
+        "human_review_disclaimer": "Stand-in output; mission leadership must validate.",
+    }
+
+
+def canned_completion(messages: List[Dict[str, Any]]) -> str:
+    system_prompt = str(messages[0].get("content", "")) if messages else ""
+    user_prompt = str(messages[-1].get("content", "")) if messages else ""
+    if "emergency" in system_prompt.lower() or "crisis" in system_prompt.lower():
+        return json.dumps(canned_crisis())
+    return json.dumps(canned_treaty(user_prompt))
+
+
+def create_app(
+    latency_ms: float = 800.0,
+    jitter_ms: float = 200.0,
+    tokens_per_sec: float = 0.0,
+    failure_rate: float = 0.0,
+    seed: int = 7,
+    max_concurrent: int = 0,
+) -> FastAPI:
+    app = FastAPI(title="KhaM benchmark provider")
+    rng = random.Random(seed)
+    stats = {"requests": 0, "failures": 0, "streams": 0, "rate_limited": 0, "in_flight": 0, "peak_in_flight": 0}
+
+    def generation_seconds(content: str) -> float:
+        return (len(content) / 4.0) / tokens_per_sec if tokens_per_sec > 0 else 0.0
+
+    async def stream_chunks(content: str) -> AsyncIterator[str]:
+        step = 64
+        per_chunk = generation_seconds(content[:step])
+        for start in range(0, len(content), step):
+            if per_chunk:
+                await asyncio.sleep(per_chunk)
+            yield f"data: {json.dumps({'choices': [{'delta': {'content': content[start:start + step]}}]})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.get("/stats")
+    async def provider_stats() -> Dict[str, int]:
+        return stats
+
+    @app.post("/api/v1/chat/completions")
+    async def completions(request: Request) -> Response:
+        body = await request.json()
+        stats["requests"] += 1
+        if max_concurrent > 0 and stats["in_flight"] >= max_concurrent:
+            # like a provider-side concurrency limit: refuse rather than queue
+            stats["rate_limited"] += 1
+            return JSONResponse({"error": {"code": 429, "message": "rate limited"}}, status_code=429, headers={"Retry-After": "1"})
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            return await respond(body)
+        finally:
+            stats["in_flight"] -= 1
+
+    async def respond(body: Dict[str, Any]) -> Response:
+        await asyncio.sleep(max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000.0)
+        if rng.random() < failure_rate:
+            stats["failures"] += 1
+            status = rng.choice([429, 500, 502, 503])
+            return JSONResponse({"error": {"code": status, "message": "injected failure"}}, status_code=status)
+
+        content = canned_completion(body.get("messages") or [])
+        if body.get("stream"):
+            stats["streams"] += 1
+            return StreamingResponse(stream_chunks(content), media_type="text/event-stream")
+        await asyncio.sleep(generation_seconds(content))
+        return JSONResponse({"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrent", type=int, default=0, help="answer 429 past this many in-flight calls")
+    args = parser.parse_args()
+    app = create_app(args.latency_ms, args.jitter_ms, args.tokens_per_sec, args.failure_rate, max_concurrent=args.max_concurrent)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
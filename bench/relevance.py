@@ -0,0 +1,121 @@
+"""Compare the keyword relevance matcher with the previous lowercase-and-rescan check.
+
+    python -m bench.relevance --chars 240000 --iterations 50
+
+Prints a JSON report with per-call latency for both implementations.
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+from app.payloads import DEFAULT_DATA_ROOT
+from app.relevance import KeywordMatcher
+
+TREATY_WORDS = ["article", "party", "agreement", "convention", "treaty", "protocol"]
+LAW_WORDS = ["act", "section", "rule", "policy", "order", "law"]
+FILLER = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore. "
+
+
+def legacy_relevance_check(text: str, keywords: List[str]) -> Tuple[str, float]:
+    base = (text or "").lower()
+    if not base.strip():
+        return ("low", 0.0)
+    hits = 0
+    for kw in keywords:
+        if kw and kw.lower() in base:
+            hits += 1
+    score = min(1.0, hits / max(1, len(keywords)))
+    if score >= 0.5:
+        return ("high", score)
+    if score >= 0.2:
+        return ("medium", score)
+    return ("low", score)
+
+
+def legacy_treaty(name: str, text: str, doc: str, law_name: str, law_text: str, law_doc: str) -> Tuple[float, float]:
+    _, treaty = legacy_relevance_check(f"{name}\n{text}\n{doc}".lower(), TREATY_WORDS)
+    _, law = legacy_relevance_check(f"{law_name}\n{law_text}\n{law_doc}".lower(), LAW_WORDS)
+    return treaty, law
+
+
+def matcher_treaty(
+    treaty_matcher: KeywordMatcher, law_matcher: KeywordMatcher
+) -> Callable[[str, str, str, str, str, str], Tuple[float, float]]:
+    def run(name: str, text: str, doc: str, law_name: str, law_text: str, law_doc: str) -> Tuple[float, float]:
+        treaty = treaty_matcher.score({"treaty_name": name, "treaty_text": text, "treaty_doc_text": doc}).score
+        law = law_matcher.score({"law_name": law_name, "national_law_text": law_text, "law_doc_text": law_doc}).score
+        return treaty, law
+
+    return run
+
+
+def sample(directory: str) -> str:
+    path = os.path.join(DEFAULT_DATA_ROOT, "treaty-checker", "inputs", "txt", directory)
+    with open(os.path.join(path, sorted(os.listdir(path))[0]), "r", encoding="utf-8") as fh:
+        return fh.read()
+
+
+def repeat_to(text: str, chars: int) -> str:
+    return (text * (chars // max(1, len(text)) + 1))[:chars]
+
+
+def timed(fn: Callable[[], object], iterations: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, (time.perf_counter() - started) / iterations)
+    return round(best * 1000, 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chars", type=int, default=240000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    treaty_doc = repeat_to(sample("treaty"), args.chars)
+    law_doc = repeat_to(sample("law"), args.chars)
+    filler = repeat_to(FILLER, args.chars)
+    cases: Dict[str, Tuple[str, str, str, str, str, str]] = {
+        "synthetic_docs": ("Paris Agreement", treaty_doc[:20000], treaty_doc, "Environment Act", law_doc[:20000], law_doc),
+        "keywords_absent": ("Untitled", filler[:20000], filler, "Untitled", filler[:20000], filler),
+        "keywords_early": (
+            "Treaty",
+            filler[:20000],
+            repeat_to(" ".join(TREATY_WORDS) + "\n" + filler, args.chars),
+            "Law",
+            filler[:20000],
+            repeat_to(" ".join(LAW_WORDS) + "\n" + filler, args.chars),
+        ),
+    }
+
+    # the per-call cache would turn every repeat into a hit, so it is disabled here
+    current = matcher_treaty(KeywordMatcher(TREATY_WORDS, cache_size=0), KeywordMatcher(LAW_WORDS, cache_size=0))
+    results: Dict[str, Dict[str, object]] = {}
+    for name, fields in cases.items():
+        legacy_ms = timed(lambda: legacy_treaty(*fields), args.iterations)
+        matcher_ms = timed(lambda: current(*fields), args.iterations)
+        results[name] = {
+            "legacy_ms": legacy_ms,
+            "matcher_ms": matcher_ms,
+            "speedup": round(legacy_ms / matcher_ms, 2) if matcher_ms else None,
+            "legacy_scores": legacy_treaty(*fields),
+            "matcher_scores": current(*fields),
+        }
+
+    report = {"benchmark": "relevance", "chars": args.chars, "iterations": args.iterations, "cases": results}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Compare encode time and allocations of the response serialization paths.
+
+    python -m bench.serialization --iterations 500 --extract-kb 400
+
+For a treaty analysis, a crisis plan and an extract-text response of
+--extract-kb, times FastAPI's default handling of a returned model
+(response_model validation, jsonable_encoder, json.dumps) against the paths
+the API uses, and records the peak traced allocation of one encode. Prints a
+JSON report.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict
+
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from pydantic import BaseModel
+
+from app import main as api
+from app.payloads import DEFAULT_DATA_ROOT
+from app.responses import FastJSONResponse
+from bench.load import git_commit, load_cases
+
+Encoder = Callable[[BaseModel], Awaitable[bytes]]
+
+
+def sample_responses(data_root: str, extract_kb: int) -> Dict[str, BaseModel]:
+    cases = {pilot: fields for pilot, _, fields in reversed(load_cases(["treaty", "crisis"], data_root))}
+    now = datetime.now(timezone.utc)
+    treaty = api.TreatyAnalyzeRequest.model_validate(cases["treaty"])
+    crisis = api.CrisisGenerateRequest.model_validate(cases["crisis"])
+    # served as AI responses, so the spliced fallback fast path does not apply
+    source = (treaty.treaty_text + "\n\n" + treaty.national_law_text).strip() + "\n\n"
+    text = (source * (extract_kb * 1024 // len(source) + 1))[: extract_kb * 1024]
+    return {
+        "treaty": api._build_treaty_fallback(treaty, now, "BENCH").model_copy(update={"mode_used": api.ModeUsed.ai}),
+        "crisis": api._build_crisis_fallback(crisis, now, "BENCH").model_copy(update={"mode_used": api.ModeUsed.ai}),
+        "extract": api.ExtractTextResponse(
+            filename="bench.pdf",
+            content_type="application/pdf",
+            extracted_text=text,
+            extracted_chars=len(text),
+            sha256="0" * 64,
+            cache_hit=False,
+        ),
+    }
+
+
+def encoders(route: APIRoute) -> Dict[str, Encoder]:
+    async def fastapi_default(model: BaseModel) -> bytes:
+        content = await serialize_response(field=route.response_field, response_content=model, is_coroutine=True)
+        return JSONResponse(content).body
+
+    async def model_dump_json(model: BaseModel) -> bytes:
+        return model.model_dump_json().encode("utf-8")
+
+    async def orjson_model_dump(model: BaseModel) -> bytes:
+        return orjson.dumps(model.model_dump())
+
+    async def fast_response(model: BaseModel) -> bytes:
+        return FastJSONResponse(model).body
+
+    return {
+        "fastapi_default": fastapi_default,
+        "model_dump_json": model_dump_json,
+        "orjson_model_dump": orjson_model_dump,
+        "fast_response": fast_response,
+    }
+
+
+async def measure(encode: Encoder, model: BaseModel, iterations: int) -> Dict[str, Any]:
+    body = await encode(model)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await encode(model)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    await encode(model)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "mean_us": round(elapsed / iterations * 1e6, 1),
+        "peak_alloc_kib": round(peak / 1024.0, 1),
+        "peak_over_output": round(peak / len(body), 2),
+        "bytes": len(body),
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    routes = {route.path: route for route in api.app.routes if isinstance(route, APIRoute)}
+    paths = {"treaty": "/api/treaty/analyze", "crisis": "/api/crisis/generate", "extract": "/api/utils/extract-text"}
+    results: Dict[str, Any] = {}
+    for name, model in sample_responses(args.data_root, args.extract_kb).items():
+        iterations = max(1, args.iterations // 10) if name == "extract" else args.iterations
+        results[name] = {
+            label: await measure(encode, model, iterations) for label, encode in encoders(routes[paths[name]]).items()
+        }
+        baseline = results[name]["fastapi_default"]["mean_us"]
+        results[name]["fast_response"]["speedup"] = round(baseline / max(results[name]["fast_response"]["mean_us"], 0.1), 1)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--extract-kb", type=int, default=400, help="size of the extracted_text payload")
+    parser.add_argument("--data-root", default=DEFAULT_DATA_ROOT)
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "serialization",
+        "commit": git_commit(),
+        "config": {"iterations": args.iterations, "extract_kb": args.extract_kb},
+        "results": asyncio.run(run(args)),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import asyncio
+from typing import List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main as api
+from app.admission import HIGH, LOW, AdmissionController, AdmissionRejected
+
+from tests.test_offload_shedding import CRISIS_PAYLOAD, TREATY_PAYLOAD
+
+
+def test_high_is_admitted_ahead_of_queued_low() -> None:
+    async def run() -> List[str]:
+        admission = AdmissionController(max_in_flight=1, high_reserve=0)
+        order: List[str] = []
+        await admission.acquire(LOW)
+
+        async def wait_for_slot(name: str, priority: int) -> None:
+            await admission.acquire(priority)
+            order.append(name)
+
+        low = asyncio.ensure_future(wait_for_slot("low", LOW))
+        await asyncio.sleep(0)
+        high = asyncio.ensure_future(wait_for_slot("high", HIGH))
+        await asyncio.sleep(0)
+        admission.release()
+        await asyncio.sleep(0)
+        admission.release()
+        await asyncio.gather(low, high)
+        return order
+
+    assert asyncio.run(run()) == ["high", "low"]
+
+
+def test_reserve_holds_slots_back_for_high() -> None:
+    async def run() -> None:
+        admission = AdmissionController(max_in_flight=3, high_reserve=1, max_wait_low=0.01)
+        await admission.acquire(LOW)
+        await admission.acquire(LOW)
+        assert not admission.try_acquire(LOW)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire(LOW)
+        assert rejected.value.reason == "timeout"
+        assert await admission.acquire(HIGH) == 0.0
+        assert admission.in_flight == 3
+
+    asyncio.run(run())
+
+
+def test_low_is_rejected_past_its_queue_limit() -> None:
+    async def run() -> None:
+        admission = AdmissionController(max_in_flight=1, high_reserve=0, max_queue_low=1, max_queue_high=1)
+        await admission.acquire(LOW)
+        queued = asyncio.ensure_future(admission.acquire(LOW))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire(LOW)
+        assert rejected.value.reason == "queue_full"
+        with pytest.raises(AdmissionRejected):
+            admission.check(LOW)
+        # the high queue is separate and still has room
+        admission.check(HIGH)
+
+        admission.release()
+        assert await queued == pytest.approx(0.0, abs=0.05)
+        assert admission.stats()["shed"] == {"low_entry": 1, "low_queue_full": 1}
+
+    asyncio.run(run())
+
+
+@pytest.fixture
+def full(monkeypatch: pytest.MonkeyPatch) -> AdmissionController:
+    # every slot taken and no room to queue at either priority
+    admission = AdmissionController(max_in_flight=1, high_reserve=0, max_queue_high=0, max_queue_low=0, retry_after=3.0)
+    assert admission.try_acquire(HIGH)
+    monkeypatch.setattr(api, "provider_admission", admission)
+    monkeypatch.setattr(api, "OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(api, "warm_plans", None)
+    monkeypatch.setattr(api.response_cache, "get", lambda key: None)
+    return admission
+
+
+def test_backlogged_treaty_gets_503_with_retry_after(full: AdmissionController) -> None:
+    response = TestClient(api.app).post("/api/treaty/analyze", json=TREATY_PAYLOAD)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+
+
+def test_backlogged_crisis_falls_back_instead(full: AdmissionController) -> None:
+    response = TestClient(api.app).post("/api/crisis/generate", json=CRISIS_PAYLOAD)
+    assert response.status_code == 200
+    assert response.json()["fallback_reason"] == "admission_shed"
+    assert float(response.headers["X-Queue-Wait-Ms"]) == 0.0
@@ -0,0 +1,57 @@
+from app.budget import PAGE_BREAK, compact_text
+
+# Indian Contract Act 1872 style: omitted clauses, numbered sub-sections and
+# a bare year are all content
+STATUTE = """THE INDIAN CONTRACT ACT, 1872
+
+2. Interpretation-clause.—In this Act the following words and expressions are used in the following senses, unless a contrary intention appears from the context:—
+
+(a) When one person signifies to another his willingness to do or to abstain from doing anything, with a view to obtaining the assent of that other to such act or abstinence, he is said to make a proposal;
+
+3. [Omitted by Act 14 of 2019.]
+
+4. Communication when complete.—The communication of a proposal is complete when it comes to the knowledge of the person to whom it is made.
+
+4. [Omitted by Act 14 of 2019.]
+
+2019
+
+Gazette of India, Extraordinary, Part II
+
+5. Revocation of proposals and acceptances.—A proposal may be revoked at any time before the communication of its acceptance is complete."""
+
+PAGES = [
+    "Gazette of India, Extraordinary, Part II\nTHE INDIAN CONTRACT ACT, 1872\n2. Interpretation-clause.—In this Act the following words are used.\n(a) proposal means a signified willingness to act.\n1",
+    "Gazette of India, Extraordinary, Part II\n3. [Omitted by Act 14 of 2019.]\n4. Communication when complete.—The communication of a proposal is complete.\nAs amended in\n2019\nPage 2 of 4",
+    "Gazette of India, Extraordinary, Part II\n4. [Omitted by Act 14 of 2019.]\n5. Revocation of proposals and acceptances.—A proposal may be revoked.\n3",
+    "Gazette of India, Extraordinary, Part II\n6. Revocation how made.—A proposal is revoked by notice.\n4",
+]
+
+
+def test_pasted_statute_loses_nothing_but_spacing() -> None:
+    compacted = compact_text(STATUTE)
+    lines = compacted.splitlines()
+    assert lines.count("3. [Omitted by Act 14 of 2019.]") == 1
+    assert lines.count("4. [Omitted by Act 14 of 2019.]") == 1
+    assert "2019" in lines
+    assert "Gazette of India, Extraordinary, Part II" in lines
+    assert compacted == "\n".join(line for line in STATUTE.splitlines())
+
+
+def test_furniture_is_dropped_only_at_marked_page_edges() -> None:
+    lines = compact_text(PAGE_BREAK.join(PAGES)).splitlines()
+    # the running header is kept once, page numbers not at all
+    assert lines.count("Gazette of India, Extraordinary, Part II") == 1
+    assert not {"1", "3", "4", "Page 2 of 4"} & set(lines)
+    # numbered clauses that differ only in their digits are both kept, and a
+    # bare year is not a page number
+    assert "3. [Omitted by Act 14 of 2019.]" in lines
+    assert "4. [Omitted by Act 14 of 2019.]" in lines
+    assert "2019" in lines
+    assert "6. Revocation how made.—A proposal is revoked by notice." in lines
+
+
+def test_repeated_line_on_too_few_pages_is_kept() -> None:
+    pages = ["Schedule I continued\n1. First entry.", "Schedule I continued\n2. Second entry.", "3. Third entry."]
+    lines = compact_text(PAGE_BREAK.join(pages)).splitlines()
+    assert lines.count("Schedule I continued") == 2
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import pytest
+
+from app import main as api
+from app.admission import HIGH, LOW, admission_priority
+from app.cache import SingleFlight
+
+
+@pytest.fixture(autouse=True)
+def flights(monkeypatch: pytest.MonkeyPatch) -> SingleFlight:
+    fresh = SingleFlight()
+    monkeypatch.setattr(api, "provider_flights", fresh)
+    monkeypatch.setattr(api.response_cache, "put", lambda key, value: None)
+    return fresh
+
+
+def coalesce(priorities: List[int]) -> List[int]:
+    # every caller asks for the same content at once; returns the priority
+    # each provider call was made at
+    calls: List[int] = []
+
+    async def build() -> Optional[api.CrisisGenerateResponse]:
+        calls.append(admission_priority.get())
+        await asyncio.sleep(0.02)
+        return None
+
+    async def caller(priority: int) -> None:
+        admission_priority.set(priority)
+        await api._coalesced_ai_response("crisis:same", build, datetime.now(timezone.utc), "REF")
+
+    async def run() -> None:
+        await asyncio.gather(*(caller(priority) for priority in priorities))
+
+    asyncio.run(run())
+    return calls
+
+
+def test_same_priority_callers_share_one_call() -> None:
+    assert coalesce([HIGH, HIGH, HIGH]) == [HIGH]
+
+
+def test_high_priority_caller_does_not_wait_on_a_low_leader(flights: SingleFlight) -> None:
+    assert sorted(coalesce([LOW, HIGH, LOW])) == sorted([LOW, HIGH])
+    assert flights.stats()["followers"] == 1
@@ -0,0 +1,26 @@
+import logging
+
+import pytest
+
+from app import main as api
+
+
+def test_mistyped_generation_mode_falls_back_with_a_warning(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    monkeypatch.setenv("CRISIS_GENERATION_MODE", "sectoined")
+
+    with caplog.at_level(logging.WARNING, logger=api.logger.name):
+        mode = api._env_choice("CRISIS_GENERATION_MODE", "single", ("single", "sectioned"))
+
+    assert mode == "single"
+    assert "CRISIS_GENERATION_MODE" in caplog.text
+
+
+def test_generation_mode_choices_are_the_request_enum(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("CRISIS_GENERATION_MODE", " Sectioned ")
+
+    mode = api._env_choice("CRISIS_GENERATION_MODE", "single", ("single", "sectioned"))
+
+    assert api.CrisisGenerationMode(mode) is api.CrisisGenerationMode.sectioned
+    assert api.CrisisGenerationMode(api.CRISIS_GENERATION_MODE) in api.CrisisGenerationMode
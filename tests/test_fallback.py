@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+
+from app import main as api
+from app.main import RowOrigin, TreatyAnalyzeRequest
+
+from tests.test_offload_shedding import TREATY_PAYLOAD
+
+
+def build_fallback() -> api.TreatyAnalyzeResponse:
+    payload = TreatyAnalyzeRequest.model_validate(TREATY_PAYLOAD)
+    return api._build_treaty_fallback(payload, datetime.now(timezone.utc), "TEST")
+
+
+def test_fallback_rows_are_not_shared_between_responses() -> None:
+    first = build_fallback()
+    first.results[0].origin = RowOrigin.reused
+    first.results[0].recommendation = "edited in place"
+
+    second = build_fallback()
+    assert second.results[0].origin is None
+    assert second.results[0].recommendation != "edited in place"
+    assert all(row.origin is None for row in api._fallback_rows(api._treaty_family(TREATY_PAYLOAD["treaty_name"]), TREATY_PAYLOAD["law_name"]))
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, List
+
+import pytest
+
+from app import main as api
+from app.admission import LOW, AdmissionController
+
+
+class FakeResponse:
+    is_success = True
+    status_code = 200
+
+
+class SlowClient:
+    def __init__(self) -> None:
+        self.posts: List[float] = []
+
+    async def post(self, url: str, **kwargs: Any) -> FakeResponse:
+        self.posts.append(asyncio.get_running_loop().time())
+        await asyncio.sleep(0.05)
+        return FakeResponse()
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> SlowClient:
+    fake = SlowClient()
+    monkeypatch.setattr(api, "_get_openrouter_client", lambda: fake)
+    monkeypatch.setattr(api, "_hedge_delay", lambda: 0.01)
+    return fake
+
+
+def post_in_slot(admission: AdmissionController) -> None:
+    async def run() -> None:
+        # the caller's own slot, as taken in _openrouter_post_with_retries
+        await admission.acquire(LOW)
+        await api._openrouter_post({}, {})
+        admission.release()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+
+
+def test_hedge_takes_a_free_slot_and_gives_it_back(monkeypatch: pytest.MonkeyPatch, client: SlowClient) -> None:
+    admission = AdmissionController(max_in_flight=2, high_reserve=0)
+    monkeypatch.setattr(api, "provider_admission", admission)
+    post_in_slot(admission)
+
+    assert len(client.posts) == 2
+    assert admission.in_flight == 0
+    assert admission.stats()["admitted"]["low"] == 2
+
+
+def test_hedge_is_skipped_without_a_free_slot(monkeypatch: pytest.MonkeyPatch, client: SlowClient) -> None:
+    admission = AdmissionController(max_in_flight=1, high_reserve=0)
+    monkeypatch.setattr(api, "provider_admission", admission)
+    post_in_slot(admission)
+
+    assert len(client.posts) == 1
+    assert admission.in_flight == 0
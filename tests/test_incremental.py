@@ -0,0 +1,93 @@
+import asyncio
+import re
+from typing import Any, Dict, List
+
+import pytest
+
+from app import main as api
+from app.main import RowOrigin, TreatyAnalyzeRequest
+from bench.mock_provider import canned_treaty
+
+TOPICS = ["emissions", "adaptation", "finance", "technology", "capacity", "transparency", "stocktake", "compliance", "forests", "markets"]
+
+
+def treaty_text() -> str:
+    return "\n\n".join(f"Article {i}\nEach Party shall report on {topic} measures annually." for i, topic in enumerate(TOPICS, 1))
+
+
+def law_text(amended: int = 0) -> str:
+    return "\n\n".join(
+        f"Section {i}\nThe Ministry shall regulate {topic} and publish guidance."
+        + (" Inserted: a registry duty that replaces the earlier scheme." if i == amended else "")
+        for i, topic in enumerate(TOPICS, 1)
+    )
+
+
+class FakeProvider:
+    def __init__(self) -> None:
+        self.prompts: List[str] = []
+        self.skip_last = False
+
+    async def __call__(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        self.prompts.append(user_prompt)
+        asked = [f"Article {n}" for n in dict.fromkeys(re.findall(r"^Article (\d+)", user_prompt, flags=re.MULTILINE))]
+        body = canned_treaty(user_prompt)
+        body["results"] = [row for row in body["results"] if row["treaty_article"] in asked]
+        if self.skip_last:
+            body["results"] = body["results"][:-1]
+        return body
+
+
+@pytest.fixture
+def provider(monkeypatch: pytest.MonkeyPatch) -> FakeProvider:
+    fake = FakeProvider()
+    monkeypatch.setattr(api, "OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(api, "_openrouter_json_completion", fake)
+    monkeypatch.setattr(api.response_cache, "get", lambda key: None)
+    monkeypatch.setattr(api.response_cache, "put", lambda key, value: None)
+    return fake
+
+
+def analyze(**fields: Any) -> api.TreatyAnalyzeResponse:
+    base = dict(treaty_name="Paris Agreement", law_name="Environment Act", treaty_doc_text=treaty_text(), analysis_mode="single")
+    return asyncio.run(api._analyze_treaty(TreatyAnalyzeRequest.model_validate(dict(base, **fields))))
+
+
+def test_law_amendment_mixes_fresh_and_reused_rows(provider: FakeProvider) -> None:
+    first = analyze(law_doc_text=law_text())
+    second = analyze(law_doc_text=law_text(amended=9), previous_analysis_id=first.analysis_id)
+
+    origins = [row.origin for row in second.results]
+    assert len(provider.prompts) == 2
+    assert len(origins) == len(TOPICS)
+    assert RowOrigin.fresh in origins and RowOrigin.reused in origins
+
+
+def test_dirty_row_missing_from_completion_forces_full_reanalysis(provider: FakeProvider) -> None:
+    first = analyze(law_doc_text=law_text())
+    provider.skip_last = True
+    second = analyze(law_doc_text=law_text(amended=9), previous_analysis_id=first.analysis_id)
+
+    # the incremental completion left out a row the amendment touched, so
+    # nothing from the previous analysis is carried over
+    assert len(provider.prompts) == 3
+    assert all(row.origin != RowOrigin.reused for row in second.results)
+
+
+def test_stored_analyses_are_keyed_by_random_ids(provider: FakeProvider) -> None:
+    first = analyze(law_doc_text=law_text())
+    second = analyze(law_doc_text=law_text(amended=3))
+    assert first.analysis_id and second.analysis_id
+    assert re.fullmatch(r"[0-9a-f]{32}", first.analysis_id)
+    assert first.analysis_id != second.analysis_id
+    with pytest.raises(ValueError):
+        analyze(law_doc_text=law_text(), previous_analysis_id=first.reference_no)
+
+
+def test_rows_are_not_reused_across_a_different_law(provider: FakeProvider) -> None:
+    first = analyze(law_doc_text=law_text())
+    other = analyze(law_doc_text=law_text(amended=9), law_name="Forests Act", previous_analysis_id=first.analysis_id)
+
+    assert len(provider.prompts) == 2
+    assert other.previous_reference_no is None
+    assert all(row.origin == RowOrigin.fresh for row in other.results)
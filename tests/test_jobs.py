@@ -0,0 +1,55 @@
+import time
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import pytest
+
+from app.jobs import QUEUED, RUNNING, SUCCEEDED, JobStore
+
+
+@pytest.fixture
+def stores(tmp_path: Path) -> Iterator[Tuple[JobStore, JobStore]]:
+    # two connections to one file stand in for two worker processes
+    path = str(tmp_path / "jobs.sqlite3")
+    first, second = JobStore(path), JobStore(path)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_job_is_claimed_once_across_stores(stores: Tuple[JobStore, JobStore]) -> None:
+    first, second = stores
+    job = first.create("treaty", {"n": 1}, 3, None)
+
+    claimed = first.claim()
+    assert claimed is not None and claimed["id"] == job["id"]
+    assert claimed["status"] == RUNNING and claimed["attempts"] == 1
+    assert second.claim() is None
+
+
+def test_requeue_leaves_live_leases_alone(stores: Tuple[JobStore, JobStore]) -> None:
+    first, second = stores
+    first.create("treaty", {"n": 1}, 3, None)
+    first.claim()
+
+    assert second.requeue_stale(lease_seconds=60.0) == 0
+    assert second.counts() == {RUNNING: 1}
+
+
+def test_run_that_lost_its_lease_cannot_finish(stores: Tuple[JobStore, JobStore]) -> None:
+    first, second = stores
+    job = first.create("treaty", {"n": 1}, 3, None)
+    stale = first.claim()
+    assert stale is not None
+    time.sleep(0.01)
+
+    assert second.requeue_stale(lease_seconds=0.0) == 1
+    assert first.get(job["id"])["status"] == QUEUED
+    current = second.claim()
+    assert current is not None and current["attempts"] == 2
+
+    assert not first.succeed(job["id"], stale["attempts"], {"from": "stale"}, 60.0)
+    assert not first.retry(job["id"], stale["attempts"], "late", 0.0)
+    assert second.succeed(job["id"], current["attempts"], {"from": "current"}, 60.0)
+    finished = first.get(job["id"])
+    assert finished["status"] == SUCCEEDED and finished["result"] == '{"from": "current"}'
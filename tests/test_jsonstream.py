@@ -0,0 +1,85 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from app import main as api
+from app.jsonstream import ArrayItemStream, load_object, repair_json
+from app.main import TreatyAnalyzeRequest
+from bench.mock_provider import canned_treaty
+
+from tests.test_offload_shedding import TREATY_PAYLOAD
+
+
+def completion(articles: int = 10) -> str:
+    prompt = "\n".join(f"Article {i}" for i in range(1, articles + 1))
+    return json.dumps(canned_treaty(prompt), ensure_ascii=False)
+
+
+def cut_inside_row(text: str, row: int) -> str:
+    # stop half-way through the given (1-based) results row
+    start = text.index(f'{{"treaty_article": "Article {row}"')
+    return text[: start + 40]
+
+
+def test_truncated_completion_keeps_only_complete_rows() -> None:
+    parsed, repaired = load_object(cut_inside_row(completion(), 10))
+    assert repaired and parsed is not None
+    assert [row["treaty_article"] for row in parsed["results"]] == [f"Article {i}" for i in range(1, 10)]
+    assert parsed["executive_summary"].startswith("Stand-in analysis")
+
+
+def test_cut_inside_a_scalar_drops_the_open_key() -> None:
+    assert repair_json('{"a": 1, "b": [1, 2], "c": "half') == {"a": 1, "b": [1, 2]}
+    assert repair_json("no json here") is None
+
+
+def test_escapes_and_braces_inside_strings_fed_a_char_at_a_time() -> None:
+    rows = [{"text": 'quote \\" brace } bracket ] backslash \\\\', "n": 1}, {"text": "{not a row}", "n": 2}]
+    text = json.dumps({"summary": "has } and ] in it", "results": rows})
+    scanner = ArrayItemStream("results")
+    items: List[Any] = []
+    for ch in text:
+        items.extend(scanner.feed(ch))
+    assert items == rows
+    assert scanner.complete and scanner.array_closed
+    assert scanner.repaired() == json.loads(text)
+
+
+def test_fenced_block_wins_over_prose_with_braces() -> None:
+    body = {"executive_summary": "ok", "results": [{"n": 1}]}
+    text = f"Here is the analysis {{as requested}} for {{Article 3}}:\n```json\n{json.dumps(body)}\n```\nDone."
+    assert load_object(text) == (body, True)
+
+
+def test_truncated_fenced_block_is_repaired() -> None:
+    text = "Notes {draft}:\n```json\n" + cut_inside_row(completion(), 10)
+    parsed, repaired = load_object(text)
+    assert repaired and parsed is not None and len(parsed["results"]) == 9
+
+
+def treaty_response(text: str) -> Any:
+    payload = TreatyAnalyzeRequest.model_validate(TREATY_PAYLOAD)
+    parsed, _ = load_object(text)
+    rows = api._coerce_treaty_results((parsed or {}).get("results"))
+    return parsed, rows, api._treaty_response_from_json(payload, parsed, datetime.now(timezone.utc), "REF", results=rows)
+
+
+def test_complete_rows_of_a_cut_off_answer_count_toward_eight() -> None:
+    _, rows, response = treaty_response(cut_inside_row(completion(), 10))
+    assert len(rows) == 9
+    assert response is not None and len(response.results) == 9
+
+
+def test_cut_off_answer_short_of_eight_rows_asks_for_a_follow_up() -> None:
+    parsed, rows, response = treaty_response(cut_inside_row(completion(), 8))
+    assert len(rows) == 7
+    assert response is None
+    assert api._treaty_follow_up_wanted(parsed, rows)
+
+
+def test_stream_falls_back_to_a_full_parse_after_prose_braces() -> None:
+    body: Dict[str, Any] = {"executive_summary": "ok", "results": [{"n": 1}]}
+    scanner = ArrayItemStream("results")
+    assert scanner.feed("I mapped {each article}.\n```json\n" + json.dumps(body) + "\n```") == []
+    assert asyncio.run(api._stream_json(scanner)) == body
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from typing import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import extraction
+from app import main as api
+from app.extraction import PdfExtractor
+from app.offload import INLINE, THREAD, CpuOffload, OffloadSaturated
+
+CRISIS_PAYLOAD = {
+    "mission_location": "Beirut",
+    "crisis_type": "Armed conflict",
+    "nationals_affected": 1200,
+    "embassy_resources": ["2 consular officers", "1 minibus"],
+    "constraints": ["Airport closed"],
+    "local_conditions": "Shelling near the southern suburbs; main roads to the north remain open. " * 20,
+    "scenario_doc_text": "Evacuation of nationals through the northern land corridor. " * 2000,
+}
+
+TREATY_PAYLOAD = {
+    "treaty_name": "Convention on the Rights of Migrant Workers",
+    "law_name": "Overseas Employment and Migrants Act",
+    "treaty_text": "Article 1. Each State Party shall protect migrant workers and their families. " * 1000,
+    "national_law_text": "Section 7. The competent authority shall register recruiting agencies. " * 1000,
+}
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    # template responses only: no provider, cache or pre-generated plans
+    monkeypatch.setattr(api, "OPENROUTER_API_KEY", None)
+    monkeypatch.setattr(api, "warm_plans", None)
+    monkeypatch.setattr(api.response_cache, "get", lambda key: None)
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def saturated(monkeypatch: pytest.MonkeyPatch) -> Iterator[CpuOffload]:
+    offload = CpuOffload(mode=THREAD, workers=1, max_pending=1, inline_max_chars=0)
+    offload._pending = offload.max_pending
+    monkeypatch.setattr(api, "cpu_offload", offload)
+    yield offload
+    offload.shutdown()
+
+
+def test_crisis_is_served_while_offload_is_saturated(client: TestClient, saturated: CpuOffload) -> None:
+    response = client.post("/api/crisis/generate", json=CRISIS_PAYLOAD)
+    assert response.status_code == 200
+    assert response.json()["relevance_status"] in ("low", "medium", "high")
+    assert saturated.stats()["placements"]["relevance"] == {"overflow": 1}
+
+
+def test_treaty_is_shed_while_offload_is_saturated(client: TestClient, saturated: CpuOffload) -> None:
+    response = client.post("/api/treaty/analyze", json=TREATY_PAYLOAD)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.parametrize("mode", [INLINE, THREAD])
+def test_pdf_extraction_never_runs_on_the_loop(monkeypatch: pytest.MonkeyPatch, mode: str) -> None:
+    offload = CpuOffload(mode=mode, workers=1, max_pending=1)
+    offload._pending = offload.max_pending
+    monkeypatch.setattr(extraction, "extract_page_range", lambda path, start, end: [str(threading.get_ident())] * (end - start))
+
+    pages = asyncio.run(PdfExtractor(workers=1, offload=offload).extract("doc.pdf", 2))
+    assert pages[0] == pages[1] != str(threading.get_ident())
+    offload.shutdown()
+
+
+def test_pdf_page_count_is_shed_on_a_saturated_pool(monkeypatch: pytest.MonkeyPatch, saturated: CpuOffload) -> None:
+    monkeypatch.setattr(extraction, "pdf_page_count", lambda path: 1)
+    with pytest.raises(OffloadSaturated):
+        asyncio.run(PdfExtractor(workers=1, offload=saturated).page_count("doc.pdf"))
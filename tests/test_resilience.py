@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict
+
+import pytest
+
+from app import main as api
+from app.admission import AdmissionController
+from app.resilience import HALF_OPEN, CircuitBreaker
+
+
+class HangingClient:
+    async def post(self, url: str, **kwargs: Any) -> Any:
+        await asyncio.sleep(60)
+
+    def stream(self, method: str, url: str, **kwargs: Any) -> "HangingStream":
+        return HangingStream()
+
+
+class HangingStream:
+    status_code = 200
+
+    async def __aenter__(self) -> "HangingStream":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        return None
+
+    def raise_for_status(self) -> None:
+        return None
+
+    async def aiter_lines(self) -> AsyncIterator[str]:
+        yield 'data: {"choices": [{"delta": {"content": "{"}}]}'
+        await asyncio.sleep(60)
+
+
+@pytest.fixture
+def breaker(monkeypatch: pytest.MonkeyPatch) -> CircuitBreaker:
+    # tripped on one failure and ready to probe straight away
+    tripped = CircuitBreaker(min_calls=1, open_seconds=0.0)
+    tripped.record(False, 0.0)
+    monkeypatch.setattr(api, "provider_breaker", tripped)
+    monkeypatch.setattr(api, "provider_admission", AdmissionController(max_in_flight=4, high_reserve=0))
+    monkeypatch.setattr(api, "OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(api, "_get_openrouter_client", lambda: HangingClient())
+    monkeypatch.setattr(api, "_hedge_delay", lambda: None)
+    return tripped
+
+
+def test_cancelled_probe_lets_the_next_call_through(breaker: CircuitBreaker) -> None:
+    async def run() -> None:
+        probe = asyncio.ensure_future(api._openrouter_json_completion("system", "user"))
+        await asyncio.sleep(0.01)
+        assert breaker.state == HALF_OPEN and not breaker.allow()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(run())
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert api.provider_admission.in_flight == 0
+
+
+def test_abandoned_stream_probe_lets_the_next_call_through(breaker: CircuitBreaker) -> None:
+    async def run() -> Dict[str, Any]:
+        stream = api._openrouter_stream_completion("system", "user")
+        first = await stream.__anext__()
+        assert not breaker.allow()
+        await stream.aclose()
+        return {"first": first}
+
+    assert asyncio.run(run()) == {"first": "{"}
+    assert breaker.allow()
+    assert api.provider_admission.in_flight == 0
@@ -0,0 +1,22 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import main as api
+from app.responses import FastJSONResponse, RawJSON
+
+
+def test_only_raw_json_is_sent_as_is() -> None:
+    assert FastJSONResponse(RawJSON(b'{"a":1}')).body == b'{"a":1}'
+    assert FastJSONResponse("ok").body == b'"ok"'
+    assert FastJSONResponse('{"a":1}').body == b'"{\\"a\\":1}"'
+    with pytest.raises(TypeError):
+        FastJSONResponse(b"{}")
+
+
+def test_app_default_response_class_encodes_strings() -> None:
+    assert api.app.router.default_response_class is not FastJSONResponse
+    probe = FastAPI(default_response_class=api.app.router.default_response_class)
+    probe.get("/ok")(lambda: "ok")
+    assert TestClient(probe).get("/ok").json() == "ok"
+
@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from app import main as api
+from app.main import TreatyAnalyzeRequest
+from bench.mock_provider import canned_treaty
+
+
+def long_treaty(articles: int = 60) -> str:
+    clause = "Each State Party shall adopt legislative and administrative measures to protect migrant workers. " * 12
+    return "\n\n".join(f"Article {i}\n{clause}" for i in range(1, articles + 1))
+
+
+class TimedProvider:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.peak = 0
+        self.calls: List[str] = []
+
+    async def __call__(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        self.calls.append(user_prompt)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.02)
+        self.in_flight -= 1
+        return canned_treaty(user_prompt)
+
+
+@pytest.fixture
+def provider(monkeypatch: pytest.MonkeyPatch) -> TimedProvider:
+    fake = TimedProvider()
+    monkeypatch.setattr(api, "OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(api, "_openrouter_json_completion", fake)
+    monkeypatch.setattr(api.response_cache, "get", lambda key: None)
+    monkeypatch.setattr(api.response_cache, "put", lambda key, value: None)
+    return fake
+
+
+def test_long_treaty_is_analyzed_in_one_wave(provider: TimedProvider) -> None:
+    payload = TreatyAnalyzeRequest.model_validate(
+        dict(
+            treaty_name="Convention on the Rights of Migrant Workers",
+            law_name="Overseas Employment and Migrants Act",
+            treaty_doc_text=long_treaty(),
+            national_law_text="Section 7. The competent authority shall register recruiting agencies.",
+            analysis_mode="segmented",
+        )
+    )
+    segments = api._treaty_segments(payload)
+    assert len(segments) == api.TREATY_SEGMENT_CONCURRENCY
+    assert all(len(segment) > api.TREATY_SEGMENT_CHARS for segment in segments)
+
+    asyncio.run(api._analyze_treaty(payload))
+    segment_calls = [prompt for prompt in provider.calls if "Treaty segment text:" in prompt]
+    assert len(segment_calls) == len(segments)
+    assert provider.peak == len(segments)
@@ -0,0 +1,67 @@
+import hashlib
+from typing import List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import extraction
+from app import main as api
+
+TEXT = "Section 1. A recruiting agency shall hold a licence.\n".encode("utf-8") * 50
+
+
+@pytest.fixture
+def mkstemp_calls(monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    calls: List[str] = []
+    real = extraction.tempfile.mkstemp
+
+    def recording_mkstemp(*args, **kwargs):
+        fd, path = real(*args, **kwargs)
+        calls.append(path)
+        return fd, path
+
+    monkeypatch.setattr(extraction.tempfile, "mkstemp", recording_mkstemp)
+    return calls
+
+
+def test_text_upload_is_spooled_and_hashed(mkstemp_calls: List[str]) -> None:
+    response = TestClient(api.app).post(
+        "/api/utils/extract-text", files={"file": ("act.txt", TEXT, "text/plain")}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["filename"] == "act.txt"
+    assert body["sha256"] == hashlib.sha256(TEXT).hexdigest()
+    assert body["extracted_text"].startswith("Section 1.")
+    assert len(mkstemp_calls) == 1
+
+
+def test_unsupported_type_is_refused_before_the_body_is_written(mkstemp_calls: List[str]) -> None:
+    response = TestClient(api.app).post(
+        "/api/utils/extract-text/stream",
+        files={"file": ("act.docx", b"PK" + b"\0" * 4096, "application/vnd.openxmlformats-officedocument")},
+    )
+
+    assert response.status_code == 400
+    assert "supported" in response.json()["detail"]
+    assert mkstemp_calls == []
+
+
+def test_oversize_upload_is_refused_and_removed(monkeypatch: pytest.MonkeyPatch, mkstemp_calls: List[str]) -> None:
+    monkeypatch.setattr(api, "EXTRACT_MAX_BYTES", 1024)
+
+    response = TestClient(api.app).post(
+        "/api/utils/extract-text", files={"file": ("act.txt", TEXT, "text/plain")}
+    )
+
+    assert response.status_code == 413
+    assert len(mkstemp_calls) == 1
+    assert not extraction.os.path.exists(mkstemp_calls[0])
+
+
+def test_missing_file_field_is_a_bad_request(mkstemp_calls: List[str]) -> None:
+    response = TestClient(api.app).post("/api/utils/extract-text", data={"note": "no file"})
+
+    assert response.status_code == 400
+    assert mkstemp_calls == []
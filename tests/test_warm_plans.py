@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main as api
+from app.main import CrisisGenerateRequest
+from app.plans import PlanStore
+
+from tests.test_offload_shedding import CRISIS_PAYLOAD
+
+SEED_RED = ["Seed plan: move nationals to the northern assembly point."]
+PLAN_META = {
+    "reference_no",
+    "generated_at",
+    "mode_used",
+    "fallback_reason",
+    "mission_location",
+    "crisis_type",
+    "nationals_affected",
+    "quality_gate",
+    "fallback_sections",
+    "warm_plan_id",
+}
+
+
+@pytest.fixture
+def seed_store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[PlanStore]:
+    # a plan for the same mission and crisis type under another constraint:
+    # a seed for the request, not an exact match
+    request = CrisisGenerateRequest.model_validate(CRISIS_PAYLOAD)
+    plan = api._build_crisis_fallback(request, datetime.now(timezone.utc), "SEED").model_dump(exclude=PLAN_META)
+    plan["condition_red"] = SEED_RED
+    store = PlanStore(str(tmp_path / "warm-plans.sqlite3"))
+    store.put({"id": "wp-7", "mission": "Beirut", "crisis_type": "Armed conflict", "constraint": "Fuel shortage"}, plan)
+    monkeypatch.setattr(api, "warm_plans", store)
+    monkeypatch.setattr(api.response_cache, "get", lambda key: None)
+    monkeypatch.setattr(api.response_cache, "put", lambda key, value: None)
+    yield store
+    store.close()
+
+
+def test_unadapted_seed_plan_is_labelled_fallback(monkeypatch: pytest.MonkeyPatch, seed_store: PlanStore) -> None:
+    monkeypatch.setattr(api, "OPENROUTER_API_KEY", None)
+    body = TestClient(api.app).post("/api/crisis/generate", json=CRISIS_PAYLOAD).json()
+
+    assert body["mode_used"] == "fallback"
+    assert body["warm_plan_id"] == "wp-7"
+    assert "wp-7" in body["fallback_reason"]
+    assert body["condition_red"] == SEED_RED
+
+
+def test_adapted_seed_plan_is_labelled_ai(monkeypatch: pytest.MonkeyPatch, seed_store: PlanStore) -> None:
+    prompts: List[str] = []
+
+    async def adapt(system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        prompts.append(user_prompt)
+        return {"condition_red": ["Adapted: hold nationals until the airport corridor reopens."]}
+
+    monkeypatch.setattr(api, "OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(api, "_openrouter_json_completion", adapt)
+    body = TestClient(api.app).post("/api/crisis/generate", json=CRISIS_PAYLOAD).json()
+
+    assert len(prompts) == 1 and "Draft plan:" in prompts[0]
+    assert body["mode_used"] == "ai"
+    assert body["fallback_reason"] is None
+    assert body["warm_plan_id"] == "wp-7"